@@ -0,0 +1,98 @@
+"""Install discovery: cold scan, rescan of an unchanged tree, and rescan after a change
+
+Builds a directory tree shaped like a shared drive of agent workspaces:
+``--workspaces`` folders, each with project directories and a node_modules
+tree, and a VS Code install in every ``--install-every``-th workspace. It
+then times ``InstallIndex.scan`` three times: with an empty index, again
+with nothing changed, and after one install was updated and one workspace
+was added.
+
+    python -m benchmarks.bench_discovery --workspaces 2000
+"""
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+from vsupdater.discovery import InstallIndex
+
+PROJECT_DIRS = ("src", "src/components", "src/utils", "tests", "docs", "build", "node_modules/left-pad",
+                "node_modules/react/lib", "node_modules/react/cjs", ".git/objects")
+INSTALL_DIRS = ("resources/app/out", "resources/app/extensions/git", "resources/app/node_modules/vscode",
+                "locales", "bin", "data/extensions")
+
+
+def make_install(path, version, quality="stable"):
+    for directory in INSTALL_DIRS:
+        os.makedirs(os.path.join(path, directory), exist_ok=True)
+    executable = "Code - Insiders.exe" if quality == "insider" else "Code.exe"
+    with open(os.path.join(path, executable), "wb") as f:
+        f.write(b"\0" * 4096)
+    with open(os.path.join(path, "resources", "app", "product.json"), "w", encoding="utf-8") as f:
+        json.dump({"version": version, "commit": f"{version}-commit", "quality": quality}, f)
+
+
+def make_workspace(root, index, install_every):
+    workspace = os.path.join(root, f"workspace-{index:05d}")
+    for directory in PROJECT_DIRS:
+        os.makedirs(os.path.join(workspace, "repo", directory), exist_ok=True)
+    if index % install_every == 0:
+        make_install(os.path.join(workspace, "tools", "vscode"), "1.90.0",
+                     "insider" if index % (install_every * 2) else "stable")
+    return workspace
+
+
+def timed_scan(index, root, depth):
+    started = time.perf_counter()
+    installs = index.scan(root, depth)
+    return time.perf_counter() - started, installs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workspaces", type=int, default=1000)
+    parser.add_argument("--install-every", type=int, default=10)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--workers", type=int, help="Scan threads (defaults to the library default)")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="vsupdater-bench-discovery-")
+    try:
+        root = os.path.join(work_dir, "drive")
+        for index in range(args.workspaces):
+            make_workspace(root, index, args.install_every)
+        index_path = os.path.join(work_dir, "installs.json")
+        options = {"workers": args.workers} if args.workers else {}
+
+        results = {"workspaces": args.workspaces, "runs": []}
+
+        def run(label, index):
+            seconds, installs = timed_scan(index, root, args.depth)
+            index.save()
+            run = dict(index.stats, label=label, seconds=seconds, installs=len(installs))
+            results["runs"].append(run)
+            print(f"{label:16s} {seconds:7.3f} s  listed {run['listed']:6d}  reused {run['reused']:6d}  "
+                  f"installs {run['installs']:5d} (read {run['installs_read']})")
+
+        run("cold", InstallIndex(index_path, **options))
+        run("unchanged", InstallIndex(index_path, **options))
+
+        # One install updated in place, one workspace added
+        updated = os.path.join(root, "workspace-00000", "tools", "vscode")
+        time.sleep(0.01)
+        make_install(updated, "1.91.0")
+        make_workspace(root, args.workspaces, 1)
+        run("after change", InstallIndex(index_path, **options))
+
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Download-loop CPU cost: the old iter_content loops against the reused-buffer writer
+
+Serves a random file from ``benchmarks.mirror_server`` in a child process and
+downloads it several ways:
+
+    legacy        iter_content(8192) appended to the file (the original main.py loop)
+    iter-64k      iter_content(65536) written at offsets (the previous SegmentedDownloader loop)
+    writer        preallocated file, readinto a reused buffer, adaptive read size
+    writer-mmap   the same, written through an mmap
+    segmented     SegmentedDownloader with --connections connections
+
+Reports wall time, process CPU time, CPU seconds per GB, Python-level reads
+and peak RSS.
+
+    python -m benchmarks.bench_download --size 512 --repeat 3
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+import requests
+
+from vsupdater.download import SegmentedDownloader
+from vsupdater.writer import DownloadWriter, StreamCopier, body_reader, preallocate
+from benchmarks.metrics import ResourceSampler
+
+MB = 1024 * 1024
+VARIANTS = ("legacy", "iter-64k", "writer", "writer-mmap", "segmented")
+
+
+def iter_content_loop(url, dest_path, chunk_size, positional):
+    reads = 0
+    with requests.get(url, stream=True) as response:
+        response.raise_for_status()
+        with open(dest_path, "wb") as f:
+            offset = 0
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                if not chunk:
+                    continue
+                if positional:
+                    f.seek(offset)
+                f.write(chunk)
+                offset += len(chunk)
+                reads += 1
+    return reads
+
+
+def writer_loop(url, dest_path, use_mmap):
+    with requests.get(url, stream=True) as response:
+        response.raise_for_status()
+        total_size = int(response.headers["Content-Length"])
+        preallocate(dest_path, total_size)
+        copier = StreamCopier()
+        with DownloadWriter(dest_path, total_size, use_mmap) as writer:
+            copier.copy(body_reader(response), writer, 0, total_size)
+    return copier.reads
+
+
+def segmented(url, dest_path, connections):
+    downloader = SegmentedDownloader(url, dest_path, connections=connections)
+    if not downloader.download():
+        raise RuntimeError("Download did not complete")
+    return None
+
+
+def run_variant(variant, url, dest_path, args):
+    if os.path.exists(dest_path):
+        os.remove(dest_path)
+    with ResourceSampler() as sampler:
+        wall_started = time.perf_counter()
+        cpu_started = time.process_time()
+        if variant == "legacy":
+            reads = iter_content_loop(url, dest_path, 8192, positional=False)
+        elif variant == "iter-64k":
+            reads = iter_content_loop(url, dest_path, 64 * 1024, positional=True)
+        elif variant == "writer":
+            reads = writer_loop(url, dest_path, use_mmap=False)
+        elif variant == "writer-mmap":
+            reads = writer_loop(url, dest_path, use_mmap=True)
+        else:
+            reads = segmented(url, dest_path, args.connections)
+        cpu = time.process_time() - cpu_started
+        wall = time.perf_counter() - wall_started
+    if os.path.getsize(dest_path) != args.size * MB:
+        raise RuntimeError(f"{variant} wrote {os.path.getsize(dest_path)} bytes")
+    return {"variant": variant, "wall_seconds": wall, "cpu_seconds": cpu, "reads": reads,
+            "peak_rss": sampler.peak_rss}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=256, help="MB to download")
+    parser.add_argument("--bandwidth", type=float, default=0, help="Mirror link speed in MB/s (0 = unlimited)")
+    parser.add_argument("--connections", type=int, default=4, help="Connections for the segmented variant")
+    parser.add_argument("--variant", nargs="+", choices=VARIANTS, default=list(VARIANTS))
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per variant; the lowest CPU time is reported")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="vsupdater-bench-download-")
+    server = None
+    try:
+        source = os.path.join(work_dir, "serve", "payload.bin")
+        os.makedirs(os.path.dirname(source))
+        with open(source, "wb") as f:
+            for _ in range(args.size):
+                f.write(os.urandom(MB))
+
+        server = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.mirror_server", "--root", os.path.dirname(source), "--port", "0",
+             "--bandwidth", str(args.bandwidth)],
+            stdout=subprocess.PIPE, text=True,
+        )
+        url = server.stdout.readline().strip() + "/payload.bin"
+        dest_path = os.path.join(work_dir, "download.bin")
+
+        results = {"size": args.size * MB, "bandwidth": args.bandwidth, "runs": []}
+        for variant in args.variant:
+            runs = [run_variant(variant, url, dest_path, args) for _ in range(args.repeat)]
+            best = min(runs, key=lambda run: run["cpu_seconds"])
+            best["mb_per_second"] = args.size / best["wall_seconds"]
+            best["cpu_seconds_per_gb"] = best["cpu_seconds"] * 1024 / args.size
+            results["runs"].append(best)
+            reads = f"{best['reads']:8d}" if best["reads"] is not None else "     n/a"
+            rss = f"{best['peak_rss'] / MB:6.0f} MB" if best["peak_rss"] else "     n/a"
+            print(f"{variant:12s} wall {best['wall_seconds']:6.2f} s  {best['mb_per_second']:7.1f} MB/s  "
+                  f"cpu {best['cpu_seconds']:6.2f} s  ({best['cpu_seconds_per_gb']:5.2f} s/GB)  reads {reads}  rss {rss}")
+
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Extraction throughput of vsupdater.extract across worker counts
+
+    python -m benchmarks.bench_extract --scale 0.25 --workers 1 2 4 8
+"""
+import os
+import json
+import time
+import shutil
+import zipfile
+import argparse
+import tempfile
+
+from vsupdater.extract import extract_zip
+from benchmarks.synthetic import build_archive
+
+
+def time_extraction(archive_path, workers, repeat):
+    best = None
+    for _ in range(repeat):
+        dest_dir = tempfile.mkdtemp(prefix="vsupdater-extract-")
+        try:
+            started = time.perf_counter()
+            extract_zip(archive_path, dest_dir, workers=workers)
+            elapsed = time.perf_counter() - started
+        finally:
+            shutil.rmtree(dest_dir, ignore_errors=True)
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def time_unpack_archive(archive_path):
+    """Baseline: the single-threaded shutil.unpack_archive the updater used to call"""
+    dest_dir = tempfile.mkdtemp(prefix="vsupdater-extract-")
+    try:
+        started = time.perf_counter()
+        shutil.unpack_archive(archive_path, dest_dir)
+        return time.perf_counter() - started
+    finally:
+        shutil.rmtree(dest_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--archive", help="Existing zip to extract instead of a generated one")
+    parser.add_argument("--profile", default="stable")
+    parser.add_argument("--scale", type=float, default=0.25)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="vsupdater-bench-")
+    try:
+        archive_path = args.archive
+        if archive_path is None:
+            archive_path = os.path.join(work_dir, "vscode.zip")
+            build_archive(archive_path, args.profile, scale=args.scale)
+
+        with zipfile.ZipFile(archive_path) as archive:
+            infos = archive.infolist()
+        uncompressed = sum(info.file_size for info in infos)
+
+        results = {
+            "archive_size": os.path.getsize(archive_path),
+            "uncompressed_size": uncompressed,
+            "files": len(infos),
+            "cpu_count": os.cpu_count(),
+            "unpack_archive_seconds": time_unpack_archive(archive_path),
+            "runs": [],
+        }
+        print(f"{len(infos)} files, {uncompressed / (1024 * 1024):.1f} MB uncompressed, "
+              f"{os.cpu_count()} CPUs; shutil.unpack_archive: {results['unpack_archive_seconds']:.2f} s")
+
+        for workers in args.workers:
+            elapsed = time_extraction(archive_path, workers, args.repeat)
+            results["runs"].append({
+                "workers": workers,
+                "seconds": elapsed,
+                "mb_per_second": uncompressed / (1024 * 1024) / elapsed,
+            })
+            print(f"workers={workers:3d}  {elapsed:7.2f} s  {uncompressed / (1024 * 1024) / elapsed:8.1f} MB/s")
+
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
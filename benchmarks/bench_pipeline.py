@@ -0,0 +1,281 @@
+"""End-to-end benchmark of the install/update pipeline against a local mirror
+
+Generates two synthetic builds, serves them with ``benchmarks.mirror_server``
+in a child process, and drives ``UpdateEngine.run`` headlessly for each
+scenario. Every run reports per-phase wall time, throughput, peak RSS, bytes
+written and bytes served. Results are printed and can be saved as JSON. A
+previous JSON file can be compared against the new results:
+
+    python -m benchmarks.bench_pipeline --scale 0.25 --bandwidth 100 --output head.json
+    python -m benchmarks.bench_pipeline --scale 0.25 --bandwidth 100 --compare head.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+
+import requests
+
+from vsupdater.engine import UpdateEngine, APPLY_STAGED, APPLY_COPY, APPLY_DELTA, APPLY_REMOTE_DELTA
+from vsupdater.extract import DEFAULT_WORKERS
+from vsupdater.download import DEFAULT_CONNECTIONS
+from vsupdater.instrumentation import Instrumentation
+from benchmarks.metrics import PhaseTimer, ResourceSampler
+from benchmarks.mirror_server import RELEASES_FILE
+from benchmarks.synthetic import PROFILES, build_archive
+
+MB = 1024 * 1024
+
+# Scenario name -> (is_install_operation, apply mode)
+SCENARIOS = {
+    "install": (True, APPLY_STAGED),
+    "update-staged": (False, APPLY_STAGED),
+    "update-copy": (False, APPLY_COPY),
+    "update-delta": (False, APPLY_DELTA),
+    "update-remote-delta": (False, APPLY_REMOTE_DELTA),
+}
+
+# Engine method -> phase name; time spent in a phase excludes nested phases
+PHASES = {
+    "resolve_latest_release": "version-check",
+    "download_vscode": "download",
+    "verify_archive": "verify",
+    "extract_archive": "extract",
+    "move_files_to_install_dir": "move",
+    "apply_staged": "swap",
+    "apply_delta": "delta-apply",
+    "apply_remote_delta": "remote-delta",
+    "write_manifest_from_archive": "manifest",
+    "cleanup_temp_dir": "cleanup",
+    "create_portable_data_folder": "finish",
+    "snapshot_data": "snapshot",
+}
+
+
+def prepare_archives(data_dir, profile, scale, seed, changed_fraction):
+    """Build (or reuse) the old and the new synthetic build"""
+    os.makedirs(data_dir, exist_ok=True)
+    archives = []
+    for build in (0, 1):
+        stem = f"{profile}-seed{seed}-scale{scale:g}-changed{changed_fraction:g}-build{build}"
+        path = os.path.join(data_dir, stem + ".zip")
+        info_path = path + ".json"
+        if os.path.exists(path) and os.path.exists(info_path):
+            with open(info_path, "r", encoding="utf-8") as f:
+                archives.append(json.load(f))
+            continue
+        print(f"Generating {os.path.basename(path)}...", file=sys.stderr)
+        info = build_archive(path, profile, build, seed, scale, changed_fraction)
+        with open(info_path, "w", encoding="utf-8") as f:
+            json.dump(info, f, indent=2)
+        archives.append(info)
+    return archives
+
+
+def publish(root, info):
+    """Point the mirror's update API at ``info``"""
+    release = {"file": os.path.basename(info["path"]), "version": info["version"],
+               "commit": info["commit"], "sha256": info["sha256"]}
+    with open(os.path.join(root, RELEASES_FILE), "w", encoding="utf-8") as f:
+        json.dump({info["quality"]: release}, f)
+
+
+def start_server(root, args):
+    """Run the mirror in a child process so it does not skew our RSS or I/O counters"""
+    command = [sys.executable, "-m", "benchmarks.mirror_server", "--root", root, "--port", "0",
+               "--bandwidth", str(args.bandwidth), "--latency", str(args.latency),
+               "--fail-rate", str(args.fail_rate), "--error-rate", str(args.error_rate), "--seed", str(args.seed),
+               "--stall-rate", str(args.stall_rate), "--stall-seconds", str(args.stall_seconds)]
+    if args.no_ranges:
+        command.append("--no-ranges")
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    base_url = process.stdout.readline().strip()
+    if not base_url:
+        process.kill()
+        raise RuntimeError("Mirror server did not start")
+    return process, base_url
+
+
+def server_stats(base_url, reset=False):
+    response = requests.get(f"{base_url}/_stats/reset" if reset else f"{base_url}/_stats", timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+
+def make_engine(folder_path, work_dir, quality, apply_mode, base_url, args, timer=None, log=None):
+    engine = UpdateEngine(
+        folder_path, is_insider=quality == "insider", is_portable=True, log=log,
+        download_connections=args.connections, update_api_url=base_url, use_cache=False,
+        apply_mode=apply_mode, extract_workers=args.extract_workers, work_dir=work_dir,
+        # No event log, so its writes do not count towards bytes_written
+        instrumentation=Instrumentation(),
+    )
+    if timer is not None:
+        for method, phase in PHASES.items():
+            setattr(engine, method, timer.wrap(phase, getattr(engine, method)))
+    return engine
+
+
+def run_scenario(name, archives, root, base_url, args):
+    is_install_operation, apply_mode = SCENARIOS[name]
+    old_build, new_build = archives
+    quality = new_build["quality"]
+    if args.work_dir:
+        os.makedirs(args.work_dir, exist_ok=True)
+    scratch = tempfile.mkdtemp(prefix="vsupdater-pipeline-", dir=args.work_dir)
+    folder_path = os.path.join(scratch, "VSCode")
+    work_dir = os.path.join(scratch, "work")
+    os.makedirs(folder_path)
+    os.makedirs(work_dir)
+
+    try:
+        if not is_install_operation:
+            # Start from an installation of the previous build, as a real update would
+            publish(root, old_build)
+            setup = make_engine(folder_path, work_dir, quality, APPLY_STAGED, base_url, args)
+            if not setup.run(True):
+                raise RuntimeError(f"Could not install the previous build for {name}")
+        publish(root, new_build)
+        server_stats(base_url, reset=True)
+
+        timer = PhaseTimer()
+        log = []
+        engine = make_engine(folder_path, work_dir, quality, apply_mode, base_url, args, timer,
+                             log=lambda message: log.append(message))
+        with ResourceSampler() as sampler:
+            started = time.perf_counter()
+            ok = engine.run(is_install_operation)
+            total = time.perf_counter() - started
+
+        stats = server_stats(base_url)
+        phases = dict(timer.seconds)
+        phases["other"] = max(0.0, total - sum(phases.values()))
+        result = {
+            "scenario": name,
+            "ok": ok,
+            "total_seconds": total,
+            "phases": phases,
+            "throughput_mb_s": {
+                "end_to_end": new_build["uncompressed_size"] / MB / total,
+                "download": new_build["size"] / MB / phases["download"] if phases.get("download") else None,
+                "extract": new_build["uncompressed_size"] / MB / phases["extract"] if phases.get("extract") else None,
+            },
+            "peak_rss": sampler.peak_rss,
+            "bytes_written": sampler.bytes_written,
+            "network": stats,
+            "transport": engine.transport.metrics.snapshot(),
+        }
+        if not ok:
+            result["log_tail"] = log[-10:]
+        return result
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def best_of(name, repeat, archives, root, base_url, args):
+    runs = [run_scenario(name, archives, root, base_url, args) for _ in range(repeat)]
+    successful = [run for run in runs if run["ok"]] or runs
+    best = min(successful, key=lambda run: run["total_seconds"])
+    best["repeat"] = repeat
+    best["failed_runs"] = sum(1 for run in runs if not run["ok"])
+    return best
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_result(result):
+    phases = "  ".join(f"{phase}={seconds:.2f}" for phase, seconds in sorted(result["phases"].items())
+                       if seconds >= 0.005)
+    rss = f"{result['peak_rss'] / MB:.0f} MB" if result["peak_rss"] else "n/a"
+    written = f"{result['bytes_written'] / MB:.0f} MB" if result["bytes_written"] is not None else "n/a"
+    print(f"{result['scenario']:20s} {'ok ' if result['ok'] else 'FAIL'} {result['total_seconds']:7.2f} s  "
+          f"rss {rss:>7s}  written {written:>7s}  served {result['network']['bytes_sent'] / MB:6.1f} MB  "
+          f"({phases})")
+
+
+def compare(results, baseline_path):
+    """Print the change of every scenario and phase relative to a saved run"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {run["scenario"]: run for run in json.load(f)["scenarios"]}
+    print(f"\nCompared with {baseline_path}:")
+    for result in results:
+        before = baseline.get(result["scenario"])
+        if before is None:
+            continue
+        rows = [("total", before["total_seconds"], result["total_seconds"])]
+        rows += [(phase, before["phases"].get(phase, 0.0), seconds) for phase, seconds in result["phases"].items()]
+        changes = []
+        for label, old, new in rows:
+            if old >= 0.01 or new >= 0.01:
+                change = (new - old) / old * 100 if old else float("inf")
+                changes.append(f"{label} {old:.2f}->{new:.2f} s ({change:+.0f}%)")
+        print(f"{result['scenario']:20s} " + "  ".join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="stable")
+    parser.add_argument("--scale", type=float, default=0.25, help="Multiply every file size by this factor")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--changed-fraction", type=float, default=0.05, help="Share of files that change per build")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "vsupdater-bench-data"),
+                        help="Where generated archives are kept between runs")
+    parser.add_argument("--work-dir", help="Where installs are created (defaults to the system temp folder)")
+    parser.add_argument("--bandwidth", type=float, default=0, help="Mirror link speed in MB/s (0 = unlimited)")
+    parser.add_argument("--latency", type=float, default=0, help="Mirror latency per request in milliseconds")
+    parser.add_argument("--no-ranges", action="store_true", help="Mirror ignores Range requests")
+    parser.add_argument("--fail-rate", type=float, default=0, help="Probability of the mirror cutting a response short")
+    parser.add_argument("--error-rate", type=float, default=0, help="Probability of the mirror answering 503")
+    parser.add_argument("--stall-rate", type=float, default=0, help="Probability of the mirror going silent mid-response")
+    parser.add_argument("--stall-seconds", type=float, default=60, help="How long a stalled response stays silent")
+    parser.add_argument("--connections", type=int, default=DEFAULT_CONNECTIONS)
+    parser.add_argument("--extract-workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per scenario; the fastest is reported")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--compare", help="Earlier JSON results to compare against")
+    args = parser.parse_args()
+
+    archives = prepare_archives(args.data_dir, args.profile, args.scale, args.seed, args.changed_fraction)
+    server, base_url = start_server(args.data_dir, args)
+    try:
+        results = []
+        for name in args.scenario:
+            result = best_of(name, args.repeat, archives, args.data_dir, base_url, args)
+            print_result(result)
+            results.append(result)
+    finally:
+        server.terminate()
+        server.wait()
+
+    report = {
+        "revision": git_revision(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "archives": archives,
+        "scenarios": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+    return 0 if all(result["ok"] for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
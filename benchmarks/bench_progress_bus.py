@@ -0,0 +1,176 @@
+"""Download-loop throughput with and without the UI attached
+
+A synthetic download loop copies ``--size`` MB from memory to the null
+device in ``--chunk-size`` KB chunks. It reports progress after every chunk
+and writes a log line every ``--log-every`` chunks. It runs in four ways:
+
+    no-ui     callbacks do nothing (upper bound)
+    direct    setValue/append plus processEvents() on every call, like the old main.py
+    signals   worker thread emitting one queued Qt signal per call
+    bus       worker thread posting to EventBus, drained by EventPump at ~30 Hz
+
+    python -m benchmarks.bench_progress_bus --size 256 --chunk-size 8
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+
+from vsupdater.events import EventBus
+
+MODES = ("no-ui", "direct", "signals", "bus")
+
+
+def download_loop(data, chunk_size, progress, log, log_every):
+    """Copy ``data`` to the null device, reporting like a download would"""
+    view = memoryview(data)
+    total = len(data)
+    with open(os.devnull, "wb") as sink:
+        for index, offset in enumerate(range(0, total, chunk_size)):
+            sink.write(view[offset:offset + chunk_size])
+            progress(int((offset + chunk_size) * 100 / total))
+            if log_every and index % log_every == 0:
+                log(f"Downloaded {offset + chunk_size} of {total} bytes")
+
+
+def run_no_ui(data, args):
+    started = time.perf_counter()
+    download_loop(data, args.chunk_size, lambda value: None, lambda message: None, args.log_every)
+    elapsed = time.perf_counter() - started
+    return {"loop_seconds": elapsed, "total_seconds": elapsed}
+
+
+def run_direct(data, args, widgets):
+    from PySide6.QtWidgets import QApplication
+
+    progress_bar, text = widgets
+
+    def progress(value):
+        progress_bar.setValue(value)
+        QApplication.processEvents()
+
+    def log(message):
+        text.append(message)
+        QApplication.processEvents()
+
+    started = time.perf_counter()
+    download_loop(data, args.chunk_size, progress, log, args.log_every)
+    elapsed = time.perf_counter() - started
+    return {"loop_seconds": elapsed, "total_seconds": elapsed}
+
+
+def run_threaded(data, args, widgets, use_bus):
+    from PySide6.QtCore import QEventLoop, QObject, Signal, Slot
+    from vsupdater.worker import EventPump
+
+    progress_bar, text = widgets
+
+    loop = QEventLoop()
+    timings = {}
+    bus = EventBus() if use_bus else None
+    pump = None
+
+    class Emitter(QObject):
+        progress = Signal(int)
+        log = Signal(str)
+        done = Signal()
+
+        @Slot()
+        def finished(self):
+            if pump is not None:
+                pump.stop()
+            loop.quit()
+
+    # Lives on the GUI thread, so signals emitted by the worker are queued
+    emitter = Emitter()
+
+    if use_bus:
+        pump = EventPump(bus)
+        pump.progress.connect(progress_bar.setValue)
+        pump.log.connect(text.append)
+        pump.start()
+        progress, log = bus.post_progress, bus.post_log
+    else:
+        emitter.progress.connect(progress_bar.setValue)
+        emitter.log.connect(text.append)
+        progress, log = emitter.progress.emit, emitter.log.emit
+
+    # Queued behind every signal already posted, so it runs once the GUI caught up
+    emitter.done.connect(emitter.finished)
+
+    def worker():
+        download_loop(data, args.chunk_size, progress, log, args.log_every)
+        timings["loop_seconds"] = time.perf_counter() - started
+        emitter.done.emit()
+
+    started = time.perf_counter()
+    thread = threading.Thread(target=worker)
+    thread.start()
+    loop.exec()
+    thread.join()
+    timings["total_seconds"] = time.perf_counter() - started
+    if bus is not None:
+        timings["frames"] = bus.frames
+        timings["posted"] = bus.posted_progress + bus.posted_lines
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=256, help="MB pushed through the loop")
+    parser.add_argument("--chunk-size", type=int, default=8, help="KB per chunk")
+    parser.add_argument("--log-every", type=int, default=256, help="Chunks between log lines (0 = none)")
+    parser.add_argument("--mode", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--visible", action="store_true", help="Show the window instead of rendering offscreen")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+    args.chunk_size *= 1024
+
+    data = os.urandom(args.size * 1024 * 1024)
+    widgets = None
+    if any(mode != "no-ui" for mode in args.mode):
+        if not args.visible:
+            os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        try:
+            from PySide6.QtWidgets import QApplication, QProgressBar, QTextEdit, QVBoxLayout, QWidget
+        except ImportError:
+            print("PySide6 is not installed; only the no-ui mode can run.", file=sys.stderr)
+            args.mode = ["no-ui"]
+        else:
+            app = QApplication.instance() or QApplication(sys.argv)
+            window = QWidget()
+            layout = QVBoxLayout(window)
+            widgets = (QProgressBar(), QTextEdit())
+            for widget in widgets:
+                layout.addWidget(widget)
+            window.show()
+            app.processEvents()
+
+    chunks = -(-len(data) // args.chunk_size)
+    results = {"size": len(data), "chunk_size": args.chunk_size, "chunks": chunks, "runs": []}
+    for mode in args.mode:
+        if widgets is not None:
+            widgets[0].setValue(0)
+            widgets[1].clear()
+        if mode == "no-ui":
+            timings = run_no_ui(data, args)
+        elif mode == "direct":
+            timings = run_direct(data, args, widgets)
+        else:
+            timings = run_threaded(data, args, widgets, use_bus=mode == "bus")
+        timings["mode"] = mode
+        timings["mb_per_second"] = len(data) / (1024 * 1024) / timings["loop_seconds"]
+        results["runs"].append(timings)
+        frames = f"  frames {timings['frames']}" if "frames" in timings else ""
+        print(f"{mode:8s} loop {timings['loop_seconds']:7.3f} s  {timings['mb_per_second']:9.1f} MB/s  "
+              f"until UI idle {timings['total_seconds']:7.3f} s{frames}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Portable data folder snapshots: full copy against incremental hardlink snapshots
+
+Builds a ``data`` folder shaped like a well-used portable install: many
+small extension files, a few large ones (language servers, state
+databases) and user settings. It then times a plain ``shutil.copytree``,
+the first snapshot (a full copy), a second snapshot after ``--changed``
+percent of the files were modified, a snapshot that also compares hashes, and a
+restore after the changes.
+
+    python -m benchmarks.bench_snapshot --size 2048 --changed 1
+"""
+import os
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+
+from vsupdater.snapshot import SnapshotStore
+
+MB = 1024 * 1024
+
+
+def make_data(data_dir, size_mb, seed):
+    """Write roughly ``size_mb`` MB: 85% in a few large files, the rest in many small ones"""
+    rng = random.Random(seed)
+    files = []
+    large_bytes = int(size_mb * MB * 0.85)
+    large_count = max(1, size_mb // 128)
+    for index in range(large_count):
+        files.append((f"extensions/ext-{index:03d}/server/server.bin", large_bytes // large_count))
+    small_bytes = size_mb * MB - large_bytes
+    small_count = max(1, small_bytes // (16 * 1024))
+    for index in range(small_count):
+        files.append((f"extensions/ext-{index % 200:03d}/out/file-{index:05d}.js", rng.randint(1024, 31 * 1024)))
+    files.append(("user-data/User/settings.json", 2048))
+    files.append(("user-data/User/globalStorage/state.vscdb", 8 * MB))
+
+    block = os.urandom(MB)
+    for relative, size in files:
+        path = os.path.join(data_dir, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            remaining = size
+            while remaining:
+                count = min(remaining, len(block))
+                f.write(block[:count])
+                remaining -= count
+    return [relative for relative, _ in files]
+
+
+def modify(data_dir, files, fraction, seed):
+    """Rewrite a random ``fraction`` of the files, always including the state database"""
+    rng = random.Random(seed)
+    chosen = set(rng.sample(files, max(1, int(len(files) * fraction))))
+    chosen.add("user-data/User/globalStorage/state.vscdb")
+    for relative in chosen:
+        with open(os.path.join(data_dir, relative), "r+b") as f:
+            f.write(os.urandom(512))
+    # Make sure the new mtimes differ from the recorded ones even on coarse clocks
+    later = time.time() + 2
+    for relative in chosen:
+        os.utime(os.path.join(data_dir, relative), (later, later))
+    return len(chosen)
+
+
+def timed(label, results, action):
+    started = time.perf_counter()
+    value = action()
+    seconds = time.perf_counter() - started
+    results.append({"label": label, "seconds": seconds})
+    return seconds, value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=1024, help="Size of the data folder in MB")
+    parser.add_argument("--changed", type=float, default=1.0, help="Percent of files modified between snapshots")
+    parser.add_argument("--workers", type=int, help="Copy threads (defaults to the library default)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--dir", help="Work in this directory (defaults to a temporary one)")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="vsupdater-bench-snapshot-", dir=args.dir)
+    try:
+        install = os.path.join(work_dir, "vscode")
+        data_dir = os.path.join(install, "data")
+        files = make_data(data_dir, args.size, args.seed)
+        runs = []
+        results = {"size_mb": args.size, "files": len(files), "changed_percent": args.changed, "runs": runs}
+
+        def report(label, seconds, stats=None):
+            line = f"{label:22s} {seconds:8.3f} s"
+            if stats:
+                line += (f"  copied {stats.get('copied', 0):6d} ({stats.get('bytes_copied', 0) / MB:8.1f} MB)"
+                         f"  linked/kept {stats.get('linked', stats.get('kept', 0)):6d}")
+                runs[-1]["stats"] = dict(stats)
+            print(line)
+
+        full_copy = os.path.join(work_dir, "full-copy")
+        seconds, _ = timed("copytree", runs, lambda: shutil.copytree(data_dir, full_copy))
+        report("copytree", seconds)
+        shutil.rmtree(full_copy)
+
+        options = {"workers": args.workers} if args.workers else {}
+        store = SnapshotStore(install, keep=10, **options)
+        seconds, _ = timed("first snapshot", runs, store.create)
+        report("first snapshot", seconds, store.stats)
+
+        seconds, _ = timed("unchanged snapshot", runs, store.create)
+        report("unchanged snapshot", seconds, store.stats)
+
+        changed = modify(data_dir, files, args.changed / 100, args.seed)
+        seconds, _ = timed("incremental snapshot", runs, store.create)
+        report("incremental snapshot", seconds, store.stats)
+
+        modify(data_dir, files, args.changed / 100, args.seed + 1)
+        hashing = SnapshotStore(install, keep=10, verify_hash=True, **options)
+        seconds, _ = timed("hashed snapshot", runs, hashing.create)
+        report("hashed snapshot", seconds, hashing.stats)
+
+        snapshot_id = store.snapshot_ids()[-2]
+        modify(data_dir, files, args.changed / 100, args.seed + 2)
+        seconds, _ = timed("restore", runs, lambda: store.restore(snapshot_id))
+        report("restore", seconds, store.stats)
+
+        results["files_changed"] = changed
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""Startup cost of the entry points: time to first window, check-only run and import time
+
+Each scenario runs in a fresh interpreter:
+
+- ``interpreter``: ``python -c pass``, the floor every other number includes,
+- ``window``: the installer window as ``main.py`` opens it, until it is exposed,
+- ``window-eager``: the same with the worker (engine, ``requests``, zip
+  machinery) imported before the window is created, as ``main.py`` used to,
+- ``check``: ``main.py --check`` against a local stand-in for the update
+  service, start to exit,
+- ``help``: ``main.py --help``.
+
+Wall times are the fastest and the median of ``--repeat`` runs. One more run
+per scenario with ``python -X importtime`` gives the import time of the
+modules the scenario loads beyond the bare interpreter, the heaviest of
+them, and whether Qt, ``requests`` or the engine were loaded at all. The
+window is created offscreen unless ``--platform native`` is given.
+
+    python -m benchmarks.bench_startup --repeat 5 --output startup.json
+    python -m benchmarks.bench_startup --repeat 5 --compare startup.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import threading
+import statistics
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.bench_discovery import make_install
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN_SCRIPT = os.path.join(REPO_ROOT, "main.py")
+READY_MARKER = "startup-ready"
+INSTALLED_VERSION = "1.90.0"
+# Modules whose presence says which parts of the application a scenario loaded
+WATCHED_MODULES = ("PySide6.QtWidgets", "requests", "vsupdater.engine", "vsupdater.extract", "vsupdater.worker")
+
+WINDOW_PROBE = """
+import os, sys, time
+sys.path.insert(0, {root!r})
+if {eager!r}:
+    import vsupdater.worker
+from vsupdater.gui import create_window
+app, window = create_window()
+deadline = time.monotonic() + 10
+while not window.windowHandle().isExposed() and time.monotonic() < deadline:
+    app.processEvents()
+app.processEvents()
+print({marker!r}, flush=True)
+os._exit(0)
+"""
+
+
+class ReleaseHandler(BaseHTTPRequestHandler):
+    """Answers every update API query with the build the test install already has"""
+
+    def do_GET(self):
+        body = json.dumps({
+            "productVersion": INSTALLED_VERSION,
+            "version": f"{INSTALLED_VERSION}-commit",
+            "url": f"http://{self.headers.get('Host')}/builds/none.zip",
+            "sha256hash": "0" * 64,
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def scenario_commands(install_path, api_url):
+    window = [sys.executable, "-c"]
+    return {
+        "interpreter": ([sys.executable, "-c", "pass"], False),
+        "window": (window + [WINDOW_PROBE.format(root=REPO_ROOT, eager=False, marker=READY_MARKER)], True),
+        "window-eager": (window + [WINDOW_PROBE.format(root=REPO_ROOT, eager=True, marker=READY_MARKER)], True),
+        "check": ([sys.executable, MAIN_SCRIPT, "--check", install_path, "--update-api", api_url, "--quiet"], False),
+        "help": ([sys.executable, MAIN_SCRIPT, "--help"], False),
+    }
+
+
+def run_once(command, wait_for_marker, env, importtime=False):
+    """Seconds until the marker line (or exit), and stderr"""
+    if importtime:
+        command = [command[0], "-X", "importtime"] + command[1:]
+    started = time.perf_counter()
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, env=env,
+                               cwd=REPO_ROOT)
+    if wait_for_marker:
+        for line in process.stdout:
+            if line.strip() == READY_MARKER:
+                break
+        seconds = time.perf_counter() - started
+        _, stderr = process.communicate()
+    else:
+        _, stderr = process.communicate()
+        seconds = time.perf_counter() - started
+    if process.returncode not in (0, None):
+        raise RuntimeError(f"{' '.join(command[:3])}... exited with {process.returncode}:\n{stderr[-2000:]}")
+    return seconds, stderr
+
+
+def parse_importtime(stderr):
+    """``{module: (self_us, cumulative_us, depth)}`` from ``-X importtime`` output"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_part, cumulative, name = line.split("|")
+        depth = len(name) - len(name.lstrip())
+        modules[name.strip()] = (int(self_part.split(":")[1]), int(cumulative), depth)
+    return modules
+
+
+def import_profile(stderr, baseline):
+    """Import time of the modules beyond ``baseline``, with the heaviest top-level ones"""
+    modules = {name: entry for name, entry in parse_importtime(stderr).items() if name not in baseline}
+    if not modules:
+        return {"import_ms": 0.0, "modules": 0, "heaviest": [], "loaded": {name: False for name in WATCHED_MODULES}}
+    top_depth = min(depth for _, _, depth in modules.values())
+    top = sorted(((cumulative, name) for name, (_, cumulative, depth) in modules.items() if depth == top_depth),
+                 reverse=True)
+    return {
+        "import_ms": round(sum(self_us for self_us, _, _ in modules.values()) / 1000, 1),
+        "modules": len(modules),
+        "heaviest": [[name, round(cumulative / 1000, 1)] for cumulative, name in top[:5]],
+        "loaded": {name: name in modules for name in WATCHED_MODULES},
+    }
+
+
+def print_result(result):
+    loaded = ", ".join(name for name, present in result["loaded"].items() if present) or "-"
+    print(f"{result['scenario']:13s} {result['min_ms']:8.1f} ms  median {result['median_ms']:8.1f} ms  "
+          f"imports {result['import_ms']:7.1f} ms ({result['modules']:4d} modules)  loaded: {loaded}")
+
+
+def compare(results, baseline_path):
+    """Print the change of every scenario relative to a saved run"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {run["scenario"]: run for run in json.load(f)["scenarios"]}
+    print(f"\nCompared with {baseline_path}:")
+    for result in results:
+        before = baseline.get(result["scenario"])
+        if before is None:
+            continue
+        changes = []
+        for key in ("min_ms", "import_ms"):
+            old, new = before[key], result[key]
+            change = (new - old) / old * 100 if old else float("inf")
+            changes.append(f"{key[:-3]} {old:.1f}->{new:.1f} ms ({change:+.0f}%)")
+        newly_loaded = [name for name, present in result["loaded"].items()
+                        if present and not before["loaded"].get(name)]
+        if newly_loaded:
+            changes.append("now loads " + ", ".join(newly_loaded))
+        print(f"{result['scenario']:13s} " + "  ".join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", nargs="+", default=["interpreter", "window", "window-eager", "check", "help"],
+                        choices=["interpreter", "window", "window-eager", "check", "help"])
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per scenario")
+    parser.add_argument("--platform", default="offscreen",
+                        help="QT_QPA_PLATFORM for the window scenarios ('native' keeps the default)")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--compare", help="Earlier JSON results to compare against")
+    args = parser.parse_args()
+
+    env = {key: value for key, value in os.environ.items() if key != "VSUPDATER_MIRROR"}
+    if args.platform != "native":
+        env["QT_QPA_PLATFORM"] = args.platform
+
+    work_dir = tempfile.mkdtemp(prefix="vsupdater-bench-startup-")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ReleaseHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        install_path = os.path.join(work_dir, "vscode")
+        make_install(install_path, INSTALLED_VERSION)
+        commands = scenario_commands(install_path, f"http://127.0.0.1:{server.server_address[1]}")
+
+        baseline = parse_importtime(run_once(*commands["interpreter"], env, importtime=True)[1])
+        results = []
+        for name in args.scenario:
+            command, wait_for_marker = commands[name]
+            samples = [run_once(command, wait_for_marker, env)[0] * 1000 for _ in range(max(1, args.repeat))]
+            _, stderr = run_once(command, wait_for_marker, env, importtime=True)
+            result = dict(import_profile(stderr, baseline), scenario=name, min_ms=round(min(samples), 1),
+                          median_ms=round(statistics.median(samples), 1))
+            print_result(result)
+            results.append(result)
+    finally:
+        server.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "scenarios": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""Process-level measurements used by the benchmarks (no third-party packages)"""
+import os
+import sys
+import time
+import threading
+
+if sys.platform == "win32":
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    class IO_COUNTERS(ctypes.Structure):
+        _fields_ = [
+            ("ReadOperationCount", ctypes.c_ulonglong), ("WriteOperationCount", ctypes.c_ulonglong),
+            ("OtherOperationCount", ctypes.c_ulonglong), ("ReadTransferCount", ctypes.c_ulonglong),
+            ("WriteTransferCount", ctypes.c_ulonglong), ("OtherTransferCount", ctypes.c_ulonglong),
+        ]
+
+    def current_rss():
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        handle = ctypes.windll.kernel32.GetCurrentProcess()
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+            return None
+        return counters.WorkingSetSize
+
+    def bytes_written():
+        counters = IO_COUNTERS()
+        handle = ctypes.windll.kernel32.GetCurrentProcess()
+        if not ctypes.windll.kernel32.GetProcessIoCounters(handle, ctypes.byref(counters)):
+            return None
+        return counters.WriteTransferCount
+
+else:
+    def current_rss():
+        """Resident set size of this process in bytes, or None if unknown"""
+        try:
+            with open("/proc/self/statm", "r") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, IndexError):
+            pass
+        try:
+            import resource
+        except ImportError:
+            return None
+        # Only the peak is available here; ru_maxrss is KiB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+    def bytes_written():
+        """Bytes this process has passed to write calls so far, or None if unknown"""
+        try:
+            with open("/proc/self/io", "r") as f:
+                for line in f:
+                    if line.startswith("wchar:"):
+                        return int(line.split()[1])
+        except (OSError, ValueError):
+            pass
+        return None
+
+
+class ResourceSampler:
+    """Track peak RSS and bytes written while a block of code runs
+
+        with ResourceSampler() as sampler:
+            run_pipeline()
+        sampler.peak_rss, sampler.bytes_written
+    """
+
+    def __init__(self, interval=0.02):
+        self.interval = interval
+        self.peak_rss = None
+        self.bytes_written = None
+        self._start_written = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def sample(self):
+        rss = current_rss()
+        if rss is not None and (self.peak_rss is None or rss > self.peak_rss):
+            self.peak_rss = rss
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.sample()
+
+    def __enter__(self):
+        self._start_written = bytes_written()
+        self.sample()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop_event.set()
+        self._thread.join()
+        self.sample()
+        written = bytes_written()
+        if written is not None and self._start_written is not None:
+            self.bytes_written = written - self._start_written
+        return False
+
+
+class PhaseTimer:
+    """Exclusive wall time per named phase; nested phases are not double counted"""
+
+    def __init__(self):
+        self.seconds = {}
+        self.calls = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def start(self, name):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append([name, time.perf_counter(), 0.0])
+
+    def stop(self):
+        name, started, children = self._local.stack.pop()
+        elapsed = time.perf_counter() - started
+        if self._local.stack:
+            self._local.stack[-1][2] += elapsed
+        with self._lock:
+            self.seconds[name] = self.seconds.get(name, 0.0) + elapsed - children
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def wrap(self, name, function):
+        def timed(*args, **kwargs):
+            self.start(name)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.stop()
+        return timed
@@ -0,0 +1,208 @@
+"""Local stand-in for code.visualstudio.com and the update service
+
+Serves the files under ``--root`` with optional Range support, a shared
+bandwidth limit, per-request latency and fault injection. The update API
+answers ``/api/update/win32-x64-archive/<quality>/latest`` from
+``<root>/releases.json``, which is re-read on every request, so a harness
+can switch the published build without restarting the server:
+
+    {"stable": {"file": "stable-1.zip", "version": "1.101.0", "commit": "...", "sha256": "..."}}
+
+``/_stats`` returns request and byte counters as JSON; ``/_stats/reset``
+zeroes them.
+
+    python -m benchmarks.mirror_server --root out --port 8790 --bandwidth 50 --latency 20
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer
+
+from vsupdater.httpfiles import RangeFileHandler
+
+CHUNK_SIZE = 64 * 1024
+RELEASES_FILE = "releases.json"
+API_PATTERN = re.compile(r"^/api/update/[^/]+/(stable|insider)/latest$")
+
+
+class Throttle:
+    """Token bucket shared by all connections, so the limit is the link speed"""
+
+    def __init__(self, bytes_per_second):
+        self.rate = bytes_per_second
+        self.lock = threading.Lock()
+        self.next_free = time.monotonic()
+
+    def consume(self, size):
+        if not self.rate:
+            return
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_free)
+            self.next_free = start + size / self.rate
+            delay = self.next_free - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class MirrorServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, root, bandwidth=0, latency=0.0, ranges=True, fail_rate=0.0, error_rate=0.0,
+                 seed=None, stall_rate=0.0, stall_seconds=0.0, validators=True):
+        super().__init__(address, MirrorHandler)
+        self.root = os.path.abspath(root)
+        self.throttle = Throttle(bandwidth)
+        self.latency = latency
+        self.ranges = ranges
+        self.validators = validators
+        self.fail_rate = fail_rate
+        self.error_rate = error_rate
+        self.stall_rate = stall_rate
+        self.stall_seconds = stall_seconds
+        self.random = random.Random(seed)
+        self.stats_lock = threading.Lock()
+        self.reset_stats()
+
+    def handle_error(self, request, client_address):
+        # Clients hanging up mid-response are expected (cancelled downloads, probes)
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+    def reset_stats(self):
+        with self.stats_lock:
+            self.stats = {"requests": 0, "range_requests": 0, "not_modified": 0, "bytes_sent": 0, "faults": 0,
+                          "errors": 0, "stalls": 0}
+
+    def count(self, **values):
+        with self.stats_lock:
+            for key, value in values.items():
+                self.stats[key] += value
+
+    def roll(self, rate):
+        with self.stats_lock:
+            return rate > 0 and self.random.random() < rate
+
+
+class MirrorHandler(RangeFileHandler):
+    """Serves ``--root`` through ``RangeFileHandler``, adding the API stand-in, latency and faults"""
+
+    @property
+    def ranges(self):
+        return self.server.ranges
+
+    @property
+    def validators(self):
+        return self.server.validators
+
+    def count(self, **values):
+        self.server.count(**values)
+
+    def handle_request(self, send_body):
+        path = self.path.split("?", 1)[0]
+        if path == "/_stats":
+            return self.send_json(self.server.stats)
+        if path == "/_stats/reset":
+            self.server.reset_stats()
+            return self.send_json({"ok": True})
+
+        self.server.count(requests=1)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        match = API_PATTERN.match(path)
+        if match:
+            return self.send_release(match.group(1))
+
+        if self.server.roll(self.server.error_rate):
+            self.server.count(errors=1)
+            return self.send_status(503, {"Retry-After": "1"})
+        super().handle_request(send_body)
+
+    def send_release(self, quality):
+        try:
+            with open(os.path.join(self.server.root, RELEASES_FILE), "r", encoding="utf-8") as f:
+                release = json.load(f)[quality]
+        except (OSError, ValueError, KeyError):
+            return self.send_status(404)
+        host = self.headers.get("Host") or "%s:%d" % self.server.server_address[:2]
+        self.send_json({
+            "url": f"http://{host}/{release['file']}",
+            "name": release["version"],
+            "productVersion": release["version"],
+            "version": release["commit"],
+            "sha256hash": release.get("sha256"),
+        })
+
+    def send_file_body(self, file_path, start, length):
+        """Write in throttled chunks; a fault cuts the connection somewhere inside the body, a stall goes silent there"""
+        cut_at = length + 1
+        if self.server.roll(self.server.fail_rate):
+            cut_at = self.server.random.randrange(length)
+        stall_at = length + 1
+        if self.server.roll(self.server.stall_rate):
+            stall_at = self.server.random.randrange(length)
+
+        sent = 0
+        with open(file_path, "rb") as f:
+            f.seek(start)
+            while sent < length:
+                if sent >= cut_at:
+                    self.server.count(faults=1)
+                    break
+                if sent >= stall_at:
+                    self.server.count(stalls=1)
+                    stall_at = length + 1
+                    time.sleep(self.server.stall_seconds)
+                chunk = f.read(min(CHUNK_SIZE, length - sent, max(1, cut_at - sent), max(1, stall_at - sent)))
+                if not chunk:
+                    break
+                self.server.throttle.consume(len(chunk))
+                try:
+                    self.wfile.write(chunk)
+                except (BrokenPipeError, ConnectionResetError):
+                    break
+                sent += len(chunk)
+        return sent
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve VS Code archives and the update API locally")
+    parser.add_argument("--root", required=True, help="Directory with the archives and releases.json")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8790, help="0 picks a free port")
+    parser.add_argument("--bandwidth", type=float, default=0, help="Shared link speed in MB/s (0 = unlimited)")
+    parser.add_argument("--latency", type=float, default=0, help="Delay before each response in milliseconds")
+    parser.add_argument("--no-ranges", dest="ranges", action="store_false", help="Ignore Range headers")
+    parser.add_argument("--no-validators", dest="validators", action="store_false",
+                        help="Send no ETag, so ranged clients cannot use If-Range")
+    parser.add_argument("--fail-rate", type=float, default=0, help="Probability of cutting a file response short")
+    parser.add_argument("--error-rate", type=float, default=0, help="Probability of answering a file request with 503")
+    parser.add_argument("--stall-rate", type=float, default=0, help="Probability of a file response going silent")
+    parser.add_argument("--stall-seconds", type=float, default=60, help="How long a stalled response stays silent")
+    parser.add_argument("--seed", type=int, help="Seed for fault injection")
+    args = parser.parse_args(argv)
+
+    server = MirrorServer(
+        (args.host, args.port), args.root, bandwidth=args.bandwidth * 1024 * 1024, latency=args.latency / 1000,
+        ranges=args.ranges, fail_rate=args.fail_rate, error_rate=args.error_rate, seed=args.seed,
+        stall_rate=args.stall_rate, stall_seconds=args.stall_seconds, validators=args.validators,
+    )
+    # The first line tells a parent process where to connect
+    print(f"http://{server.server_address[0]}:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
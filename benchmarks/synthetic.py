@@ -0,0 +1,177 @@
+"""Reproducible synthetic archives shaped like VS Code win32-x64 builds
+
+The tree mimics a real build: a handful of large native binaries next to the
+executable, and ~10k small JavaScript/JSON/locale files under
+``resources/app`` with node_modules nesting up to nine levels deep. File
+sizes follow a log-normal distribution. The same ``seed`` always produces
+the same tree. Consecutive ``build`` numbers change about
+``changed_fraction`` of the files, so two builds work for delta benchmarks.
+
+    python -m benchmarks.synthetic --profile insider --build 2 --scale 0.25 out.zip
+"""
+import os
+import json
+import random
+import hashlib
+import zipfile
+import argparse
+
+MB = 1024 * 1024
+
+PROFILES = {
+    "stable": {
+        "executable": "Code.exe",
+        "quality": "stable",
+        "file_count": 10000,
+        "median_size": 3000,
+        "max_depth": 9,
+        "large_files": [
+            ("{executable}", 180 * MB), ("resources.pak", 12 * MB), ("icudtl.dat", 10 * MB),
+            ("libGLESv2.dll", 8 * MB), ("vk_swiftshader.dll", 5 * MB), ("d3dcompiler_47.dll", 4 * MB),
+            ("ffmpeg.dll", 3 * MB), ("resources/app/node_modules.asar", 6 * MB),
+        ],
+    },
+    "insider": {
+        "executable": "Code - Insiders.exe",
+        "quality": "insider",
+        "file_count": 10600,
+        "median_size": 3200,
+        "max_depth": 9,
+        "large_files": [
+            ("{executable}", 190 * MB), ("resources.pak", 13 * MB), ("icudtl.dat", 10 * MB),
+            ("libGLESv2.dll", 8 * MB), ("vk_swiftshader.dll", 5 * MB), ("d3dcompiler_47.dll", 4 * MB),
+            ("ffmpeg.dll", 3 * MB), ("resources/app/node_modules.asar", 7 * MB),
+        ],
+    },
+}
+
+WORDS = ("function return const let var export import default module require this new class "
+         "extends async await promise value result error options config request response event "
+         "listener dispose editor model range position uri workspace extension command").split()
+SMALL_EXTENSIONS = (".js", ".js", ".js", ".json", ".map", ".css", ".nls.json", ".md", ".svg", ".node")
+
+
+def tree_spec(profile="stable", seed=0, scale=1.0):
+    """List ``(name, size, kind)`` for every file of the synthetic tree"""
+    config = PROFILES[profile]
+    rng = random.Random(f"{profile}-{seed}")
+    spec = []
+    for name, size in config["large_files"]:
+        spec.append((name.format(executable=config["executable"]), max(1, int(size * scale)), "binary"))
+
+    # Each package gets a few fixed subdirectories (about one directory per six files)
+    package_dirs = []
+    for index in range(config["file_count"] // 25):
+        package = f"resources/app/node_modules/pkg{index:04d}"
+        package_dirs.append(package)
+        for _ in range(rng.randint(1, 6)):
+            depth = rng.randint(1, config["max_depth"] - 4)
+            package_dirs.append("/".join([package] + [rng.choice(WORDS) for _ in range(depth)]))
+    source_dirs = [f"resources/app/out/vs/{first}/{second}" for first in WORDS[:12] for second in WORDS[12:24]]
+
+    names = set(name for name, _, _ in spec)
+    while len(spec) < config["file_count"]:
+        roll = rng.random()
+        if roll < 0.06:
+            name = f"locales/locale-{len(spec)}.pak"
+        elif roll < 0.16:
+            name = f"{rng.choice(source_dirs)}/{rng.choice(WORDS)}{len(spec)}.js"
+        else:
+            name = f"{rng.choice(package_dirs)}/{rng.choice(WORDS)}{len(spec)}{rng.choice(SMALL_EXTENSIONS)}"
+        if name in names:
+            continue
+        names.add(name)
+        size = int(rng.lognormvariate(0, 1.5) * config["median_size"] * scale)
+        spec.append((name, max(0, min(size, 2 * MB)), "text"))
+    return spec
+
+
+def build_commit(profile, seed, build):
+    return hashlib.sha1(f"{profile}-{seed}-{build}".encode()).hexdigest()
+
+
+def last_change(name, build, changed_fraction):
+    """Latest build number <= ``build`` in which ``name`` changed"""
+    for candidate in range(build, 0, -1):
+        digest = hashlib.md5(f"{name}@{candidate}".encode()).digest()
+        if int.from_bytes(digest[:4], "big") / 2 ** 32 < changed_fraction:
+            return candidate
+    return 0
+
+
+def file_content(name, size, kind, version):
+    """Deterministic content: incompressible-ish for binaries, text for the rest"""
+    rng = random.Random(f"{name}#{version}")
+    if kind == "binary":
+        # Alternate random and repetitive runs, roughly like native code
+        chunks = []
+        remaining = size
+        while remaining > 0:
+            length = min(remaining, 64 * 1024)
+            chunks.append(rng.randbytes(length) if rng.random() < 0.6 else bytes([rng.randrange(256)]) * length)
+            remaining -= length
+        return b"".join(chunks)
+
+    text = []
+    length = 0
+    while length < size:
+        word = rng.choice(WORDS)
+        text.append(word)
+        length += len(word) + 1
+    return " ".join(text).encode()[:size]
+
+
+def build_archive(path, profile="stable", build=0, seed=0, scale=1.0, changed_fraction=0.05):
+    """Write the synthetic archive for ``build`` to ``path`` and describe it"""
+    commit = build_commit(profile, seed, build)
+    version = f"1.{100 + build}.0"
+    spec = tree_spec(profile, seed, scale)
+    product = json.dumps({
+        "nameShort": "Code - Insiders" if profile == "insider" else "Code",
+        "version": version,
+        "commit": commit,
+        "quality": PROFILES[profile]["quality"],
+    }, indent=2).encode()
+
+    uncompressed = 0
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED, compresslevel=6) as archive:
+        for name, size, kind in spec:
+            data = file_content(name, size, kind, last_change(name, build, changed_fraction))
+            archive.writestr(name, data)
+            uncompressed += len(data)
+        archive.writestr("resources/app/product.json", product)
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(MB), b""):
+            digest.update(chunk)
+
+    return {
+        "path": path,
+        "profile": profile,
+        "quality": PROFILES[profile]["quality"],
+        "build": build,
+        "version": version,
+        "commit": commit,
+        "sha256": digest.hexdigest(),
+        "size": os.path.getsize(path),
+        "uncompressed_size": uncompressed + len(product),
+        "files": len(spec) + 1,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic VS Code archive")
+    parser.add_argument("output")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="stable")
+    parser.add_argument("--build", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every file size by this factor")
+    parser.add_argument("--changed-fraction", type=float, default=0.05)
+    args = parser.parse_args()
+    info = build_archive(args.output, args.profile, args.build, args.seed, args.scale, args.changed_fraction)
+    print(json.dumps(info, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+import zipfile
+import threading
+
+import pytest
+
+from benchmarks.mirror_server import MirrorServer
+
+
+@pytest.fixture
+def serve(tmp_path):
+    """Start a local mirror server; returns its root directory and base URL"""
+    servers = []
+
+    def start(**options):
+        root = tmp_path / "www"
+        root.mkdir(exist_ok=True)
+        server = MirrorServer(("127.0.0.1", 0), str(root), **options)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return root, f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def make_archive():
+    """Write a zip of ``{member name: bytes}`` to ``path``; returns the path as a string"""
+    def make(path, files):
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED) as archive:
+            for name, data in files.items():
+                archive.writestr(name, data)
+        return str(path)
+
+    return make
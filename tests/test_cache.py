@@ -0,0 +1,86 @@
+import os
+import hashlib
+import threading
+
+from vsupdater.cache import ArchiveCache
+
+
+def make_build(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path), hashlib.sha256(data).hexdigest()
+
+
+def test_lookup_hits_only_a_verified_entry(tmp_path):
+    cache = ArchiveCache(str(tmp_path / "cache"))
+    source_path, sha256 = make_build(tmp_path, "build.zip", b"build")
+
+    assert cache.lookup("stable", "abc", sha256) is None
+    entry_path = cache.store(source_path, "stable", "abc", sha256)
+    assert not os.path.exists(source_path)
+    assert cache.lookup("stable", "abc", sha256) == entry_path
+    assert cache.lookup("stable", "def", sha256) is None
+    assert cache.lookup("insider", "abc", sha256) is None
+
+    # A corrupted entry is a miss and is dropped
+    with open(entry_path, "wb") as f:
+        f.write(b"corrupt")
+    assert cache.lookup("stable", "abc", sha256) is None
+    assert not os.path.exists(entry_path)
+
+
+def test_store_evicts_the_least_recently_used_entry(tmp_path):
+    cache = ArchiveCache(str(tmp_path / "cache"), max_bytes=250)
+    entries = []
+    for index, commit in enumerate(("a1", "b2")):
+        source_path, sha256 = make_build(tmp_path, f"{commit}.zip", bytes([index]) * 100)
+        entry_path = cache.store(source_path, "stable", commit, sha256)
+        os.utime(entry_path, (1000 + index, 1000 + index))
+        entries.append((commit, sha256, entry_path))
+
+    # A hit refreshes the older entry, so the newer one is evicted instead
+    assert cache.lookup("stable", "a1", entries[0][1]) == entries[0][2]
+    source_path, sha256 = make_build(tmp_path, "c3.zip", b"\x02" * 100)
+    newest_path = cache.store(source_path, "stable", "c3", sha256)
+
+    assert sorted(path for path, _, _ in cache.entries()) == sorted([entries[0][2], newest_path])
+    assert not os.path.exists(entries[1][2])
+
+
+def test_store_keeps_the_new_entry_even_when_it_alone_exceeds_the_limit(tmp_path):
+    cache = ArchiveCache(str(tmp_path / "cache"), max_bytes=10)
+    source_path, sha256 = make_build(tmp_path, "build.zip", b"x" * 100)
+    entry_path = cache.store(source_path, "stable", "abc", sha256)
+    assert [path for path, _, _ in cache.entries()] == [entry_path]
+
+
+def test_concurrent_stores_of_one_build_never_expose_a_partial_entry(tmp_path):
+    cache = ArchiveCache(str(tmp_path / "cache"))
+    data = os.urandom(4 * 1024 * 1024)
+    sha256 = hashlib.sha256(data).hexdigest()
+    sources = [make_build(tmp_path, f"build-{index}.zip", data)[0] for index in range(8)]
+    start = threading.Barrier(len(sources) + 1)
+    results, lookups = [], []
+
+    def store(source_path):
+        start.wait()
+        results.append(cache.store(source_path, "stable", "abc", sha256, move=False))
+
+    def watch():
+        start.wait()
+        while len(results) < len(sources):
+            lookups.append(cache.lookup("stable", "abc", sha256))
+
+    threads = [threading.Thread(target=store, args=(source,)) for source in sources]
+    threads.append(threading.Thread(target=watch))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    entry_path = cache.entry_path("stable", "abc", sha256)
+    assert results == [entry_path] * len(sources)
+    # Every lookup during the race saw either nothing or the complete file
+    assert set(lookups) <= {None, entry_path}
+    assert cache.lookup("stable", "abc", sha256) == entry_path
+    assert os.listdir(cache.root) == [os.path.basename(entry_path)]
@@ -0,0 +1,74 @@
+import os
+import sys
+import json
+import time
+import signal
+import hashlib
+import subprocess
+
+import pytest
+import requests
+
+from benchmarks.bench_discovery import make_install
+from vsupdater import cli
+from vsupdater.remotezip import TAIL_SIZE
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="sends SIGINT")
+def test_ctrl_c_cancels_running_downloads(tmp_path, serve):
+    # 32 MB at 2 MB/s: without cancellation the batch would run for about 16 seconds
+    root, base_url = serve(bandwidth=2 * 1024 * 1024)
+    (root / "build.zip").write_bytes(os.urandom(32 * 1024 * 1024))
+    (root / "releases.json").write_text(json.dumps(
+        {"stable": {"file": "build.zip", "version": "1.2.0", "commit": "new-commit"}}))
+    folder = tmp_path / "vscode"
+    make_install(str(folder), "1.1.0")
+
+    env = dict(os.environ, VSUPDATER_EVENT_LOG="0", VSUPDATER_MIRROR="")
+    command = [sys.executable, "-m", "vsupdater", str(folder), "--update-api", base_url, "--no-cache",
+               "--work-dir", str(tmp_path / "work"), "--quiet"]
+    process = subprocess.Popen(command, cwd=REPO_ROOT, env=env, stdout=subprocess.PIPE, text=True)
+    time.sleep(2)
+    started = time.monotonic()
+    process.send_signal(signal.SIGINT)
+    stdout, _ = process.communicate(timeout=10)
+
+    assert time.monotonic() - started < 5
+    assert process.returncode == 130
+    summary = json.loads(stdout)
+    assert [task["status"] for task in summary["folders"]] == ["cancelled"]
+    assert (folder / "Code.exe").exists()
+
+
+@pytest.mark.parametrize("validators", [False, True])
+def test_remote_delta_fallback_downloads_each_build_once(tmp_path, serve, make_archive, capsys, monkeypatch,
+                                                        validators):
+    # Without validators ranges are refused outright; with them every folder finds too much changed
+    root, base_url = serve(validators=validators)
+    archive = root / "build.zip"
+    make_archive(archive, {"Code.exe": os.urandom(8 * 1024 * 1024),
+                           "resources/app/product.json": json.dumps({"version": "1.2.0", "commit": "new-commit"})})
+    sha256 = hashlib.sha256(archive.read_bytes()).hexdigest()
+    (root / "releases.json").write_text(json.dumps(
+        {"stable": {"file": "build.zip", "version": "1.2.0", "commit": "new-commit", "sha256": sha256}}))
+    folders = [tmp_path / f"vscode-{index}" for index in range(3)]
+    for folder in folders:
+        make_install(str(folder), "1.1.0")
+    monkeypatch.setenv("VSUPDATER_EVENT_LOG", "0")
+    monkeypatch.delenv("VSUPDATER_MIRROR", raising=False)
+
+    status = cli.main([str(folder) for folder in folders] + [
+        "--update-api", base_url, "--apply-mode", "remote-delta", "--cache-dir", str(tmp_path / "cache"),
+        "--work-dir", str(tmp_path / "work"), "--quiet"])
+
+    summary = json.loads(capsys.readouterr().out)
+    assert status == 0, summary
+    assert [task["status"] for task in summary["folders"]] == ["updated"] * 3
+    assert len(summary["downloads"]) == 1
+    stats = requests.get(f"{base_url}/_stats", timeout=10).json()
+    # One full download, plus at most a central directory read per folder, one for the range check and probes
+    assert stats["bytes_sent"] <= archive.stat().st_size + (len(folders) + 1) * TAIL_SIZE + 1024
+    for folder in folders:
+        assert (folder / "resources" / "app" / "product.json").read_text().startswith('{"version": "1.2.0"')
@@ -0,0 +1,40 @@
+import os
+
+from vsupdater.engine import UpdateEngine, APPLY_DELTA
+from vsupdater.instrumentation import Instrumentation
+
+
+def apply_delta(folder, archive_path, work_dir):
+    engine = UpdateEngine(str(folder), apply_mode=APPLY_DELTA, work_dir=str(work_dir), instrumentation=Instrumentation())
+    assert engine.apply_delta(archive_path)
+
+
+def test_delta_keeps_user_files_and_removes_dropped_build_files(tmp_path, make_archive):
+    folder = tmp_path / "vscode"
+    folder.mkdir()
+    old = make_archive(tmp_path / "old.zip", {"Code.exe": b"old", "resources/app/old.js": b"1"})
+    new = make_archive(tmp_path / "new.zip", {"Code.exe": b"new", "resources/app/new.js": b"2"})
+
+    apply_delta(folder, old, tmp_path)
+    (folder / "notes.txt").write_text("mine")
+    (folder / "resources" / "app" / "my-patch.js").write_text("mine")
+    apply_delta(folder, new, tmp_path)
+
+    assert (folder / "Code.exe").read_bytes() == b"new"
+    assert (folder / "resources" / "app" / "new.js").exists()
+    assert not (folder / "resources" / "app" / "old.js").exists()
+    assert (folder / "notes.txt").read_text() == "mine"
+    assert (folder / "resources" / "app" / "my-patch.js").read_text() == "mine"
+
+
+def test_delta_without_saved_manifest_removes_nothing(tmp_path, make_archive):
+    folder = tmp_path / "vscode"
+    folder.mkdir()
+    (folder / "Code.exe").write_bytes(b"old")
+    (folder / "unknown.dll").write_bytes(b"?")
+    new = make_archive(tmp_path / "new.zip", {"Code.exe": b"new"})
+
+    apply_delta(folder, new, tmp_path)
+
+    assert (folder / "Code.exe").read_bytes() == b"new"
+    assert os.path.exists(folder / "unknown.dll")
@@ -0,0 +1,52 @@
+import os
+import hashlib
+
+from vsupdater.download import SegmentedDownloader
+from vsupdater.integrity import StreamingHasher
+from vsupdater.transport import Transport
+
+CONTENT = os.urandom(3 * 1024 * 1024 + 17)
+
+
+def download(tmp_path, url):
+    dest_path = str(tmp_path / "download.zip")
+    hasher = StreamingHasher(dest_path)
+    downloader = SegmentedDownloader(url, dest_path, connections=4, hasher=hasher, transport=Transport())
+    assert downloader.download()
+    with open(dest_path, "rb") as f:
+        assert f.read() == CONTENT
+    assert hasher.finish() == hashlib.sha256(CONTENT).hexdigest()
+    assert not os.path.exists(downloader.state_path)
+
+
+def test_segmented_download(tmp_path, serve):
+    root, base_url = serve()
+    (root / "build.zip").write_bytes(CONTENT)
+    download(tmp_path, f"{base_url}/build.zip")
+
+
+def test_ranges_without_validator_download_the_whole_body(tmp_path, serve):
+    root, base_url = serve(validators=False)
+    (root / "build.zip").write_bytes(CONTENT)
+    download(tmp_path, f"{base_url}/build.zip")
+
+
+def test_server_without_ranges(tmp_path, serve):
+    root, base_url = serve(ranges=False)
+    (root / "build.zip").write_bytes(CONTENT)
+    download(tmp_path, f"{base_url}/build.zip")
+
+
+def test_single_stream_restarts_after_a_broken_transfer(tmp_path, serve):
+    root, base_url = serve(ranges=False, fail_rate=0.5, seed=3)
+    (root / "build.zip").write_bytes(CONTENT)
+    dest_path = str(tmp_path / "download.zip")
+    hasher = StreamingHasher(dest_path)
+    transport = Transport(retries=20, backoff=0.01)
+    downloader = SegmentedDownloader(f"{base_url}/build.zip", dest_path, hasher=hasher, transport=transport)
+
+    assert downloader.download()
+    with open(dest_path, "rb") as f:
+        assert f.read() == CONTENT
+    assert hasher.finish() == hashlib.sha256(CONTENT).hexdigest()
+    assert transport.metrics.retries > 0
@@ -0,0 +1,73 @@
+import os
+import zipfile
+import threading
+
+import pytest
+
+from vsupdater.extract import extract_zip, member_target
+
+FILES = {f"resources/app/file{index}.js": os.urandom(1024 * (index + 1)) for index in range(16)}
+FILES["Code.exe"] = b"binary " * 50000
+FILES["empty.txt"] = b""
+
+
+def test_parallel_extraction_writes_every_member(tmp_path, make_archive):
+    archive_path = make_archive(tmp_path / "build.zip", FILES)
+    with zipfile.ZipFile(tmp_path / "deflated.zip", "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in FILES.items():
+            archive.writestr(name, data)
+    total = sum(len(data) for data in FILES.values())
+
+    for path in (archive_path, str(tmp_path / "deflated.zip")):
+        dest = tmp_path / os.path.basename(path)[:-4]
+        calls = []
+        assert extract_zip(path, str(dest), progress=lambda done, total: calls.append((done, total)), workers=4)
+        for name, data in FILES.items():
+            assert (dest / name).read_bytes() == data
+        assert calls[-1] == (total, total)
+        assert [done for done, _ in calls] == sorted(done for done, _ in calls)
+
+
+def test_corrupt_member_fails_the_crc_check(tmp_path, make_archive):
+    archive_path = make_archive(tmp_path / "build.zip", FILES)
+    with zipfile.ZipFile(archive_path) as archive:
+        info = archive.getinfo("Code.exe")
+    data = bytearray((tmp_path / "build.zip").read_bytes())
+    # Stored member: its data follows the 30-byte local header and the name
+    data[info.header_offset + 30 + len(info.filename) + 100] ^= 0xFF
+    (tmp_path / "build.zip").write_bytes(bytes(data))
+
+    with pytest.raises(zipfile.BadZipFile, match="CRC"):
+        extract_zip(archive_path, str(tmp_path / "out"), workers=4)
+
+
+@pytest.mark.parametrize("name", ["../evil.txt", "resources/../../evil.txt", "/etc/evil.txt", "C:/evil.txt", "./"])
+def test_member_target_rejects_names_escaping_the_destination(tmp_path, name):
+    with pytest.raises(zipfile.BadZipFile, match="Unsafe"):
+        member_target(str(tmp_path), zipfile.ZipInfo(name))
+
+
+def test_member_target_normalises_safe_names(tmp_path):
+    assert member_target(str(tmp_path), zipfile.ZipInfo("./resources//app/main.js")) == \
+        os.path.join(str(tmp_path), "resources", "app", "main.js")
+
+
+def test_archive_escaping_the_destination_writes_nothing(tmp_path, make_archive):
+    archive_path = make_archive(tmp_path / "build.zip", {"Code.exe": b"ok", "../evil.txt": b"evil"})
+
+    with pytest.raises(zipfile.BadZipFile):
+        extract_zip(archive_path, str(tmp_path / "out"), workers=4)
+    assert not (tmp_path / "evil.txt").exists()
+    assert not (tmp_path / "out").exists()
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_cancel_stops_before_the_remaining_members(tmp_path, make_archive, workers):
+    archive_path = make_archive(tmp_path / "build.zip", FILES)
+    cancel_event = threading.Event()
+    dest = tmp_path / "out"
+
+    assert not extract_zip(archive_path, str(dest), cancel_event=cancel_event,
+                           progress=lambda done, total: cancel_event.set(), workers=workers)
+    extracted = [name for name in FILES if (dest / name).exists()]
+    assert 0 < len(extracted) <= workers
@@ -0,0 +1,29 @@
+import os
+import threading
+
+from vsupdater.instrumentation import Instrumentation
+
+
+def test_overlapping_operations_are_profiled_one_at_a_time(tmp_path):
+    ends = []
+    started = threading.Barrier(3)
+
+    def run():
+        instrumentation = Instrumentation([ends.append], profile_dir=str(tmp_path))
+        with instrumentation.operation("update") as result:
+            started.wait()
+            sum(range(1000))
+            started.wait()
+            result["ok"] = True
+
+    threads = [threading.Thread(target=run) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    ends = [event for event in ends if event["event"] == "operation_end"]
+    assert [event["ok"] for event in ends] == [True] * 3
+    profiles = [event["profile"] for event in ends if event.get("profile")]
+    assert len(profiles) == 1
+    assert os.path.isfile(profiles[0])
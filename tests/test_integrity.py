@@ -0,0 +1,80 @@
+import os
+import hashlib
+
+from vsupdater.cache import ArchiveCache
+from vsupdater.engine import UpdateEngine
+from vsupdater.instrumentation import Instrumentation
+from vsupdater.integrity import StreamingHasher
+from vsupdater.version import Release
+
+CONTENT = os.urandom(1024 * 1024 + 5)
+CHUNK = 64 * 1024
+
+
+def chunks():
+    return [(offset, CONTENT[offset:offset + CHUNK]) for offset in range(0, len(CONTENT), CHUNK)]
+
+
+def test_out_of_order_chunks_are_hashed_in_stream(tmp_path):
+    path = tmp_path / "build.zip"
+    path.write_bytes(CONTENT)
+    hasher = StreamingHasher(str(path))
+    for offset, data in reversed(chunks()):
+        hasher.update(offset, data)
+
+    assert hasher.finish() == hashlib.sha256(CONTENT).hexdigest()
+    assert hasher.bytes_streamed == len(CONTENT)
+    assert hasher.bytes_reread == 0
+
+
+def test_chunks_beyond_the_buffer_are_read_back_from_disk(tmp_path):
+    path = tmp_path / "build.zip"
+    path.write_bytes(CONTENT)
+    hasher = StreamingHasher(str(path), max_pending=2 * CHUNK)
+    for offset, data in reversed(chunks()):
+        hasher.update(offset, data)
+
+    assert hasher.finish() == hashlib.sha256(CONTENT).hexdigest()
+    assert hasher.bytes_reread > 0
+    assert hasher.bytes_streamed + hasher.bytes_reread == len(CONTENT)
+
+
+def test_resumed_download_hashes_ranges_already_on_disk(tmp_path):
+    path = tmp_path / "build.zip"
+    path.write_bytes(CONTENT)
+    hasher = StreamingHasher(str(path))
+    half = len(CONTENT) // 2
+    # The second segment finished in an earlier run; the first resumes at 4096
+    hasher.mark_on_disk(half, len(CONTENT) - half)
+    hasher.update(4096, CONTENT[4096:half])
+    hasher.mark_on_disk(0, 4096)
+
+    assert hasher.finish() == hashlib.sha256(CONTENT).hexdigest()
+    assert hasher.bytes_streamed == half - 4096
+    assert hasher.bytes_reread == len(CONTENT) - hasher.bytes_streamed
+
+
+def test_reset_forgets_what_was_hashed(tmp_path):
+    path = tmp_path / "build.zip"
+    path.write_bytes(CONTENT)
+    hasher = StreamingHasher(str(path))
+    hasher.update(0, b"stale bytes from another source")
+    hasher.reset()
+    for offset, data in chunks():
+        hasher.update(offset, data)
+
+    assert hasher.finish() == hashlib.sha256(CONTENT).hexdigest()
+
+
+def test_a_download_with_the_wrong_hash_is_rejected(tmp_path, serve):
+    root, base_url = serve()
+    (root / "build.zip").write_bytes(CONTENT)
+    cache = ArchiveCache(str(tmp_path / "cache"))
+    engine = UpdateEngine(str(tmp_path / "vscode"), work_dir=str(tmp_path / "work"), cache_dir=cache.root,
+                          instrumentation=Instrumentation())
+    engine.release = Release("stable", "1.2.0", "abc", f"{base_url}/build.zip", sha256="0" * 64)
+
+    download_dir = tmp_path / "work" / "downloads"
+    assert engine.fetch_archive(str(download_dir)) is None
+    assert os.listdir(download_dir) == []
+    assert cache.entries() == []
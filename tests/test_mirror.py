@@ -0,0 +1,100 @@
+import os
+import json
+import time
+import hashlib
+import threading
+
+import pytest
+import requests
+
+from vsupdater.cache import ArchiveCache
+from vsupdater.mirror import BuildMirror, MirrorServer
+
+CONTENT = os.urandom(256 * 1024)
+SHA256 = hashlib.sha256(CONTENT).hexdigest()
+NAME = f"stable-abc-{SHA256}.zip"
+
+
+@pytest.fixture
+def mirror(tmp_path, serve, monkeypatch):
+    """A LAN mirror in front of a local upstream that publishes ``CONTENT``"""
+    monkeypatch.setenv("VSUPDATER_LOG_DIR", str(tmp_path / "logs"))
+    root, upstream_url = serve()
+    (root / "build.zip").write_bytes(CONTENT)
+    (root / "releases.json").write_text(json.dumps(
+        {"stable": {"file": "build.zip", "version": "1.2.0", "commit": "abc", "sha256": SHA256}}))
+
+    build_mirror = BuildMirror(ArchiveCache(str(tmp_path / "cache")), upstream_url)
+    server = MirrorServer(("127.0.0.1", 0), build_mirror)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield build_mirror, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def wait_for_build(build_mirror):
+    deadline = time.monotonic() + 10
+    while NAME not in build_mirror.verified:
+        assert time.monotonic() < deadline, build_mirror.status()
+        time.sleep(0.05)
+
+
+def mirrored_url(build_mirror, base_url):
+    """Mirror the published build and return its URL on the mirror"""
+    build_mirror.ensure("stable", {"version": "abc", "sha256hash": SHA256, "url": f"{build_mirror.upstream_api}/build.zip"})
+    wait_for_build(build_mirror)
+    return f"{base_url}/builds/{NAME}"
+
+
+def test_latest_points_at_the_mirror_once_the_build_is_verified(mirror):
+    build_mirror, base_url = mirror
+    api_url = f"{base_url}/api/update/win32-x64-archive/stable/latest"
+
+    first = requests.get(api_url).json()
+    assert "upstreamUrl" not in first
+    assert requests.get(f"{base_url}/builds/{NAME}").status_code == 404
+    wait_for_build(build_mirror)
+
+    data = requests.get(api_url).json()
+    assert data["url"] == f"{base_url}/builds/{NAME}"
+    assert data["upstreamUrl"] == first["url"]
+    assert requests.get(data["url"]).content == CONTENT
+    assert build_mirror.status()["stats"]["fetches"] == 1
+
+
+def test_builds_are_served_with_validators_and_conditional_gets(mirror):
+    build_mirror, base_url = mirror
+    url = mirrored_url(build_mirror, base_url)
+
+    response = requests.get(url)
+    assert response.headers["ETag"] == f'"{SHA256}"'
+    last_modified = response.headers["Last-Modified"]
+
+    for headers in ({"If-None-Match": f'"{SHA256}"'}, {"If-None-Match": "*"}, {"If-Modified-Since": last_modified}):
+        response = requests.get(url, headers=headers)
+        assert response.status_code == 304
+        assert response.content == b""
+    assert requests.get(url, headers={"If-None-Match": '"other"'}).status_code == 200
+    assert build_mirror.status()["stats"]["not_modified"] == 3
+
+
+def test_if_range_falls_back_to_the_whole_build_when_stale(mirror):
+    build_mirror, base_url = mirror
+    url = mirrored_url(build_mirror, base_url)
+
+    response = requests.get(url, headers={"Range": "bytes=100-199", "If-Range": f'"{SHA256}"'})
+    assert response.status_code == 206
+    assert response.headers["Content-Range"] == f"bytes 100-199/{len(CONTENT)}"
+    assert response.content == CONTENT[100:200]
+
+    response = requests.get(url, headers={"Range": "bytes=-10"})
+    assert response.status_code == 206
+    assert response.content == CONTENT[-10:]
+
+    response = requests.get(url, headers={"Range": "bytes=100-199", "If-Range": '"stale"'})
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+    response = requests.get(url, headers={"Range": f"bytes={len(CONTENT)}-"})
+    assert response.status_code == 416
+    assert response.headers["Content-Range"] == f"bytes */{len(CONTENT)}"
@@ -0,0 +1,36 @@
+import os
+import threading
+
+from vsupdater.placement import TreePlacer, COPY_CHUNK_SIZE, TEMP_SUFFIX
+
+
+def make_tree(root, files):
+    for name, data in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+
+
+def test_copy_places_every_file(tmp_path):
+    files = {"Code.exe": os.urandom(3 * COPY_CHUNK_SIZE // 2), "resources/app/main.js": b"js", "empty.txt": b""}
+    make_tree(tmp_path / "source", files)
+    placer = TreePlacer(str(tmp_path / "source"), str(tmp_path / "dest"), move=False, workers=2)
+
+    assert placer.place()
+    for name, data in files.items():
+        assert (tmp_path / "dest" / name).read_bytes() == data
+    assert sum(placer.counts.values()) == len(files)
+
+
+def test_cancel_inside_a_file_keeps_the_old_file(tmp_path):
+    make_tree(tmp_path / "source", {"Code.exe": os.urandom(3 * COPY_CHUNK_SIZE)})
+    make_tree(tmp_path / "dest", {"Code.exe": b"old build"})
+    cancel_event = threading.Event()
+    placer = TreePlacer(str(tmp_path / "source"), str(tmp_path / "dest"), move=False, cancel_event=cancel_event,
+                        progress=lambda done, total: cancel_event.set(), workers=1)
+    # A reflink is all or nothing; stop partway through a kernel or buffered copy
+    placer.use_reflink = False
+
+    assert not placer.place()
+    assert (tmp_path / "dest" / "Code.exe").read_bytes() == b"old build"
+    assert not (tmp_path / "dest" / ("Code.exe" + TEMP_SUFFIX)).exists()
@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+from vsupdater.engine import UpdateEngine, APPLY_DELTA, APPLY_REMOTE_DELTA
+from vsupdater.instrumentation import Instrumentation
+from vsupdater.remotezip import RangeNotSupported, RemoteZipReader
+from vsupdater.transport import Transport
+from vsupdater.version import Release
+
+# Large enough that one changed member stays well below MAX_PREFETCH_FRACTION
+UNCHANGED = {f"resources/app/file-{index}.js": os.urandom(64 * 1024) for index in range(16)}
+
+
+def make_engine(folder, work_dir, apply_mode, url=None):
+    engine = UpdateEngine(str(folder), apply_mode=apply_mode, work_dir=str(work_dir), use_cache=False,
+                          instrumentation=Instrumentation())
+    if url:
+        engine.release = Release("stable", "1.2.0", "commit", url)
+    return engine
+
+
+def install_old_build(tmp_path, folder, make_archive):
+    folder.mkdir()
+    old = make_archive(tmp_path / "old.zip", dict(UNCHANGED, **{"Code.exe": b"old", "old.dll": b"1"}))
+    assert make_engine(folder, tmp_path, APPLY_DELTA).apply_delta(old)
+
+
+def test_remote_delta_keeps_user_files(tmp_path, serve, make_archive):
+    root, base_url = serve()
+    folder = tmp_path / "vscode"
+    install_old_build(tmp_path, folder, make_archive)
+    (folder / "notes.txt").write_text("mine")
+    make_archive(root / "new.zip", dict(UNCHANGED, **{"Code.exe": b"new"}))
+
+    assert make_engine(folder, tmp_path, APPLY_REMOTE_DELTA, f"{base_url}/new.zip").apply_remote_delta()
+
+    assert (folder / "Code.exe").read_bytes() == b"new"
+    assert not (folder / "old.dll").exists()
+    assert (folder / "notes.txt").read_text() == "mine"
+
+
+def test_remote_delta_falls_back_when_most_of_the_archive_changed(tmp_path, serve, make_archive):
+    root, base_url = serve()
+    folder = tmp_path / "vscode"
+    install_old_build(tmp_path, folder, make_archive)
+    make_archive(root / "new.zip", {name: os.urandom(len(data)) for name, data in UNCHANGED.items()})
+
+    assert make_engine(folder, tmp_path, APPLY_REMOTE_DELTA, f"{base_url}/new.zip").apply_remote_delta() is None
+    assert (folder / "old.dll").exists()
+
+
+def test_reader_requires_a_validator(tmp_path, serve, make_archive):
+    root, base_url = serve(validators=False)
+    make_archive(root / "new.zip", UNCHANGED)
+
+    with pytest.raises(RangeNotSupported):
+        RemoteZipReader.open(Transport(), f"{base_url}/new.zip")
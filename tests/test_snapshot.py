@@ -0,0 +1,111 @@
+import os
+
+import pytest
+
+from vsupdater.snapshot import SnapshotStore, METHOD_COPY, METHOD_KEEP, METHOD_LINK
+
+FILES = {
+    "user-data/User/settings.json": b'{"editor.fontSize": 14}',
+    "user-data/state.vscdb": os.urandom(64 * 1024),
+    "extensions/ms-python/package.json": b"{}",
+}
+
+
+def make_data(folder, files=FILES):
+    for name, data in files.items():
+        path = folder / "data" / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+
+
+def read_data(folder):
+    data_path = folder / "data"
+    return {path.relative_to(data_path).as_posix(): path.read_bytes()
+            for path in data_path.rglob("*") if path.is_file()}
+
+
+def snapshot_file(store, snapshot_id, name):
+    return os.path.join(store.snapshot_data_path(snapshot_id), name)
+
+
+def test_unchanged_files_are_hardlinked_between_snapshots(tmp_path):
+    folder = tmp_path / "vscode"
+    make_data(folder)
+    store = SnapshotStore(str(folder))
+    first = store.create()
+    assert store.stats[METHOD_COPY] == len(FILES)
+
+    (folder / "data" / "user-data/User/settings.json").write_bytes(b'{"editor.fontSize": 16, "editor.wordWrap": "on"}')
+    second = store.create()
+
+    assert store.stats[METHOD_LINK] == len(FILES) - 1
+    assert store.stats[METHOD_COPY] == 1
+    for name in FILES:
+        first_stat, second_stat = os.stat(snapshot_file(store, first, name)), os.stat(snapshot_file(store, second, name))
+        assert (first_stat.st_ino == second_stat.st_ino) == (name != "user-data/User/settings.json")
+        # Never linked to the live file, which VS Code rewrites in place
+        assert os.stat(folder / "data" / name).st_ino != second_stat.st_ino
+
+
+def test_verify_hash_copies_a_change_that_kept_size_and_mtime(tmp_path):
+    folder = tmp_path / "vscode"
+    make_data(folder)
+    store = SnapshotStore(str(folder), verify_hash=True)
+    store.create()
+
+    path = folder / "data" / "user-data/state.vscdb"
+    stat = os.stat(path)
+    path.write_bytes(os.urandom(stat.st_size))
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    snapshot_id = store.create()
+
+    assert store.stats[METHOD_COPY] == 1
+    with open(snapshot_file(store, snapshot_id, "user-data/state.vscdb"), "rb") as f:
+        assert f.read() == path.read_bytes()
+
+
+def test_only_the_newest_snapshots_are_kept(tmp_path):
+    folder = tmp_path / "vscode"
+    make_data(folder)
+    store = SnapshotStore(str(folder), keep=2)
+    created = []
+    for index in range(4):
+        (folder / "data" / "counter.txt").write_text(str(index))
+        created.append(store.create())
+
+    assert store.snapshot_ids() == created[-2:]
+    # Pruning the snapshots they were linked from leaves the kept ones intact
+    for snapshot_id in created[-2:]:
+        for name, data in FILES.items():
+            with open(snapshot_file(store, snapshot_id, name), "rb") as f:
+                assert f.read() == data
+
+
+def test_restore_puts_data_back_in_place(tmp_path):
+    folder = tmp_path / "vscode"
+    make_data(folder)
+    store = SnapshotStore(str(folder))
+    snapshot_id = store.create()
+    kept_inode = os.stat(folder / "data" / "user-data/state.vscdb").st_ino
+
+    (folder / "data" / "user-data/User/settings.json").write_bytes(b"{}")
+    (folder / "data" / "extensions/ms-python/package.json").unlink()
+    make_data(folder, {"extensions/new-extension/package.json": b"{}", "user-data/new.log": b"log"})
+
+    assert store.restore(snapshot_id)
+    assert read_data(folder) == FILES
+    assert not (folder / "data" / "extensions/new-extension").exists()
+    assert os.stat(folder / "data" / "user-data/state.vscdb").st_ino == kept_inode
+    assert store.stats[METHOD_KEEP] == 1
+    assert store.stats[METHOD_COPY] == 2
+    assert store.stats["removed"] == 2
+
+
+def test_restore_without_a_snapshot_raises(tmp_path):
+    folder = tmp_path / "vscode"
+    make_data(folder)
+    store = SnapshotStore(str(folder))
+    with pytest.raises(ValueError):
+        store.restore()
+    with pytest.raises(ValueError):
+        store.restore("20250101-000000-000000")
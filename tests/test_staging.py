@@ -0,0 +1,84 @@
+import json
+
+from vsupdater import cli
+from vsupdater.engine import UpdateEngine, APPLY_STAGED
+from vsupdater.instrumentation import Instrumentation
+from vsupdater.staging import FolderLocked, StagedInstall
+
+
+def apply_staged(folder, archive_path, work_dir):
+    engine = UpdateEngine(str(folder), apply_mode=APPLY_STAGED, work_dir=str(work_dir), instrumentation=Instrumentation())
+    return engine.apply_staged(archive_path)
+
+
+def install_two_builds(tmp_path, make_archive):
+    folder = tmp_path / "vscode"
+    old = make_archive(tmp_path / "old.zip", {"Code.exe": b"old", "resources/app/old.js": b"1"})
+    new = make_archive(tmp_path / "new.zip", {"Code.exe": b"new", "resources/app/new.js": b"2"})
+    assert apply_staged(folder, old, tmp_path)
+    (folder / "data").mkdir()
+    (folder / "data" / "settings.json").write_text("{}")
+    (folder / "notes.txt").write_text("mine")
+    (folder / "resources" / "app" / "my-patch.js").write_text("mine")
+    assert apply_staged(folder, new, tmp_path)
+    return folder
+
+
+def test_swap_carries_over_data_and_user_files(tmp_path, make_archive):
+    folder = install_two_builds(tmp_path, make_archive)
+
+    assert (folder / "Code.exe").read_bytes() == b"new"
+    assert not (folder / "resources" / "app" / "old.js").exists()
+    assert (folder / "data" / "settings.json").read_text() == "{}"
+    assert (folder / "notes.txt").read_text() == "mine"
+    assert (folder / "resources" / "app" / "my-patch.js").read_text() == "mine"
+
+
+def test_rollback_takes_data_and_user_files_along(tmp_path, make_archive):
+    folder = install_two_builds(tmp_path, make_archive)
+
+    assert StagedInstall(str(folder)).rollback()
+
+    assert (folder / "Code.exe").read_bytes() == b"old"
+    assert (folder / "resources" / "app" / "old.js").exists()
+    assert (folder / "data" / "settings.json").read_text() == "{}"
+    assert (folder / "notes.txt").read_text() == "mine"
+    assert (folder / "resources" / "app" / "my-patch.js").read_text() == "mine"
+    assert not StagedInstall(str(folder)).has_previous
+
+
+def test_locked_folder_falls_back_to_copying(tmp_path, monkeypatch, make_archive):
+    folder = tmp_path / "vscode"
+    assert apply_staged(folder, make_archive(tmp_path / "old.zip", {"Code.exe": b"old"}), tmp_path)
+
+    def locked(self, log=None):
+        raise FolderLocked(13, "Permission denied", self.folder_path)
+
+    monkeypatch.setattr(StagedInstall, "swap", locked)
+    assert apply_staged(folder, make_archive(tmp_path / "new.zip", {"Code.exe": b"new"}), tmp_path)
+    assert (folder / "Code.exe").read_bytes() == b"new"
+    assert not (tmp_path / ".vscode.vsupdater-staging").exists()
+
+
+def test_cli_rollback(tmp_path, capsys, monkeypatch, make_archive):
+    monkeypatch.setenv("VSUPDATER_EVENT_LOG", "0")
+    folder = install_two_builds(tmp_path, make_archive)
+
+    assert cli.main([str(folder), "--rollback", "--quiet"]) == 0
+    summary = json.loads(capsys.readouterr().out)
+    assert [task["status"] for task in summary["folders"]] == [cli.STATUS_ROLLED_BACK]
+    assert (folder / "Code.exe").read_bytes() == b"old"
+
+    assert cli.main([str(folder), "--rollback", "--quiet"]) == 1
+
+
+def test_fresh_install_keeps_no_previous_version(tmp_path, make_archive):
+    folder = tmp_path / "vscode"
+    folder.mkdir()
+    assert apply_staged(folder, make_archive(tmp_path / "new.zip", {"Code.exe": b"new"}), tmp_path)
+
+    staged = StagedInstall(str(folder))
+    assert (folder / "Code.exe").read_bytes() == b"new"
+    assert not staged.has_previous
+    assert not (tmp_path / ".vscode.vsupdater-previous").exists()
+    assert not staged.rollback()
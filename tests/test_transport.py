@@ -0,0 +1,97 @@
+import os
+import time
+
+import pytest
+import requests
+
+from vsupdater.transport import RetryableStatus, Transport, parse_retry_after
+
+CONTENT = os.urandom(512 * 1024)
+
+
+def fetch(transport, url):
+    """Download ``url`` whole, retrying the request and the body read together"""
+    return transport.call(lambda: transport.get(url, retries=0).content)
+
+
+def server_stats(base_url):
+    return requests.get(f"{base_url}/_stats").json()
+
+
+def test_injected_503s_are_retried(tmp_path, serve):
+    root, base_url = serve(error_rate=0.5, seed=1)
+    (root / "build.zip").write_bytes(CONTENT)
+    # The server asks for Retry-After: 1; max_backoff caps that
+    transport = Transport(retries=20, backoff=0.01, max_backoff=0.02)
+
+    for _ in range(5):
+        assert transport.get(f"{base_url}/build.zip").content == CONTENT
+    errors = server_stats(base_url)["errors"]
+    assert errors > 0
+    assert transport.metrics.retries == errors
+    assert transport.metrics.statuses["503"] == errors
+    assert transport.metrics.errors == {"RetryableStatus": errors}
+    assert transport.metrics.failures == 0
+
+
+def test_retries_give_up_after_the_limit(tmp_path, serve):
+    root, base_url = serve(error_rate=1.0)
+    (root / "build.zip").write_bytes(CONTENT)
+    transport = Transport(retries=2, backoff=0.01, max_backoff=0.02)
+
+    with pytest.raises(RetryableStatus) as error:
+        transport.get(f"{base_url}/build.zip")
+    assert error.value.response.status_code == 503
+    assert error.value.retry_after == 1
+    assert transport.metrics.requests == 3
+    assert transport.metrics.failures == 1
+
+
+def test_connections_reset_mid_body_are_retried(tmp_path, serve):
+    root, base_url = serve(fail_rate=0.5, seed=2)
+    (root / "build.zip").write_bytes(CONTENT)
+    transport = Transport(retries=20, backoff=0.01)
+
+    for _ in range(5):
+        assert fetch(transport, f"{base_url}/build.zip") == CONTENT
+    assert server_stats(base_url)["faults"] > 0
+    assert transport.metrics.retries == server_stats(base_url)["faults"]
+
+
+def test_stalled_responses_time_out_and_are_retried(tmp_path, serve):
+    root, base_url = serve(stall_rate=0.5, stall_seconds=2, seed=3)
+    (root / "build.zip").write_bytes(CONTENT)
+    transport = Transport(retries=20, timeout=(5, 0.3), backoff=0.01)
+
+    for _ in range(3):
+        assert fetch(transport, f"{base_url}/build.zip") == CONTENT
+    assert server_stats(base_url)["stalls"] > 0
+    assert transport.metrics.retries >= server_stats(base_url)["stalls"]
+
+
+def test_should_stop_ends_the_backoff_early(tmp_path, serve):
+    root, base_url = serve(error_rate=1.0)
+    (root / "build.zip").write_bytes(CONTENT)
+    transport = Transport(retries=10, backoff=30, max_backoff=30)
+    started = time.monotonic()
+
+    with pytest.raises(RetryableStatus):
+        transport.get(f"{base_url}/build.zip", should_stop=lambda: time.monotonic() - started > 0.2)
+    assert time.monotonic() - started < 2
+    assert transport.metrics.failures == 1
+
+
+def test_backoff_grows_with_equal_jitter_up_to_the_cap():
+    transport = Transport(backoff=1, max_backoff=5)
+    for attempt, ceiling in enumerate([1, 2, 4, 5, 5]):
+        delays = [transport.backoff_delay(attempt) for _ in range(50)]
+        assert all(ceiling / 2 <= delay <= ceiling for delay in delays)
+    assert transport.backoff_delay(0, retry_after=3) == 3
+    assert transport.backoff_delay(0, retry_after=60) == 5
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("7") == 7
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
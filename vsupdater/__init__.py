@@ -0,0 +1 @@
+"""Core (UI-free) building blocks of the VS Code updater"""
@@ -0,0 +1,129 @@
+import os
+import re
+import time
+import uuid
+import shutil
+
+from .constants import user_data_path
+from .integrity import sha256_file
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+ENTRY_PATTERN = re.compile(r"^(stable|insider)-([0-9a-f]+)-([0-9a-f]{64})\.zip$")
+
+
+class ArchiveCache:
+    """Content-addressed store of downloaded VS Code archives
+
+    Entries are keyed by quality, commit and SHA-256 and are shared between
+    install folders and between runs. New entries are written to a unique
+    temporary name inside the cache directory and renamed into place, so two
+    updaters storing the same build at once never expose a half-written file.
+    Reads are verified against the SHA-256 in the key. Total size is bounded
+    by ``max_bytes`` with least-recently-used eviction; a hit refreshes the
+    entry's mtime, which doubles as the LRU clock.
+    """
+
+    def __init__(self, root=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root or user_data_path("cache", "VSUPDATER_CACHE_DIR")
+        self.max_bytes = max_bytes
+
+    def entry_path(self, quality, commit, sha256):
+        return os.path.join(self.root, f"{quality}-{commit}-{sha256.lower()}.zip")
+
+    def lookup(self, quality, commit, sha256, cancel_event=None):
+        """Return the verified path of a cached build, or None on a miss"""
+        if not (commit and sha256):
+            return None
+
+        path = self.entry_path(quality, commit, sha256)
+        if not os.path.isfile(path):
+            return None
+
+        actual = sha256_file(path, cancel_event)
+        if actual is None:
+            return None
+        if actual != sha256.lower():
+            # Corrupted on disk; drop it so it gets downloaded again
+            self.remove(path)
+            return None
+
+        self.touch(path)
+        return path
+
+    def store(self, source_path, quality, commit, sha256, move=True):
+        """Atomically add ``source_path`` to the cache and return the entry path"""
+        os.makedirs(self.root, exist_ok=True)
+        final_path = self.entry_path(quality, commit, sha256)
+        temp_path = os.path.join(self.root, f".{uuid.uuid4().hex}.partial")
+
+        try:
+            if move:
+                try:
+                    os.replace(source_path, temp_path)
+                except OSError:
+                    # Different volume: fall back to a copy
+                    shutil.copyfile(source_path, temp_path)
+                    os.remove(source_path)
+            else:
+                shutil.copyfile(source_path, temp_path)
+
+            try:
+                os.replace(temp_path, final_path)
+            except PermissionError:
+                # Another run holds the same entry open (Windows); theirs is identical
+                if not os.path.isfile(final_path):
+                    raise
+        finally:
+            self.remove(temp_path)
+
+        self.touch(final_path)
+        self.evict(keep=final_path)
+        return final_path
+
+    def entries(self):
+        """List ``(path, size, mtime)`` for every complete entry"""
+        result = []
+        try:
+            with os.scandir(self.root) as it:
+                for entry in it:
+                    if not ENTRY_PATTERN.match(entry.name):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    result.append((entry.path, stat.st_size, stat.st_mtime))
+        except FileNotFoundError:
+            pass
+        return result
+
+    def evict(self, keep=None):
+        """Delete least recently used entries until the cache fits ``max_bytes``"""
+        entries = sorted(self.entries(), key=lambda item: item[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            if self.remove(path):
+                total -= size
+
+    @staticmethod
+    def touch(path):
+        try:
+            now = time.time()
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+
+    @staticmethod
+    def remove(path):
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+        except OSError:
+            # Still open by a concurrent run on Windows; eviction retries later
+            return False
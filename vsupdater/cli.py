@@ -0,0 +1,483 @@
+"""Headless batch updater: update many VS Code folders from one download per build
+
+    python -m vsupdater D:\\tools\\vscode-a D:\\tools\\vscode-b --concurrency 4
+    python -m vsupdater --root D:\\agents --apply-mode delta
+    python -m vsupdater --root D:\\agents --list
+    python -m vsupdater D:\\tools\\vscode-a --check
+    python -m vsupdater D:\\tools\\vscode-a --restore-data
+    python -m vsupdater D:\\tools\\vscode-a --rollback
+
+Prints a JSON summary on stdout; log lines go to stderr. Exit status is 0
+when every folder is up to date or was updated, 1 if any folder failed and
+130 when interrupted; ``--check`` exits with 3 when an update is available.
+This module must not import PySide6. The engine and the network stack are
+imported only by the code paths that use them.
+"""
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .constants import (APPLY_MODES, APPLY_REMOTE_DELTA, APPLY_STAGED, CONNECT_TIMEOUT, DEFAULT_CONNECTIONS,
+                        DEFAULT_EXTRACT_WORKERS, DEFAULT_RETRIES, READ_TIMEOUT)
+from .discovery import DEFAULT_SCAN_DEPTH, discover
+from .snapshot import DEFAULT_KEEP as DEFAULT_SNAPSHOT_KEEP
+from .version import MIRROR_URL, detect_quality, fetch_latest_release, read_installed_build
+
+DEFAULT_CONCURRENCY = 4
+EXIT_UPDATE_AVAILABLE = 3
+
+STATUS_UP_TO_DATE = "up-to-date"
+STATUS_UPDATED = "updated"
+STATUS_INSTALLED = "installed"
+STATUS_SKIPPED = "skipped"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"
+STATUS_RESTORED = "restored"
+STATUS_ROLLED_BACK = "rolled-back"
+STATUS_UPDATE_AVAILABLE = "update-available"
+
+
+class FolderTask:
+    """What one folder needs and how it went"""
+
+    def __init__(self, path, quality, is_install_operation):
+        self.path = path
+        self.quality = quality
+        self.is_install_operation = is_install_operation
+        self.installed = None
+        self.release = None
+        self.status = None
+        self.error = None
+        self.seconds = 0.0
+        self.phases = {}
+
+    def record_event(self, event):
+        """Instrumentation listener summing phase durations for the summary"""
+        if event["event"] == "phase":
+            self.phases[event["phase"]] = round(self.phases.get(event["phase"], 0.0) + event["seconds"], 6)
+
+    def to_json(self):
+        return {
+            "path": self.path,
+            "quality": self.quality,
+            "installed_version": self.installed.version if self.installed else None,
+            "installed_commit": self.installed.commit if self.installed else None,
+            "target_version": self.release.version if self.release else None,
+            "target_commit": self.release.commit if self.release else None,
+            "status": self.status,
+            "error": self.error,
+            "seconds": round(self.seconds, 3),
+            "phases": self.phases,
+        }
+
+
+class BatchUpdater:
+    """Plan, download once per distinct build, then apply to folders in parallel"""
+
+    def __init__(self, options, log=None):
+        from .transport import Transport
+
+        self.options = options
+        self.log_callback = log
+        self.cancel_event = threading.Event()
+        self.downloads = []
+        # One connection pool for the whole batch
+        self.transport = Transport(retries=options.retries, timeout=(CONNECT_TIMEOUT, options.timeout))
+        self._engines = []
+        self._builds = {}
+        self._build_locks = {}
+        # Reentrant: the SIGINT handler calls cancel() on the main thread, possibly inside make_engine
+        self._lock = threading.RLock()
+
+    def log_message(self, message, folder=None):
+        if self.log_callback:
+            self.log_callback(f"[{folder}] {message}" if folder else message)
+
+    def cancel(self):
+        self.cancel_event.set()
+        with self._lock:
+            for engine in self._engines:
+                engine.cancel()
+
+    def make_engine(self, folder_path, quality, log=None):
+        from .engine import UpdateEngine
+
+        engine = UpdateEngine(
+            folder_path,
+            is_insider=quality == "insider",
+            is_portable=self.options.portable,
+            log=log,
+            download_connections=self.options.connections,
+            download_mmap=self.options.mmap,
+            update_api_url=self.options.update_api,
+            mirror_url=self.options.mirror,
+            transport=self.transport,
+            use_cache=not self.options.no_cache,
+            cache_dir=self.options.cache_dir,
+            apply_mode=self.options.apply_mode,
+            extract_workers=self.options.extract_workers,
+            snapshot_keep=self.options.snapshots,
+            snapshot_hash=self.options.snapshot_hash,
+        )
+        with self._lock:
+            self._engines.append(engine)
+            if self.cancel_event.is_set():
+                engine.cancel()
+        return engine
+
+    def plan(self, folders):
+        """Work out quality, installed build and target build for every folder"""
+        import requests
+
+        tasks = []
+        for folder in folders:
+            quality = detect_quality(folder)
+            if quality is None and not self.options.install:
+                task = FolderTask(folder, None, False)
+                task.status = STATUS_SKIPPED
+                task.error = "No VS Code installation found"
+                tasks.append(task)
+                continue
+            task = FolderTask(folder, quality or self.options.quality, quality is None)
+            task.installed = read_installed_build(folder) if quality else None
+            tasks.append(task)
+
+        releases = {}
+        for task in tasks:
+            if task.status is not None:
+                continue
+            if task.quality not in releases:
+                try:
+                    releases[task.quality] = fetch_latest_release(
+                        task.quality, self.options.update_api, mirror_url=self.options.mirror or MIRROR_URL,
+                        log=self.log_message, transport=self.transport)
+                    self.log_message(f"Latest {task.quality} build: {releases[task.quality].version} "
+                                     f"({releases[task.quality].commit}) from {releases[task.quality].source}")
+                except (requests.exceptions.RequestException, ValueError) as e:
+                    releases[task.quality] = None
+                    self.log_message(f"ERROR: Could not check the latest {task.quality} version: {e}")
+            task.release = releases[task.quality]
+            if task.release is None:
+                task.status = STATUS_FAILED
+                task.error = "Latest version unknown"
+            elif (not task.is_install_operation and task.installed is not None
+                  and task.installed.commit == task.release.commit):
+                task.status = STATUS_UP_TO_DATE
+        return tasks
+
+    def fetch_builds(self, tasks, work_dir):
+        """Download (or take from cache) each distinct build exactly once"""
+        archives = {}
+        for task in tasks:
+            if task.status is not None:
+                continue
+            key = (task.quality, task.release.commit)
+            if key in archives:
+                continue
+            same_build = [other for other in tasks if other.status is None and other.release is task.release]
+            if (self.options.apply_mode == APPLY_REMOTE_DELTA
+                    and not any(other.is_install_operation for other in same_build)
+                    and self.serves_ranges(task)):
+                # Every folder fetches just its own changed members
+                archives[key] = None
+                continue
+
+            archives[key] = self.fetch_build(task, work_dir)
+            if archives[key] is None:
+                for other in same_build:
+                    other.status = STATUS_CANCELLED if self.cancel_event.is_set() else STATUS_FAILED
+                    other.error = "Download failed"
+        return archives
+
+    def serves_ranges(self, task):
+        """Whether the build's server allows remote-delta updates; otherwise the full archive is fetched once"""
+        import requests
+        from .remotezip import RangeNotSupported, RemoteZipReader
+
+        try:
+            RemoteZipReader.open(self.transport, task.release.url)
+            return True
+        except RangeNotSupported:
+            self.log_message("Notice: Server does not support safe ranged requests; downloading the full archive "
+                             "once for all folders.", task.quality)
+        except requests.exceptions.RequestException as e:
+            self.log_message(f"Notice: Could not read the remote archive ({e}); downloading the full archive.",
+                             task.quality)
+        return False
+
+    def fetch_build(self, task, work_dir):
+        """Path of the full archive of ``task``'s build, downloaded (or taken from cache) once per batch
+
+        Safe to call from several folders at once; later callers wait for the
+        first download and get its result. Returns None when it failed.
+        """
+        key = (task.quality, task.release.commit)
+        with self._lock:
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+        with build_lock:
+            if key not in self._builds:
+                self._builds[key] = self.download_build(task, work_dir)
+            return self._builds[key]
+
+    def download_build(self, task, work_dir):
+        import requests
+
+        started = time.perf_counter()
+        quality = task.quality
+        engine = self.make_engine(None, quality, log=lambda message: self.log_message(message, quality))
+        engine.release = task.release
+        download_dir = os.path.join(work_dir, "downloads")
+        os.makedirs(download_dir, exist_ok=True)
+        try:
+            archive_path = engine.fetch_archive(download_dir)
+        except requests.exceptions.RequestException as e:
+            self.log_message(f"NETWORK ERROR: {e}", task.quality)
+            archive_path = None
+        with self._lock:
+            self.downloads.append({
+                "quality": task.quality,
+                "version": task.release.version,
+                "commit": task.release.commit,
+                "archive": archive_path,
+                "cached": bool(archive_path and engine.is_cached(archive_path)),
+                "seconds": round(time.perf_counter() - started, 3),
+            })
+        return archive_path
+
+    def apply_one(self, task, archive_path, work_dir, index):
+        """Install ``archive_path`` (or remote-delta update) into one folder"""
+        started = time.perf_counter()
+        engine = self.make_engine(task.path, task.quality, log=lambda message: self.log_message(message, task.path))
+        engine.release = task.release
+        engine.instrumentation.add_listener(task.record_event)
+        temp_dir = os.path.join(work_dir, f"temp-{index}")
+        operation = "install" if task.is_install_operation else "update"
+        with engine.instrumentation.operation(operation, folder=task.path, quality=task.quality,
+                                              apply_mode=engine.apply_mode, batch=True) as result:
+            try:
+                if not task.is_install_operation:
+                    engine.snapshot_data()
+                if engine.cancel_requested:
+                    applied = False
+                elif archive_path is None:
+                    applied = engine.apply_remote_delta()
+                    if applied is None:
+                        # Too much changed for ranged reads: use the full archive, fetched once for the batch
+                        archive_path = self.fetch_build(task, work_dir)
+                        applied = archive_path is not None and engine.apply_archive(
+                            archive_path, temp_dir, task.is_install_operation)
+                else:
+                    applied = engine.apply_archive(archive_path, temp_dir, task.is_install_operation)
+                if applied and not engine.cancel_requested:
+                    applied = engine.finish_install(task.is_install_operation)
+            except Exception as e:
+                engine.log_message(f"AN UNEXPECTED ERROR OCCURRED: {e}")
+                task.error = str(e)
+                applied = False
+            finally:
+                engine.cleanup_temp_dir(temp_dir)
+            result["ok"] = applied
+            result["cancelled"] = engine.cancel_requested
+
+        if engine.cancel_requested:
+            task.status = STATUS_CANCELLED
+        elif applied:
+            task.status = STATUS_INSTALLED if task.is_install_operation else STATUS_UPDATED
+        else:
+            task.status = STATUS_FAILED
+            task.error = task.error or "See log output"
+        task.seconds = time.perf_counter() - started
+
+    def check(self, folders):
+        """Plan only: which folders have a newer build than the one installed"""
+        tasks = self.plan(folders)
+        for task in tasks:
+            if task.status is None:
+                task.status = STATUS_UPDATE_AVAILABLE
+        return tasks
+
+    def restore_data(self, folders, snapshot_id=None):
+        """Put each folder's portable data folder back from a snapshot (the newest by default)"""
+        tasks = []
+        for folder in folders:
+            started = time.perf_counter()
+            task = FolderTask(folder, detect_quality(folder), False)
+            engine = self.make_engine(folder, task.quality, log=lambda message: self.log_message(message, folder))
+            engine.instrumentation.add_listener(task.record_event)
+            with engine.instrumentation.operation("restore-data", folder=folder, snapshot=snapshot_id,
+                                                  batch=True) as result:
+                result["ok"] = engine.restore_data(snapshot_id)
+            task.status = STATUS_RESTORED if result["ok"] else STATUS_FAILED
+            if not result["ok"]:
+                task.error = "See log output"
+            task.seconds = time.perf_counter() - started
+            tasks.append(task)
+        return tasks
+
+    def rollback(self, folders):
+        """Put back the version each folder's last staged update replaced"""
+        tasks = []
+        for folder in folders:
+            started = time.perf_counter()
+            task = FolderTask(folder, detect_quality(folder), False)
+            engine = self.make_engine(folder, task.quality, log=lambda message: self.log_message(message, folder))
+            engine.instrumentation.add_listener(task.record_event)
+            with engine.instrumentation.operation("rollback", folder=folder, batch=True) as result:
+                result["ok"] = engine.rollback()
+            task.status = STATUS_ROLLED_BACK if result["ok"] else STATUS_FAILED
+            if not result["ok"]:
+                task.error = "See log output"
+            task.seconds = time.perf_counter() - started
+            task.installed = read_installed_build(folder) if result["ok"] else None
+            tasks.append(task)
+        return tasks
+
+    def run(self, folders):
+        work_dir = self.options.work_dir or os.path.join(os.path.dirname(os.path.abspath(sys.executable)), "temp-batch")
+        tasks = self.plan(folders)
+        archives = self.fetch_builds(tasks, work_dir)
+
+        pending = [task for task in tasks if task.status is None]
+        executor = ThreadPoolExecutor(max_workers=max(1, self.options.concurrency))
+        try:
+            futures = [
+                executor.submit(self.apply_one, task, archives[(task.quality, task.release.commit)], work_dir, index)
+                for index, task in enumerate(pending)
+            ]
+            for future in futures:
+                future.result()
+        except KeyboardInterrupt:
+            # Stop the running folders at their next check and drop the queued ones
+            self.cancel()
+            executor.shutdown(cancel_futures=True)
+            raise
+        finally:
+            executor.shutdown()
+
+        # Downloads that did not go into the cache are only needed for this batch
+        for download in self.downloads:
+            archive_path = download["archive"]
+            if archive_path and not download["cached"] and os.path.exists(archive_path):
+                os.remove(archive_path)
+        return tasks
+
+    def summary(self, tasks):
+        failed = [task for task in tasks if task.status in (STATUS_FAILED, STATUS_CANCELLED)]
+        return {
+            "ok": not failed,
+            "folders": [task.to_json() for task in tasks],
+            "downloads": self.downloads,
+            "counts": {status: sum(1 for task in tasks if task.status == status)
+                       for status in (STATUS_UPDATED, STATUS_INSTALLED, STATUS_UP_TO_DATE,
+                                      STATUS_SKIPPED, STATUS_FAILED, STATUS_CANCELLED, STATUS_RESTORED,
+                                      STATUS_ROLLED_BACK, STATUS_UPDATE_AVAILABLE)},
+            "network": self.transport.metrics.snapshot(),
+        }
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="vsupdater", description="Update VS Code folders without the GUI")
+    parser.add_argument("folders", nargs="*", help="Installation folders to update")
+    parser.add_argument("--root", action="append", default=[], help="Scan this directory for installations (repeatable)")
+    parser.add_argument("--depth", type=int, default=DEFAULT_SCAN_DEPTH, help="How deep --root is scanned")
+    parser.add_argument("--index", help="Discovery index file used to speed up --root scans")
+    parser.add_argument("--rescan", action="store_true", help="Ignore the discovery index and list every directory")
+    parser.add_argument("--list", action="store_true", help="Print the installations found under --root and exit")
+    parser.add_argument("--check", action="store_true",
+                        help="Only report which folders have an update available and exit; nothing is downloaded")
+    parser.add_argument("--install", action="store_true", help="Install into listed folders that have no VS Code yet")
+    parser.add_argument("--quality", choices=("stable", "insider"), default="stable", help="Quality for --install")
+    parser.add_argument("--no-portable", dest="portable", action="store_false", help="Do not create a data folder on install")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Folders updated at the same time")
+    parser.add_argument("--apply-mode", choices=APPLY_MODES, default=APPLY_STAGED)
+    parser.add_argument("--connections", type=int, default=DEFAULT_CONNECTIONS, help="Parallel download connections")
+    parser.add_argument("--mmap", action="store_true", help="Write downloads through a memory map")
+    parser.add_argument("--extract-workers", type=int, default=DEFAULT_EXTRACT_WORKERS)
+    parser.add_argument("--update-api", help="Base URL of the update service")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES, help="Retries per request on network errors")
+    parser.add_argument("--timeout", type=float, default=READ_TIMEOUT, help="Seconds a stalled connection may stay silent")
+    parser.add_argument("--mirror", help="LAN mirror tried before the update service (default: VSUPDATER_MIRROR)")
+    parser.add_argument("--snapshots", type=int, default=None,
+                        help="Snapshots of the portable data folder kept per folder, taken before each update "
+                             f"(default: VSUPDATER_SNAPSHOTS or {DEFAULT_SNAPSHOT_KEEP}; 0 turns them off)")
+    parser.add_argument("--snapshot-hash", action="store_true",
+                        help="Also compare file hashes, not just size and mtime, when taking a snapshot")
+    parser.add_argument("--restore-data", nargs="?", const="latest", metavar="SNAPSHOT",
+                        help="Restore the data folder of each listed folder from a snapshot (newest by default) and exit")
+    parser.add_argument("--rollback", action="store_true",
+                        help="Put back the version replaced by the last staged update of each listed folder and exit")
+    parser.add_argument("--cache-dir", help="Archive cache directory")
+    parser.add_argument("--no-cache", action="store_true", help="Do not use the archive cache")
+    parser.add_argument("--work-dir", help="Directory for temporary files")
+    parser.add_argument("--quiet", action="store_true", help="Only print the JSON summary")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    options = parser.parse_args(argv)
+
+    folders = [os.path.abspath(folder) for folder in options.folders]
+    if options.root:
+        installs = discover(options.root, options.depth, options.index, use_index=not options.rescan)
+        if options.list:
+            print(json.dumps([install.to_json() for install in installs], indent=2))
+            return 0
+        folders.extend(install.path for install in installs)
+    folders = list(dict.fromkeys(folders))
+    if not folders:
+        parser.error("no folders given and none found under --root")
+
+    log_lock = threading.Lock()
+
+    def log(message):
+        with log_lock:
+            print(message, file=sys.stderr, flush=True)
+
+    updater = BatchUpdater(options, log=None if options.quiet else log)
+
+    def interrupt(signum, frame):
+        # The first Ctrl-C lets every engine stop at its next check; a second one aborts at once.
+        # Nothing is logged here: the main thread may be holding the log lock.
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        updater.cancel()
+
+    previous_handler = None
+    if threading.current_thread() is threading.main_thread():
+        previous_handler = signal.signal(signal.SIGINT, interrupt)
+    try:
+        if options.check:
+            tasks = updater.check(folders)
+        elif options.rollback:
+            tasks = updater.rollback(folders)
+        elif options.restore_data:
+            snapshot_id = None if options.restore_data == "latest" else options.restore_data
+            tasks = updater.restore_data(folders, snapshot_id)
+        else:
+            tasks = updater.run(folders)
+    except KeyboardInterrupt:
+        updater.cancel()
+        print(json.dumps({"ok": False, "error": "interrupted"}))
+        return 130
+    finally:
+        if previous_handler is not None:
+            signal.signal(signal.SIGINT, previous_handler)
+
+    if updater.cancel_event.is_set():
+        updater.log_message("Interrupted; running folders were cancelled.")
+    summary = updater.summary(tasks)
+    print(json.dumps(summary, indent=2))
+    if updater.cancel_event.is_set():
+        return 130
+    if not summary["ok"]:
+        return 1
+    return EXIT_UPDATE_AVAILABLE if summary["counts"][STATUS_UPDATE_AVAILABLE] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,37 @@
+# Constants
+import os
+
+INSIDER_CODE_FILE = 'Code - Insiders.exe'
+CODE_FILE = 'Code.exe'
+VSCODE_STABLE_URL = "https://code.visualstudio.com/sha/download?build=stable&os=win32-x64-archive"
+VSCODE_INSIDER_URL = "https://code.visualstudio.com/sha/download?build=insider&os=win32-x64-archive"
+
+# Shared with the batch CLI's argument defaults, so parsing a command line
+# imports neither the network stack nor the zip machinery
+
+# How a downloaded archive is put in place
+APPLY_STAGED = "staged"
+APPLY_COPY = "copy"
+APPLY_DELTA = "delta"
+APPLY_REMOTE_DELTA = "remote-delta"
+APPLY_MODES = (APPLY_STAGED, APPLY_COPY, APPLY_DELTA, APPLY_REMOTE_DELTA)
+
+DEFAULT_CONNECTIONS = 4
+DEFAULT_EXTRACT_WORKERS = min(16, (os.cpu_count() or 1) * 2)
+
+CONNECT_TIMEOUT = 10
+# Longest silence tolerated between two reads of a response, not the whole transfer
+READ_TIMEOUT = 30
+DEFAULT_RETRIES = 5
+
+
+def user_data_path(name, override_variable):
+    """Per-user location of ``name``: under ``%LOCALAPPDATA%\\VSUpdater`` (``~/.cache/VSUpdater`` elsewhere)
+
+    The environment variable ``override_variable``, when set, takes precedence.
+    """
+    override = os.environ.get(override_variable)
+    if override:
+        return override
+    base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "VSUpdater", name)
@@ -0,0 +1,152 @@
+import os
+import json
+import zlib
+
+from .staging import PORTABLE_DATA_DIR
+
+MANIFEST_NAME = ".vsupdater-manifest.json"
+MANIFEST_VERSION = 1
+CRC_CHUNK_SIZE = 1024 * 1024
+# Top-level entries that belong to the user or the updater, never to the build
+EXCLUDED_TOP_LEVEL = {PORTABLE_DATA_DIR, MANIFEST_NAME}
+
+
+class DeltaPlan:
+    """Which archive members must be written and which installed files removed"""
+
+    def __init__(self, changed, removed, unchanged_files, unchanged_bytes):
+        self.changed = changed
+        self.removed = removed
+        self.unchanged_files = unchanged_files
+        self.unchanged_bytes = unchanged_bytes
+
+    @property
+    def changed_bytes(self):
+        return sum(info.file_size for info in self.changed)
+
+
+def file_crc32(path):
+    crc = 0
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(CRC_CHUNK_SIZE)
+            if not chunk:
+                return crc
+            crc = zlib.crc32(chunk, crc)
+
+
+def iter_install_files(folder_path):
+    """Yield ``(relative_posix_path, stat)`` for every file that belongs to the build"""
+    for root, dirs, files in os.walk(folder_path):
+        rel_root = os.path.relpath(root, folder_path)
+        if rel_root == ".":
+            dirs[:] = [d for d in dirs if d not in EXCLUDED_TOP_LEVEL]
+            files = [f for f in files if f not in EXCLUDED_TOP_LEVEL]
+            rel_root = ""
+        for name in files:
+            path = os.path.join(root, name)
+            rel_path = os.path.join(rel_root, name).replace(os.sep, "/")
+            yield rel_path, os.stat(path)
+
+
+def build_manifest(folder_path, previous=None, cancel_event=None):
+    """Map each installed file to ``[size, crc32, mtime_ns]``
+
+    Entries of ``previous`` whose size and mtime still match are reused, so
+    only files touched since the manifest was written are read again.
+    Returns None if cancelled.
+    """
+    previous = previous or {}
+    manifest = {}
+    for rel_path, stat in iter_install_files(folder_path):
+        if cancel_event is not None and cancel_event.is_set():
+            return None
+        known = previous.get(rel_path)
+        if known and known[0] == stat.st_size and known[2] == stat.st_mtime_ns:
+            manifest[rel_path] = known
+        else:
+            crc = file_crc32(os.path.join(folder_path, rel_path))
+            manifest[rel_path] = [stat.st_size, crc, stat.st_mtime_ns]
+    return manifest
+
+
+def manifest_from_archive(folder_path, infos):
+    """Manifest of a tree freshly extracted from ``infos``; costs one stat per file"""
+    manifest = {}
+    for info in infos:
+        if info.is_dir():
+            continue
+        try:
+            stat = os.stat(os.path.join(folder_path, info.filename))
+        except FileNotFoundError:
+            continue
+        manifest[info.filename] = [info.file_size, info.CRC, stat.st_mtime_ns]
+    return manifest
+
+
+def load_manifest(folder_path):
+    try:
+        with open(os.path.join(folder_path, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("version") != MANIFEST_VERSION:
+        return None
+    return data.get("files")
+
+
+def save_manifest(folder_path, manifest):
+    path = os.path.join(folder_path, MANIFEST_NAME)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": MANIFEST_VERSION, "files": manifest}, f)
+    os.replace(temp_path, path)
+
+
+def plan_delta(infos, manifest, installed=None):
+    """Compare the archive's central directory with an install manifest
+
+    Only files in ``installed``, the manifest saved when the updater last
+    wrote this folder from an archive, are removed when they left the build.
+    Anything else in the folder was put there by the user and is kept; with
+    no saved manifest nothing is removed.
+    """
+    changed = []
+    archive_files = set()
+    unchanged_files = 0
+    unchanged_bytes = 0
+
+    for info in infos:
+        if info.is_dir():
+            continue
+        archive_files.add(info.filename)
+        known = manifest.get(info.filename)
+        if known and known[0] == info.file_size and known[1] == info.CRC:
+            unchanged_files += 1
+            unchanged_bytes += info.file_size
+        else:
+            changed.append(info)
+
+    removed = sorted(set(installed or ()) - archive_files)
+    return DeltaPlan(changed, removed, unchanged_files, unchanged_bytes)
+
+
+def remove_files(folder_path, rel_paths):
+    """Delete files that left the build and prune directories they leave empty"""
+    parents = set()
+    for rel_path in rel_paths:
+        path = os.path.join(folder_path, *rel_path.split("/"))
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        parents.add(os.path.dirname(path))
+
+    # Deepest first so that nested empty directories collapse completely
+    for directory in sorted(parents, key=len, reverse=True):
+        while os.path.normcase(directory) != os.path.normcase(folder_path):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                break
+            directory = os.path.dirname(directory)
@@ -0,0 +1,259 @@
+import os
+import json
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from .constants import INSIDER_CODE_FILE, CODE_FILE, user_data_path
+from .staging import PORTABLE_DATA_DIR
+from .version import read_installed_build
+
+DEFAULT_SCAN_DEPTH = 3
+DEFAULT_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+# Directories handed to a worker at a time; one per task costs more in dispatch than a stat
+VISIT_BATCH = 64
+INDEX_NAME = "installs.json"
+INDEX_VERSION = 1
+# Never descended into: dependency trees and caches that cannot hold an install
+PRUNED_NAMES = {"node_modules", "__pycache__", "$recycle.bin", "system volume information"}
+# A folder holding these but no executable is the inside of a VS Code tree
+INTERNALS_MARKERS = ("resources", "locales")
+
+
+class DiscoveredInstall:
+    """One VS Code installation found on disk"""
+
+    def __init__(self, path, quality, version=None, commit=None, portable=False, size=None,
+                 product_path=None, product_mtime_ns=None):
+        self.path = path
+        self.quality = quality
+        self.version = version
+        self.commit = commit
+        self.portable = portable
+        self.size = size
+        self.product_path = product_path
+        self.product_mtime_ns = product_mtime_ns
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(**data)
+
+    def to_json(self):
+        return dict(vars(self))
+
+
+def quality_from_names(names):
+    if INSIDER_CODE_FILE in names:
+        return "insider"
+    if CODE_FILE in names:
+        return "stable"
+    return None
+
+
+def describe_install(path, quality=None, measure_size=True):
+    """Read everything worth knowing about the installation in ``path``; None if there is none"""
+    if quality is None:
+        try:
+            quality = quality_from_names(os.listdir(path))
+        except OSError:
+            return None
+        if quality is None:
+            return None
+
+    install = DiscoveredInstall(path, quality, portable=os.path.isdir(os.path.join(path, PORTABLE_DATA_DIR)))
+    build = read_installed_build(path)
+    if build is not None:
+        install.version = build.version
+        install.commit = build.commit
+        install.product_path = build.product_path
+        install.product_mtime_ns = mtime_ns(build.product_path)
+    if measure_size:
+        install.size = tree_size(path, skip=(PORTABLE_DATA_DIR,))
+    return install
+
+
+def is_current(install):
+    """Whether a recorded install still matches the disk, checked with as few stats as possible"""
+    if install.product_path is None:
+        return False
+    if mtime_ns(install.product_path) != install.product_mtime_ns:
+        return False
+    return os.path.isdir(os.path.join(install.path, PORTABLE_DATA_DIR)) == install.portable
+
+
+class InstallIndex:
+    """Persistent record of directory trees scanned for VS Code installations
+
+    ``scan`` walks a root breadth first, one level at a time, with the
+    ``os.scandir`` calls of each level spread over a thread pool. It does
+    not descend into installations, hidden folders, dependency trees or
+    folders that look like the inside of a VS Code tree. Every visited
+    directory is stored with its mtime and subdirectories. On the next scan
+    a directory whose mtime has not changed is not listed again; its
+    recorded subdirectories are followed instead. Adding, removing or
+    renaming an entry changes a directory's mtime, so only the parts of the
+    tree that changed are listed. A recorded install is kept while its
+    product.json is unchanged, so versions and sizes are not read again.
+
+    ``stats`` counts the directories listed and reused in the last scan.
+    """
+
+    def __init__(self, path=None, workers=DEFAULT_WORKERS, measure_size=True):
+        self.path = path or user_data_path(INDEX_NAME, "VSUPDATER_INDEX")
+        self.workers = max(1, workers)
+        self.measure_size = measure_size
+        self.dirs = {}
+        self.stats = {"listed": 0, "reused": 0, "installs_read": 0}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == INDEX_VERSION:
+            self.dirs = data.get("dirs", {})
+
+    def save(self):
+        """Write the index atomically; failures are ignored, the index is only a cache"""
+        temp_path = f"{self.path}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": INDEX_VERSION, "dirs": self.dirs}, f)
+            os.replace(temp_path, self.path)
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    def clear(self):
+        self.dirs = {}
+
+    def scan(self, root, max_depth=DEFAULT_SCAN_DEPTH):
+        """Return the installs under ``root`` (sorted by path), revalidating the index"""
+        root = os.path.abspath(root)
+        self.stats = {"listed": 0, "reused": 0, "installs_read": 0}
+        installs = []
+        visited = set()
+        level = [root]
+        depth = 0
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while level:
+                next_level = []
+                batches = [level[start:start + VISIT_BATCH] for start in range(0, len(level), VISIT_BATCH)]
+                results = (result for batch in executor.map(self.visit_batch, batches) for result in batch)
+                for path, entry, listed, read_install in results:
+                    visited.add(path)
+                    self.stats["listed" if listed else "reused"] += 1
+                    self.stats["installs_read"] += read_install
+                    if entry is None:
+                        self.dirs.pop(path, None)
+                        continue
+                    self.dirs[path] = entry
+                    if entry["install"] is not None:
+                        installs.append(DiscoveredInstall.from_json(entry["install"]))
+                    elif depth < max_depth:
+                        next_level.extend(os.path.join(path, name) for name in entry["subdirs"])
+                level = next_level
+                depth += 1
+
+        # Forget directories under this root that no longer exist or are now out of reach
+        prefix = root.rstrip(os.sep) + os.sep
+        for path in [path for path in self.dirs if path.startswith(prefix) and path not in visited]:
+            del self.dirs[path]
+        return sorted(installs, key=lambda install: install.path)
+
+    def visit_batch(self, paths):
+        return [self.visit(path) for path in paths]
+
+    def visit(self, path):
+        """Returns ``(path, entry or None, listed, installs read)`` for one directory"""
+        current = mtime_ns(path)
+        if current is None:
+            return path, None, False, 0
+
+        entry = self.dirs.get(path)
+        if entry is not None and entry["mtime_ns"] == current:
+            install = entry["install"]
+            if install is None or is_current(DiscoveredInstall.from_json(install)):
+                return path, entry, False, 0
+            refreshed = describe_install(path, install["quality"], self.measure_size)
+            return path, dict(entry, install=refreshed.to_json() if refreshed else None), False, 1
+
+        try:
+            with os.scandir(path) as it:
+                entries = list(it)
+        except OSError:
+            return path, None, True, 0
+
+        names = {entry.name for entry in entries}
+        quality = quality_from_names(names)
+        if quality is not None:
+            install = describe_install(path, quality, self.measure_size)
+            return path, {"mtime_ns": current, "subdirs": [], "install": install.to_json()}, True, 1
+
+        subdirs = []
+        if not all(marker in names for marker in INTERNALS_MARKERS):
+            for item in entries:
+                if is_candidate_dir(item):
+                    subdirs.append(item.name)
+        return path, {"mtime_ns": current, "subdirs": sorted(subdirs), "install": None}, True, 0
+
+
+def is_candidate_dir(entry):
+    name = entry.name
+    if name.startswith(".") or name.lower() in PRUNED_NAMES:
+        return False
+    try:
+        return entry.is_dir(follow_symlinks=False)
+    except OSError:
+        return False
+
+
+def discover(roots, max_depth=DEFAULT_SCAN_DEPTH, index_path=None, use_index=True, measure_size=True):
+    """Installs under every root, using (and updating) the persistent index unless ``use_index`` is False"""
+    index = InstallIndex(index_path, measure_size=measure_size)
+    if not use_index:
+        index.clear()
+    installs = {}
+    for root in roots:
+        for install in index.scan(root, max_depth):
+            installs[install.path] = install
+    if use_index:
+        index.save()
+    return [installs[path] for path in sorted(installs)]
+
+
+def mtime_ns(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def tree_size(path, skip=()):
+    """Total size in bytes of the regular files below ``path``, leaving out top-level ``skip`` names"""
+    total = 0
+    pending = [path]
+    top = True
+    while pending:
+        directory = pending.pop()
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if top and entry.name in skip:
+                        continue
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            total += entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+        top = False
+    return total
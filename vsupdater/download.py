@@ -0,0 +1,343 @@
+import os
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import urllib3
+
+from .constants import DEFAULT_CONNECTIONS
+from .transport import default_transport
+from .writer import DownloadWriter, StreamCopier, body_reader, preallocate
+
+BLOCK_SIZE = 4 * 1024 * 1024
+STATE_SAVE_INTERVAL = 4 * 1024 * 1024
+STATE_SUFFIX = ".state.json"
+
+
+class ValidatorChanged(Exception):
+    """The remote file changed since the partial download was started"""
+
+
+class SegmentedDownloader:
+    """Download a file over several concurrent HTTP Range requests
+
+    The server is probed once for range support. When it answers with a
+    ``206`` the file is preallocated and split into fixed-size blocks that
+    ``connections`` workers fetch in file order, each writing at its own
+    offset. Handing out blocks in order keeps the bytes arriving close to
+    sequentially, which lets an optional ``StreamingHasher`` hash them as they
+    land. Progress of every block is kept in a small JSON sidecar next to the
+    destination (``<dest>.state.json``) so that a cancelled or interrupted
+    download resumes where it stopped. Every ranged request carries the
+    server's ETag (or Last-Modified) in ``If-Range``; if the build changed in
+    between the server sends the full body instead and the stale partial file
+    is discarded rather than stitched together with new bytes.
+
+    Servers without range support get the plain single-stream download.
+
+    Requests go through a shared ``Transport`` (pooled connections,
+    timeouts, retries with backoff). A block that breaks off partway is
+    retried from the last byte it received.
+
+    The file is preallocated to its full size. Every connection reads the
+    body with ``readinto`` into its own reused buffer, with adaptively sized
+    reads (see ``writer.StreamCopier``), and writes at its offset through a
+    shared ``DownloadWriter``. With ``use_mmap`` that writer maps the file.
+    """
+
+    def __init__(self, url, dest_path, connections=DEFAULT_CONNECTIONS, cancel_event=None, progress=None, log=None,
+                 hasher=None, use_mmap=False, transport=None):
+        self.url = url
+        self.dest_path = dest_path
+        self.state_path = dest_path + STATE_SUFFIX
+        self.connections = max(1, connections)
+        self.hasher = hasher
+        self.use_mmap = use_mmap
+        self.cancel_event = cancel_event
+        self.progress_callback = progress
+        self.log_callback = log
+        self.transport = transport or default_transport()
+        self._lock = threading.Lock()
+        self._state = None
+        self._bytes_done = 0
+        self._total_size = 0
+        self._unsaved_bytes = 0
+        self._abort_event = threading.Event()
+        self._restarted = False
+        self._writer = None
+        self._copiers = threading.local()
+
+    @property
+    def cancel_requested(self):
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
+    @property
+    def should_stop(self):
+        return self.cancel_requested or self._abort_event.is_set()
+
+    def log_message(self, message):
+        if self.log_callback:
+            self.log_callback(message)
+
+    @property
+    def copier(self):
+        """This thread's StreamCopier (and with it, its reused read buffer)"""
+        copier = getattr(self._copiers, "copier", None)
+        if copier is None:
+            copier = self._copiers.copier = StreamCopier()
+        return copier
+
+    def copy_body(self, response, offset, length, on_chunk):
+        """Stream ``response`` into the file at ``offset``; returns the bytes copied"""
+        try:
+            return self.copier.copy(body_reader(response), self._writer, offset, length,
+                                    should_stop=lambda: self.should_stop, on_chunk=on_chunk)
+        except urllib3.exceptions.HTTPError as e:
+            # Reading the raw stream bypasses requests' own exception wrapping
+            raise requests.exceptions.ConnectionError(e) from e
+
+    def report_progress(self):
+        if self.progress_callback:
+            self.progress_callback(self._bytes_done, self._total_size)
+
+    def download(self):
+        """Fetch ``url`` into ``dest_path``; returns False when cancelled
+
+        Network and HTTP errors that outlast the transport's retries
+        propagate as ``requests`` exceptions; the partial file and its state
+        are kept so a later call can resume.
+        """
+        return self._download()
+
+    def _download(self):
+        saved_state = self.load_state()
+        probe = self.transport.get(self.url, headers={"Range": "bytes=0-0"}, stream=True,
+                                   should_stop=lambda: self.should_stop)
+        probe.raise_for_status()
+
+        total_size = self.parse_total_size(probe)
+        validator = probe.headers.get("ETag") or probe.headers.get("Last-Modified")
+        if probe.status_code != 206 or total_size is None or not validator:
+            # No usable range support: download in one stream, reusing the probe only if it carries the whole body
+            self.discard_state()
+            if probe.status_code != 200:
+                probe.close()
+                probe = self.transport.get(self.url, stream=True, should_stop=lambda: self.should_stop)
+                probe.raise_for_status()
+            return self.download_single_stream(probe)
+
+        probe.close()
+        # Pin the resolved URL so every block hits the same build behind redirects
+        resolved_url = probe.url
+
+        if saved_state and self.state_matches(saved_state, total_size, validator):
+            self.log_message("Resuming previous partial download...")
+            self._state = saved_state
+        else:
+            self.discard_state()
+            self._state = self.new_state(total_size, validator)
+
+        self._state["resolved_url"] = resolved_url
+        self._total_size = total_size
+        self._bytes_done = sum(block[2] for block in self._state["blocks"])
+        preallocate(self.dest_path, total_size)
+        self.save_state()
+        self.report_progress()
+
+        pending = []
+        for index, (start, end, done) in enumerate(self._state["blocks"]):
+            if self.hasher is not None:
+                self.hasher.mark_on_disk(start, done)
+            if start + done <= end:
+                pending.append(index)
+
+        errors = []
+        if pending:
+            self._writer = DownloadWriter(self.dest_path, total_size, self.use_mmap)
+            try:
+                # The executor hands out blocks FIFO, so connections work through the file in order
+                with ThreadPoolExecutor(max_workers=min(self.connections, len(pending))) as executor:
+                    futures = [executor.submit(self.fetch_block, index) for index in pending]
+                    for future in futures:
+                        try:
+                            future.result()
+                        except Exception as e:
+                            # Stop the other blocks; their progress is kept for resume
+                            self._abort_event.set()
+                            errors.append(e)
+            finally:
+                self._writer.close()
+                self._writer = None
+
+        if self.cancel_requested:
+            self.save_state()
+            return False
+
+        if errors:
+            if any(isinstance(e, ValidatorChanged) for e in errors) and not self._restarted:
+                self._restarted = True
+                self.log_message("Remote file changed during download; starting over.")
+                self.discard_state()
+                self.remove_partial()
+                self._abort_event.clear()
+                if self.hasher is not None:
+                    self.hasher.reset()
+                return self._download()
+            self.save_state()
+            raise errors[0]
+
+        if self._bytes_done < self._total_size:
+            self.save_state()
+            raise requests.exceptions.ConnectionError(
+                f"Download ended early ({self._bytes_done} of {self._total_size} bytes)")
+
+        self.discard_state()
+        return True
+
+    def download_single_stream(self, response):
+        """Plain sequential download used when the server ignores ranges
+
+        ``response`` serves the first attempt. A transfer that breaks off is
+        retried under the transport's policy with a fresh request, from the
+        first byte, since the server cannot resume it.
+        """
+        first_response = [response]
+
+        def attempt():
+            if first_response:
+                return self.download_single_stream_once(first_response.pop())
+            # Retries happen around the whole transfer, so the request itself is tried once
+            retry = self.transport.get(self.url, stream=True, retries=0)
+            retry.raise_for_status()
+            return self.download_single_stream_once(retry)
+
+        return self.transport.call(attempt, should_stop=lambda: self.should_stop)
+
+    def download_single_stream_once(self, response):
+        with response:
+            if self.hasher is not None:
+                self.hasher.reset()
+            self._total_size = int(response.headers.get("content-length", 0))
+            self._bytes_done = 0
+            self.remove_partial()
+            preallocate(self.dest_path, self._total_size)
+            self.report_progress()
+
+            def on_chunk(offset, chunk):
+                if self.hasher is not None:
+                    self.hasher.update(offset, chunk)
+                self._bytes_done += len(chunk)
+                self.report_progress()
+
+            self._writer = DownloadWriter(self.dest_path, self._total_size, self.use_mmap)
+            try:
+                self.copy_body(response, 0, self._total_size or None, on_chunk)
+            finally:
+                self._writer.close()
+                self._writer = None
+
+            if self.cancel_requested:
+                return False
+            if self._total_size and self._bytes_done < self._total_size:
+                raise requests.exceptions.ConnectionError(
+                    f"Download ended early ({self._bytes_done} of {self._total_size} bytes)")
+        return True
+
+    def fetch_block(self, index):
+        """Download the remaining bytes of one block, retrying from the last byte received"""
+        self.transport.call(lambda: self.fetch_block_once(index), should_stop=lambda: self.should_stop)
+
+    def fetch_block_once(self, index):
+        if self.should_stop:
+            return
+        start, end, done = self._state["blocks"][index]
+        if start + done > end:
+            return
+        headers = {
+            "Range": f"bytes={start + done}-{end}",
+            "If-Range": self._state["validator"],
+        }
+        # Retries happen around the whole block, so the request itself is tried once
+        with self.transport.get(self._state["resolved_url"], headers=headers, stream=True, retries=0) as response:
+            response.raise_for_status()
+            if response.status_code != 206:
+                raise ValidatorChanged(f"Server ignored If-Range for block {index}")
+
+            def on_chunk(offset, chunk):
+                if self.hasher is not None:
+                    self.hasher.update(offset, chunk)
+                self.record_progress(index, offset + len(chunk) - start, len(chunk))
+
+            remaining = end + 1 - (start + done)
+            copied = self.copy_body(response, start + done, remaining, on_chunk)
+            if copied < remaining and not self.should_stop:
+                raise requests.exceptions.ConnectionError(f"Block {index} ended early ({copied} of {remaining} bytes)")
+
+    def record_progress(self, index, done, chunk_length):
+        with self._lock:
+            self._state["blocks"][index][2] = done
+            self._bytes_done += chunk_length
+            self._unsaved_bytes += chunk_length
+            if self._unsaved_bytes >= STATE_SAVE_INTERVAL:
+                self._unsaved_bytes = 0
+                self._save_state_locked()
+        self.report_progress()
+
+    def new_state(self, total_size, validator):
+        """Split ``total_size`` bytes into ``BLOCK_SIZE`` ranges"""
+        blocks = []
+        for start in range(0, total_size, BLOCK_SIZE):
+            blocks.append([start, min(start + BLOCK_SIZE, total_size) - 1, 0])
+        return {
+            "url": self.url,
+            "total_size": total_size,
+            "validator": validator,
+            "blocks": blocks,
+        }
+
+    def state_matches(self, state, total_size, validator):
+        return ("blocks" in state
+                and state.get("url") == self.url
+                and state.get("total_size") == total_size
+                and state.get("validator") == validator
+                and os.path.exists(self.dest_path)
+                and os.path.getsize(self.dest_path) == total_size)
+
+    def load_state(self):
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save_state(self):
+        with self._lock:
+            self._save_state_locked()
+
+    def _save_state_locked(self):
+        if self._state is None:
+            return
+        temp_path = self.state_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self._state, f)
+        os.replace(temp_path, self.state_path)
+
+    def discard_state(self):
+        try:
+            os.remove(self.state_path)
+        except FileNotFoundError:
+            pass
+
+    def remove_partial(self):
+        try:
+            os.remove(self.dest_path)
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def parse_total_size(response):
+        """Read the full size from a ``Content-Range: bytes a-b/total`` header"""
+        content_range = response.headers.get("Content-Range", "")
+        _, _, total = content_range.rpartition("/")
+        return int(total) if total.isdigit() else None
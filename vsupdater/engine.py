@@ -0,0 +1,767 @@
+import os
+import sys
+import shutil
+import zipfile
+import threading
+
+import requests
+
+from .cache import ArchiveCache
+from .constants import (VSCODE_STABLE_URL, VSCODE_INSIDER_URL, APPLY_STAGED, APPLY_COPY, APPLY_DELTA,
+                        APPLY_REMOTE_DELTA)
+from .delta import (build_manifest, load_manifest, manifest_from_archive, plan_delta,
+                    remove_files, save_manifest)
+from .download import SegmentedDownloader, ValidatorChanged, DEFAULT_CONNECTIONS
+from .extract import extract_zip, DEFAULT_WORKERS
+from .instrumentation import ESTIMATED_COMPRESSION_RATIO, Instrumentation
+from .integrity import StreamingHasher
+from .placement import TreePlacer
+from .remotezip import (MAX_PREFETCH_FRACTION, RangeNotSupported, RemoteZipReader, coalesce_ranges, member_ranges,
+                        write_member)
+from .snapshot import SnapshotStore, default_snapshot_keep
+from .staging import FolderLocked, StagedInstall
+from .transport import default_transport
+from .version import MIRROR_URL, SOURCE_MIRROR, fetch_latest_release, read_installed_build
+
+
+class OperationCancelled(Exception):
+    """Raised from inside a phase when the user cancelled the operation"""
+
+
+class UpdateEngine:
+    """Runs the download/extract/move pipeline without touching any UI
+
+    Progress and log output are reported through the optional ``log`` and
+    ``progress`` callbacks, so the engine can run on a worker thread while the
+    GUI (or any other front end) decides how to display them. Cancellation is
+    cooperative: ``cancel()`` may be called from any thread and every phase
+    checks it between units of work.
+
+    Every phase is timed through ``instrumentation``, which emits structured
+    events (JSON-lines log by default). The progress percentage is derived
+    from the bytes each phase handles rather than fixed milestones.
+    """
+
+    def __init__(self, folder_path, is_insider=False, is_portable=True, log=None, progress=None,
+                 download_connections=DEFAULT_CONNECTIONS, update_api_url=None, use_cache=True, cache_dir=None,
+                 apply_mode=APPLY_STAGED, extract_workers=DEFAULT_WORKERS, work_dir=None, instrumentation=None,
+                 download_mmap=False, mirror_url=None, transport=None, snapshot_keep=None, snapshot_hash=False):
+        self.folder_path = folder_path
+        self.is_insider = is_insider
+        self.is_portable = is_portable
+        self.download_connections = download_connections
+        self.download_mmap = download_mmap
+        self.update_api_url = update_api_url
+        self.mirror_url = mirror_url or MIRROR_URL
+        # Shares the connection pool; keeps this engine's request metrics apart
+        self.transport = (transport or default_transport()).child()
+        self.release = None
+        self.cache = ArchiveCache(cache_dir) if use_cache else None
+        self.apply_mode = apply_mode
+        self.extract_workers = extract_workers
+        # Snapshots of the portable data folder kept before updates; 0 turns them off
+        self.snapshot_keep = default_snapshot_keep() if snapshot_keep is None else snapshot_keep
+        self.snapshot_hash = snapshot_hash
+        # temp/ and downloads/ live here; defaults to the executable's folder
+        self.work_dir = work_dir or os.path.dirname(os.path.abspath(sys.executable))
+        self.log_callback = log
+        self.progress_callback = progress
+        self.instrumentation = instrumentation or Instrumentation.default()
+        self.instrumentation.progress.callback = self.set_progress
+        self._cancel_event = threading.Event()
+
+    @property
+    def cancel_requested(self):
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        """Request cancellation; safe to call from any thread"""
+        self._cancel_event.set()
+
+    def log_message(self, message):
+        """Forward a log message to the front end"""
+        if self.log_callback:
+            self.log_callback(message)
+
+    def set_progress(self, value):
+        """Forward an overall progress percentage to the front end"""
+        if self.progress_callback:
+            self.progress_callback(value)
+
+    @property
+    def quality(self):
+        return "insider" if self.is_insider else "stable"
+
+    @property
+    def progress(self):
+        return self.instrumentation.progress
+
+    def run(self, is_install_operation):
+        """Core download and installation logic, recorded as one instrumented operation"""
+        operation = "install" if is_install_operation else "update"
+        with self.instrumentation.operation(operation, folder=self.folder_path, quality=self.quality,
+                                            apply_mode=self.apply_mode) as result:
+            result["ok"] = self.run_operation(is_install_operation)
+            result["cancelled"] = self.cancel_requested
+            result["network"] = self.transport.metrics.snapshot()
+        return result["ok"]
+
+    def run_operation(self, is_install_operation):
+        temp_dir = os.path.join(self.work_dir, "temp")
+        # Partial downloads live outside temp/ so that they survive a cancelled run
+        download_dir = os.path.join(self.work_dir, "downloads")
+
+        try:
+            # Look up the latest build; an update stops here if it is already installed
+            self.release = self.resolve_latest_release()
+            if not is_install_operation and self.is_up_to_date(self.release):
+                self.progress.finish()
+                return True
+            if self.cancel_requested:
+                return False
+
+            if not is_install_operation:
+                self.snapshot_data()
+                if self.cancel_requested:
+                    return False
+
+            # Fetch only the changed files from the remote archive when the server allows it
+            apply_successful = None
+            if self.apply_mode == APPLY_REMOTE_DELTA and not is_install_operation:
+                apply_successful = self.apply_remote_delta()
+
+            # Otherwise download the whole archive and put it in place
+            if apply_successful is None:
+                apply_successful = self.download_and_apply(download_dir, temp_dir, is_install_operation)
+
+            if not apply_successful or self.cancel_requested:
+                return False
+
+            return self.finish_install(is_install_operation)
+
+        except requests.exceptions.RequestException as e:
+            self.log_message(f"NETWORK ERROR: {e}. Please check your internet connection.")
+            self.cleanup_temp_dir(temp_dir)
+            return False
+        except Exception as e:
+            self.log_message(f"AN UNEXPECTED ERROR OCCURRED: {e}")
+            self.cleanup_temp_dir(temp_dir)
+            return False
+
+    def finish_install(self, is_install_operation):
+        """Final steps once the new build is in place"""
+        # Create data folder for portable mode if needed
+        if is_install_operation and self.is_portable:
+            self.create_portable_data_folder()
+            if self.cancel_requested:
+                return False
+
+        self.progress.finish()
+        self.log_message("Operation successful!")
+        return True
+
+    def download_and_apply(self, download_dir, temp_dir, is_install_operation):
+        """Fetch the full archive (download or cache) and install it"""
+        # Download VS Code (or reuse a cached copy of the same build)
+        archive_path = self.fetch_archive(download_dir)
+        if archive_path is None or self.cancel_requested:
+            return False
+
+        # Put the new build in place
+        apply_successful = self.apply_archive(archive_path, temp_dir, is_install_operation)
+
+        # Remove zip file; cached archives stay for the next install
+        if not self.is_cached(archive_path):
+            try:
+                os.remove(archive_path)
+                self.log_message("Temporary zip file removed.")
+            except Exception as e:
+                self.log_message(f"Warning: Could not remove temporary zip file: {e}")
+
+        return apply_successful
+
+    def apply_archive(self, archive_path, temp_dir, is_install_operation):
+        """Install the archive into ``folder_path`` using the configured apply mode"""
+        if self.apply_mode in (APPLY_DELTA, APPLY_REMOTE_DELTA):
+            return self.apply_delta(archive_path)
+        if self.apply_mode == APPLY_STAGED:
+            if StagedInstall.is_supported(self.folder_path, is_install_operation):
+                return self.apply_staged(archive_path)
+            self.log_message("Notice: Staged install is not possible for this folder; copying files instead.")
+        return self.apply_by_copy(archive_path, temp_dir)
+
+    def rollback(self):
+        """Restore the version replaced by the last staged update"""
+        try:
+            if StagedInstall(self.folder_path).rollback():
+                self.log_message("Previous version restored.")
+                return True
+            self.log_message("No previous version is available to restore.")
+            return False
+        except OSError as e:
+            self.log_message(f"ERROR: Could not restore the previous version: {e}")
+            return False
+
+    def snapshot_data(self):
+        """Take an incremental snapshot of the portable data folder before it is touched
+
+        A failed snapshot is reported but does not stop the update.
+        """
+        if not self.snapshot_keep or not self.folder_path:
+            return None
+        store = SnapshotStore(self.folder_path, keep=self.snapshot_keep, verify_hash=self.snapshot_hash,
+                              cancel_event=self._cancel_event)
+        if not os.path.isdir(store.data_path):
+            return None
+
+        self.log_message("Taking a snapshot of the 'data' folder...")
+        with self.instrumentation.phase("snapshot", hashed=self.snapshot_hash) as phase:
+            try:
+                # Not weighted into the progress bar: linked files cost next to nothing
+                snapshot_id = store.create()
+                if snapshot_id is None:
+                    phase.cancel()
+                    return None
+                phase.add(store.stats["bytes_copied"], files=store.stats["linked"] + store.stats["copied"])
+                phase.fields.update(snapshot=snapshot_id, linked=store.stats["linked"],
+                                    bytes_copied=store.stats["bytes_copied"])
+                self.log_message(
+                    f"Snapshot {snapshot_id} taken: {store.stats['copied']} files copied "
+                    f"({store.stats['bytes_copied'] / (1024 * 1024):.1f} MB), {store.stats['linked']} unchanged files linked."
+                )
+                return snapshot_id
+            except OSError as e:
+                phase.fail(e)
+                self.log_message(f"Warning: Could not snapshot the 'data' folder: {e}. Continuing without a snapshot.")
+                return None
+
+    def restore_data(self, snapshot_id=None):
+        """Put the portable data folder back as it was in a snapshot (the newest by default)"""
+        store = SnapshotStore(self.folder_path, cancel_event=self._cancel_event)
+        with self.instrumentation.phase("restore-data", snapshot=snapshot_id) as phase:
+            try:
+                restored = store.restore(snapshot_id)
+                phase.add(store.stats["bytes_copied"], files=store.stats["copied"])
+                if not restored:
+                    phase.cancel()
+                    self.log_message("Restore cancelled; the 'data' folder is partially restored.")
+                    return False
+                phase.fields.update(copied=store.stats["copied"], kept=store.stats["kept"],
+                                    removed=store.stats["removed"])
+                self.log_message(
+                    f"'data' folder restored: {store.stats['copied']} files copied back, "
+                    f"{store.stats['kept']} unchanged, {store.stats['removed']} removed."
+                )
+                return True
+            except ValueError as e:
+                phase.fail(e)
+                self.log_message(f"ERROR: {e}")
+                return False
+            except OSError as e:
+                phase.fail(e)
+                self.log_message(f"ERROR: Could not restore the 'data' folder: {e}. VS Code might be running.")
+                return False
+
+    def apply_delta(self, archive_path):
+        """Write only the archive members whose size or CRC32 differ from the installed files"""
+        self.log_message("Comparing installed files with the new build...")
+        with self.instrumentation.phase("apply", mode=APPLY_DELTA) as phase:
+            try:
+                cached_manifest = load_manifest(self.folder_path)
+                manifest = build_manifest(self.folder_path, cached_manifest, self._cancel_event)
+                if manifest is None:
+                    phase.cancel()
+                    return False
+
+                with zipfile.ZipFile(archive_path) as archive:
+                    infos = archive.infolist()
+                plan = plan_delta(infos, manifest, cached_manifest)
+                phase.expect(plan.changed_bytes)
+                phase.fields.update(unchanged_files=plan.unchanged_files, removed_files=len(plan.removed))
+                self.log_message(
+                    f"Skipping {plan.unchanged_files} unchanged files ({plan.unchanged_bytes / (1024 * 1024):.1f} MB); "
+                    f"writing {len(plan.changed)} files ({plan.changed_bytes / (1024 * 1024):.1f} MB), "
+                    f"removing {len(plan.removed)}."
+                )
+
+                if not extract_zip(archive_path, self.folder_path, self._cancel_event, self.byte_reporter(phase),
+                                   members=plan.changed, workers=self.extract_workers):
+                    # Files written so far are recorded by the next manifest rebuild
+                    phase.cancel()
+                    self.log_message("Update cancelled; the installation is partially updated. Run the update again to finish it.")
+                    return False
+                phase.add(files=len(plan.changed))
+
+                remove_files(self.folder_path, plan.removed)
+                self.write_manifest_from_archive(archive_path, self.folder_path, infos)
+                self.log_message("Differential update complete.")
+                return True
+
+            except PermissionError as pe:
+                phase.fail(pe)
+                self.log_message(f"PERMISSION ERROR during differential update: {pe}. VS Code might be running or files are locked. Please close VS Code and try again.")
+                return False
+            except (OSError, zipfile.BadZipFile) as e:
+                phase.fail(e)
+                self.log_message(f"FILE OPERATION ERROR during differential update: {e}.")
+                return False
+
+    def apply_remote_delta(self):
+        """Update in place, downloading only the changed members of the remote zip
+
+        Returns None when the build URL is unknown or the server ignores
+        ranges, so that the caller falls back to the full download.
+        """
+        if self.release is None or not self.release.url:
+            return None
+
+        self.log_message("Reading the remote archive's file list...")
+        archive = None
+        try:
+            with self.instrumentation.phase("download", mode=APPLY_REMOTE_DELTA) as download_phase:
+                try:
+                    reader = RemoteZipReader.open(self.transport, self.release.url)
+                except RangeNotSupported:
+                    download_phase.fail("Server does not support safe ranged requests")
+                    self.log_message("Notice: Server does not support safe ranged requests; downloading the full archive.")
+                    return None
+
+                archive = zipfile.ZipFile(reader)
+                infos = archive.infolist()
+                cached_manifest = load_manifest(self.folder_path)
+                manifest = build_manifest(self.folder_path, cached_manifest, self._cancel_event)
+                if manifest is None:
+                    download_phase.cancel()
+                    return False
+
+                plan = plan_delta(infos, manifest, cached_manifest)
+                ranges = coalesce_ranges(member_ranges(archive, plan.changed))
+                fetch_bytes = sum(end - start + 1 for start, end in ranges)
+                if fetch_bytes > reader.size * MAX_PREFETCH_FRACTION:
+                    # Prefetched ranges are held in memory; a mostly changed build is cheaper as a whole download
+                    download_phase.fail("Too much of the archive changed for a ranged update")
+                    self.log_message(
+                        f"Notice: {fetch_bytes / (1024 * 1024):.1f} of {reader.size / (1024 * 1024):.1f} MB changed; "
+                        f"downloading the full archive."
+                    )
+                    return None
+                download_phase.expect(fetch_bytes)
+                self.progress.expect("apply", plan.changed_bytes)
+                self.log_message(
+                    f"Skipping {plan.unchanged_files} unchanged files ({plan.unchanged_bytes / (1024 * 1024):.1f} MB); "
+                    f"fetching {len(plan.changed)} files in {len(ranges)} requests "
+                    f"({fetch_bytes / (1024 * 1024):.1f} of {reader.size / (1024 * 1024):.1f} MB), "
+                    f"removing {len(plan.removed)}."
+                )
+                prefetched = reader.prefetch(ranges, self._cancel_event)
+                download_phase.add(reader.bytes_fetched)
+                download_phase.fields.update(requests=reader.requests_made, archive_size=reader.size)
+                if not prefetched:
+                    download_phase.cancel()
+                    self.log_message("Update cancelled before any file was changed.")
+                    return False
+
+            with self.instrumentation.phase("apply", mode=APPLY_REMOTE_DELTA) as apply_phase:
+                apply_phase.expect(plan.changed_bytes)
+                apply_phase.fields.update(unchanged_files=plan.unchanged_files, removed_files=len(plan.removed))
+                for info in plan.changed:
+                    if self.cancel_requested:
+                        apply_phase.cancel()
+                        self.log_message("Update cancelled; the installation is partially updated. Run the update again to finish it.")
+                        return False
+                    write_member(archive, info, self.folder_path)
+                    apply_phase.add(info.file_size, files=1)
+
+                remove_files(self.folder_path, plan.removed)
+                self.write_manifest_from_archive(None, self.folder_path, infos)
+            self.log_message(
+                f"Differential update complete: downloaded {reader.bytes_fetched / (1024 * 1024):.1f} MB "
+                f"in {reader.requests_made} requests instead of {reader.size / (1024 * 1024):.1f} MB."
+            )
+            return True
+
+        except requests.exceptions.RequestException:
+            raise
+        except ValidatorChanged:
+            self.log_message("ERROR: The remote archive changed during the update. Please run the update again.")
+            return False
+        except PermissionError as pe:
+            self.log_message(f"PERMISSION ERROR during differential update: {pe}. VS Code might be running or files are locked. Please close VS Code and try again.")
+            return False
+        except (OSError, zipfile.BadZipFile) as e:
+            self.log_message(f"FILE OPERATION ERROR during differential update: {e}.")
+            return False
+        finally:
+            if archive is not None:
+                archive.close()
+
+    def write_manifest_from_archive(self, archive_path, folder_path, infos=None):
+        """Record the freshly written tree so the next delta update needs no re-hashing"""
+        try:
+            if infos is None:
+                with zipfile.ZipFile(archive_path) as archive:
+                    infos = archive.infolist()
+            save_manifest(folder_path, manifest_from_archive(folder_path, infos))
+        except (OSError, zipfile.BadZipFile) as e:
+            self.log_message(f"Notice: Could not write the install manifest: {e}")
+
+    def apply_by_copy(self, archive_path, temp_dir):
+        """Extract into temp/ and copy the tree over the installation"""
+        # Prepare temp directory
+        self.prepare_temp_dir(temp_dir)
+        if self.cancel_requested:
+            return False
+
+        # Extract archive
+        extract_successful = self.extract_archive(archive_path, temp_dir)
+        if not extract_successful or self.cancel_requested:
+            self.cleanup_temp_dir(temp_dir)
+            return False
+
+        # Move files to installation directory
+        move_successful = self.move_files_to_install_dir(temp_dir)
+        if not move_successful or self.cancel_requested:
+            self.cleanup_temp_dir(temp_dir)
+            return False
+
+        # Clean up temp directory
+        self.cleanup_temp_dir(temp_dir)
+        return not self.cancel_requested
+
+    def apply_staged(self, archive_path):
+        """Extract next to the installation and swap the new tree in with renames"""
+        staged = StagedInstall(self.folder_path)
+        with self.instrumentation.phase("prepare-temp", mode=APPLY_STAGED) as phase:
+            try:
+                staging_path = staged.prepare()
+            except Exception as e:
+                phase.fail(e)
+                self.log_message(f"ERROR: Could not create staging directory: {e}")
+                return False
+
+        try:
+            extract_successful = self.extract_archive(archive_path, staging_path)
+            if not extract_successful or self.cancel_requested:
+                return False
+
+            try:
+                with self.instrumentation.phase("apply", mode=APPLY_STAGED):
+                    self.write_manifest_from_archive(archive_path, staging_path)
+                    self.log_message("Swapping in the new version...")
+                    staged.swap(self.log_message)
+            except FolderLocked as e:
+                # Nothing has moved yet, so the extracted tree can still be copied over file by file
+                self.log_message(f"Notice: Could not move the installation aside ({e}); "
+                                 f"VS Code might be running. Copying files instead.")
+                return self.move_files_to_install_dir(staging_path) and not self.cancel_requested
+            self.log_message(f"New version in place. Previous version kept in {staged.previous_path} for rollback.")
+            return True
+
+        except PermissionError as pe:
+            self.log_message(f"PERMISSION ERROR while swapping in the new version: {pe}. VS Code might be running or files are locked. Please close VS Code and try again.")
+            return False
+        except OSError as e:
+            self.log_message(f"FILE OPERATION ERROR while swapping in the new version: {e}.")
+            return False
+        finally:
+            staged.discard()
+
+    def resolve_latest_release(self):
+        """Query the update API; returns None (and falls back to the fixed URLs) on failure"""
+        self.log_message("Checking for the latest version...")
+        with self.instrumentation.phase("version-check") as phase:
+            try:
+                release = fetch_latest_release(self.quality, self.update_api_url, mirror_url=self.mirror_url,
+                                               log=self.log_message, transport=self.transport)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                phase.fail(e)
+                self.log_message(f"Notice: Could not check the latest version: {e}")
+                return None
+            phase.fields.update(version=release.version, commit=release.commit, source=release.source)
+
+        via = f" via mirror {self.mirror_url}" if release.source == SOURCE_MIRROR else ""
+        self.log_message(f"Latest {self.quality} build: {release.version} ({release.commit}){via}")
+        return release
+
+    def is_up_to_date(self, release):
+        """Compare the installed product.json against ``release``"""
+        if release is None or not release.commit:
+            return False
+
+        installed = read_installed_build(self.folder_path)
+        if installed is None or not installed.commit:
+            self.log_message("Notice: Could not read the installed version; updating anyway.")
+            return False
+
+        if installed.commit != release.commit:
+            self.log_message(f"Installed build: {installed.version} ({installed.commit})")
+            return False
+
+        self.log_message(f"VS Code is already up to date ({installed.version}). Nothing to download.")
+        return True
+
+    def prepare_temp_dir(self, temp_dir):
+        """Create clean temporary directory"""
+        with self.instrumentation.phase("prepare-temp") as phase:
+            if os.path.exists(temp_dir):
+                try:
+                    shutil.rmtree(temp_dir)
+                except Exception as e:
+                    self.log_message(f"Notice: Could not clean up pre-existing temp directory: {e}")
+
+            try:
+                os.makedirs(temp_dir)
+            except Exception as e:
+                phase.fail(e)
+                self.log_message(f"ERROR: Could not create temp directory: {e}")
+                return False
+
+            return True
+
+    def expect_archive(self, archive_size):
+        """Size the phases after the download once the archive size is known
+
+        The uncompressed size is only an estimate here; extraction replaces
+        it with the real figure from the central directory.
+        """
+        estimated = int(archive_size * ESTIMATED_COMPRESSION_RATIO)
+        if self.apply_mode in (APPLY_DELTA, APPLY_REMOTE_DELTA):
+            self.progress.expect("apply", estimated)
+            return
+        self.progress.expect("extract", estimated)
+        if self.apply_mode == APPLY_COPY:
+            self.progress.expect("apply", estimated)
+
+    def fetch_archive(self, download_dir):
+        """Return a local path to the target build's archive, downloading it if needed"""
+        release = self.release
+        cacheable = self.cache is not None and release is not None and release.commit and release.sha256
+
+        if cacheable:
+            with self.instrumentation.phase("cache") as phase:
+                cached_path = self.cache.lookup(self.quality, release.commit, release.sha256, self._cancel_event)
+                phase.fields["hit"] = bool(cached_path)
+                if cached_path:
+                    phase.add(files=1)
+                    self.expect_archive(os.path.getsize(cached_path))
+                    self.log_message(f"Using cached archive for {release.version}; download skipped.")
+                    return cached_path
+                if self.cancel_requested:
+                    phase.cancel()
+                    return None
+
+        os.makedirs(download_dir, exist_ok=True)
+        temp_file = os.path.join(download_dir, f"vscode-{self.quality}.zip")
+        hasher = StreamingHasher(temp_file)
+        if not self.download_vscode(temp_file, hasher):
+            return None
+        if not self.verify_archive(temp_file, hasher):
+            return None
+
+        if cacheable:
+            try:
+                return self.cache.store(temp_file, self.quality, release.commit, release.sha256)
+            except OSError as e:
+                self.log_message(f"Warning: Could not add the archive to the cache: {e}")
+        return temp_file
+
+    def is_cached(self, archive_path):
+        return self.cache is not None and os.path.dirname(os.path.abspath(archive_path)) == os.path.abspath(self.cache.root)
+
+    def download_vscode(self, temp_file, hasher=None):
+        """Download VS Code archive"""
+        self.log_message("Downloading VS Code...")
+
+        # Prefer the exact build reported by the update API over the moving "latest" URL
+        if self.release is not None and self.release.url:
+            download_urls = self.release.download_urls()
+        else:
+            download_urls = [VSCODE_INSIDER_URL if self.is_insider else VSCODE_STABLE_URL]
+
+        for attempt, download_url in enumerate(download_urls):
+            is_last = attempt == len(download_urls) - 1
+            with self.instrumentation.phase("download", url=download_url, connections=self.download_connections,
+                                            fallback=attempt > 0) as phase:
+                reported = 0
+
+                def report(bytes_downloaded, total_size):
+                    nonlocal reported
+                    if total_size > 0 and "bytes_total" not in phase.fields:
+                        phase.expect(total_size)
+                        self.expect_archive(total_size)
+                    phase.add(bytes_downloaded - reported)
+                    reported = bytes_downloaded
+
+                downloader = SegmentedDownloader(
+                    download_url, temp_file, connections=self.download_connections,
+                    cancel_event=self._cancel_event, progress=report, log=self.log_message, hasher=hasher,
+                    use_mmap=self.download_mmap, transport=self.transport,
+                )
+                try:
+                    if not downloader.download():
+                        phase.cancel()
+                        self.log_message("Download cancelled.")
+                        return False
+
+                    phase.add(files=1)
+                    self.log_message("Download complete.")
+                    return True
+
+                except Exception as e:
+                    phase.fail(e)
+                    if is_last:
+                        self.log_message(f"Download error: {e}")
+                        return False
+                    self.log_message(f"Notice: Download from {download_url} failed ({e}); trying {download_urls[attempt + 1]}.")
+                    # The next source has other validators; start that file from scratch
+                    downloader.discard_state()
+                    downloader.remove_partial()
+                    if hasher is not None:
+                        hasher.reset()
+                    self.progress.restart("download")
+
+    def verify_archive(self, temp_file, hasher):
+        """Check the streamed SHA-256 against the hash published for the build"""
+        self.log_message("Verifying download...")
+        with self.instrumentation.phase("verify") as phase:
+            try:
+                actual = hasher.finish()
+            except OSError as e:
+                phase.fail(e)
+                self.log_message(f"INTEGRITY ERROR: Could not hash the download: {e}")
+                return False
+
+            # Only bytes read back from disk cost time here; the rest was hashed while downloading
+            phase.add(hasher.bytes_reread, files=1)
+            phase.fields.update(bytes_streamed=hasher.bytes_streamed, hash_seconds=round(hasher.hash_seconds, 6))
+            hashed_mb = (hasher.bytes_streamed + hasher.bytes_reread) / (1024 * 1024)
+            self.log_message(
+                f"SHA-256 computed over {hashed_mb:.1f} MB "
+                f"({hasher.bytes_reread / (1024 * 1024):.1f} MB read back from disk) "
+                f"in {hasher.hash_seconds:.2f} s of hashing ({hasher.throughput / (1024 * 1024):.0f} MB/s)."
+            )
+
+            expected = self.release.sha256 if self.release is not None else None
+            if not expected:
+                phase.fields["verified"] = False
+                self.log_message("Notice: No published SHA-256 for this build; the archive was not verified.")
+                return True
+
+            if actual != expected.lower():
+                phase.fail(f"SHA-256 mismatch (expected {expected}, got {actual})")
+                self.log_message(f"INTEGRITY ERROR: SHA-256 mismatch (expected {expected}, got {actual}). The download was discarded.")
+                try:
+                    os.remove(temp_file)
+                except OSError:
+                    pass
+                return False
+
+            phase.fields["verified"] = True
+            self.log_message("Download verified.")
+            return True
+
+    def byte_reporter(self, phase):
+        """Adapt extract_zip's cumulative ``progress(bytes_done, bytes_total)`` to ``phase.add``"""
+        reported = 0
+
+        def report(bytes_done, bytes_total):
+            nonlocal reported
+            phase.add(bytes_done - reported)
+            reported = bytes_done
+
+        return report
+
+    def extract_archive(self, temp_file, temp_dir):
+        """Extract downloaded archive"""
+        self.log_message("Extracting files...")
+
+        with self.instrumentation.phase("extract", workers=self.extract_workers) as phase:
+            try:
+                with zipfile.ZipFile(temp_file) as archive:
+                    infos = archive.infolist()
+                phase.expect(sum(info.file_size for info in infos))
+
+                if not extract_zip(temp_file, temp_dir, self._cancel_event, self.byte_reporter(phase),
+                                   members=infos, workers=self.extract_workers):
+                    phase.cancel()
+                    self.log_message("Extraction cancelled.")
+                    return False
+                phase.add(files=sum(1 for info in infos if not info.is_dir()))
+                self.log_message("Extraction complete.")
+                return True
+            except Exception as e:
+                phase.fail(e)
+                self.log_message(f"EXTRACTION ERROR: {e}")
+                return False
+
+    def move_files_to_install_dir(self, temp_dir):
+        """Move files from temp directory to installation directory"""
+        self.log_message("Moving files to installation directory...")
+
+        with self.instrumentation.phase("apply", mode=APPLY_COPY) as phase:
+            try:
+                placer = TreePlacer(temp_dir, self.folder_path, move=True, cancel_event=self._cancel_event,
+                                    progress=self.byte_reporter(phase), workers=self.extract_workers)
+                phase.expect(placer.plan())
+
+                placed = placer.place()
+                phase.add(files=sum(placer.counts.values()))
+                phase.fields["methods"] = {method: count for method, count in placer.counts.items() if count}
+                if not placed:
+                    raise OperationCancelled()
+
+                self.log_message("File move complete.")
+                return True
+
+            except OperationCancelled:
+                phase.cancel()
+                self.log_message("File moving cancelled during operation.")
+                return False
+            except PermissionError as pe:
+                phase.fail(pe)
+                self.log_message(f"PERMISSION ERROR during file move: {pe}. VS Code might be running or files are locked. Please close VS Code and try again.")
+                return False
+            except OSError as e:
+                phase.fail(e)
+                self.log_message(f"FILE OPERATION ERROR during file move: {e}. Please check permissions or if VS Code is running.")
+                return False
+            except Exception as e:
+                phase.fail(e)
+                self.log_message(f"UNEXPECTED ERROR during file move: {e}.")
+                return False
+
+    def cleanup_temp_dir(self, temp_dir):
+        """Remove temporary directory"""
+        self.log_message("Cleaning up temporary directory...")
+
+        with self.instrumentation.phase("cleanup") as phase:
+            try:
+                if os.path.exists(temp_dir):
+                    shutil.rmtree(temp_dir)
+                self.log_message("Temporary directory cleaned up.")
+                return True
+            except Exception as e:
+                phase.fail(e)
+                self.log_message(f"Warning: Error during final temporary directory cleanup: {e}")
+                return False
+
+    def create_portable_data_folder(self):
+        """Create data folder for portable mode"""
+        self.log_message("Creating 'data' folder for portable mode...")
+
+        data_path = os.path.join(self.folder_path, "data")
+        with self.instrumentation.phase("portable-data") as phase:
+            try:
+                if not os.path.exists(data_path):
+                    os.makedirs(data_path)
+                self.log_message("'data' folder created/ensured.")
+                return True
+            except PermissionError as e:
+                phase.fail(e)
+                self.log_message(f"Warning: PERMISSION ERROR creating 'data' folder: {e}. Check permissions.")
+                return False
+            except Exception as e:
+                phase.fail(e)
+                self.log_message(f"Warning: Error creating 'data' folder: {e}.")
+                return False
+
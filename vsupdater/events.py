@@ -0,0 +1,49 @@
+import threading
+from collections import deque
+
+# How often a front end should drain the bus (about 30 frames per second)
+FRAME_INTERVAL_MS = 33
+MAX_PENDING_LINES = 10000
+
+
+class EventBus:
+    """Non-blocking mailbox between the I/O threads and a front end
+
+    ``post_progress`` and ``post_log`` never wait on the UI: progress keeps
+    only the newest value and log lines queue up. The front end calls
+    ``drain`` on its own schedule (a timer at ``FRAME_INTERVAL_MS``) and gets
+    one progress value and one batch of lines per frame, however many were
+    posted in between. If the UI stalls, only the newest
+    ``MAX_PENDING_LINES`` lines are kept; ``dropped_lines`` counts the rest.
+    """
+
+    def __init__(self, max_pending_lines=MAX_PENDING_LINES):
+        self._lock = threading.Lock()
+        self._progress = None
+        self._lines = deque(maxlen=max_pending_lines)
+        self.posted_progress = 0
+        self.posted_lines = 0
+        self.dropped_lines = 0
+        self.frames = 0
+
+    def post_progress(self, value):
+        with self._lock:
+            self._progress = value
+            self.posted_progress += 1
+
+    def post_log(self, message):
+        with self._lock:
+            if len(self._lines) == self._lines.maxlen:
+                self.dropped_lines += 1
+            self._lines.append(message)
+            self.posted_lines += 1
+
+    def drain(self):
+        """Return ``(progress or None, [lines])`` posted since the last call"""
+        with self._lock:
+            progress, self._progress = self._progress, None
+            lines = list(self._lines)
+            self._lines.clear()
+        if progress is not None or lines:
+            self.frames += 1
+        return progress, lines
@@ -0,0 +1,137 @@
+import os
+import zlib
+import struct
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from .constants import DEFAULT_EXTRACT_WORKERS as DEFAULT_WORKERS
+
+READ_CHUNK_SIZE = 1024 * 1024
+LOCAL_HEADER_SIZE = 30
+LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+
+
+def member_target(dest_dir, info):
+    """Filesystem path for ``info`` under ``dest_dir``; rejects names escaping it"""
+    parts = [part for part in info.filename.split("/") if part not in ("", ".")]
+    if not parts or ".." in parts or os.path.isabs(info.filename) or ":" in parts[0]:
+        raise zipfile.BadZipFile(f"Unsafe member name: {info.filename}")
+    return os.path.join(dest_dir, *parts)
+
+
+def extract_zip(archive_path, dest_dir, cancel_event=None, progress=None, members=None, workers=DEFAULT_WORKERS):
+    """Extract a zip archive across a pool of worker threads
+
+    The central directory is read once. All directories are created up front,
+    then file members are handed to ``workers`` threads largest first, so a
+    few big files do not end up as the tail of the run. Each worker reads
+    through its own file handle and inflates members itself (stored and
+    deflated; anything else goes through ``zipfile``), so no lock is shared
+    on the hot path. Cancellation is checked before every member.
+
+    Returns True when every member was extracted and False when cancelled.
+    ``members`` limits extraction to a subset (ZipInfo objects or names).
+    ``progress`` is called as ``progress(bytes_done, bytes_total)`` in
+    uncompressed bytes after each member; calls are serialised, so the
+    values only grow.
+    """
+    with zipfile.ZipFile(archive_path) as archive:
+        if members is None:
+            members = archive.infolist()
+        else:
+            members = [archive.getinfo(member) if isinstance(member, str) else member for member in members]
+
+        # Pre-create the directory tree so workers never race on makedirs
+        directories = {dest_dir}
+        files = []
+        for info in members:
+            target = member_target(dest_dir, info)
+            if info.is_dir():
+                directories.add(target)
+            else:
+                directories.add(os.path.dirname(target))
+                files.append((info, target))
+        for directory in sorted(directories):
+            os.makedirs(directory, exist_ok=True)
+
+        files.sort(key=lambda item: item[0].file_size, reverse=True)
+        total_bytes = sum(info.file_size for info, _ in files)
+        state = {"bytes": 0}
+        state_lock = threading.Lock()
+        abort_event = threading.Event()
+        handles = threading.local()
+        opened = []
+
+        def extract_one(item):
+            if abort_event.is_set() or (cancel_event is not None and cancel_event.is_set()):
+                return
+            info, target = item
+            try:
+                if info.compress_type in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED) and not info.flag_bits & 0x1:
+                    handle = getattr(handles, "fp", None)
+                    if handle is None:
+                        handle = handles.fp = open(archive_path, "rb")
+                        with state_lock:
+                            opened.append(handle)
+                    inflate_member(handle, info, target)
+                else:
+                    with archive.open(info) as source, open(target, "wb") as destination:
+                        while True:
+                            chunk = source.read(READ_CHUNK_SIZE)
+                            if not chunk:
+                                break
+                            destination.write(chunk)
+            except BaseException:
+                abort_event.set()
+                raise
+
+            with state_lock:
+                state["bytes"] += info.file_size
+                if progress:
+                    progress(state["bytes"], total_bytes)
+
+        try:
+            if workers <= 1:
+                for item in files:
+                    extract_one(item)
+            else:
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    for _ in executor.map(extract_one, files):
+                        pass
+        finally:
+            for handle in opened:
+                handle.close()
+
+    return not (cancel_event is not None and cancel_event.is_set())
+
+
+def inflate_member(handle, info, target):
+    """Decompress one stored or deflated member from ``handle`` into ``target``"""
+    handle.seek(info.header_offset)
+    header = handle.read(LOCAL_HEADER_SIZE)
+    if len(header) != LOCAL_HEADER_SIZE or header[:4] != LOCAL_HEADER_SIGNATURE:
+        raise zipfile.BadZipFile(f"Bad local file header for {info.filename}")
+    name_length, extra_length = struct.unpack("<HH", header[26:30])
+    handle.seek(name_length + extra_length, os.SEEK_CUR)
+
+    decompressor = zlib.decompressobj(-zlib.MAX_WBITS) if info.compress_type == zipfile.ZIP_DEFLATED else None
+    remaining = info.compress_size
+    crc = 0
+    with open(target, "wb") as destination:
+        while remaining > 0:
+            chunk = handle.read(min(READ_CHUNK_SIZE, remaining))
+            if not chunk:
+                raise zipfile.BadZipFile(f"Truncated data for {info.filename}")
+            remaining -= len(chunk)
+            if decompressor is not None:
+                chunk = decompressor.decompress(chunk)
+            crc = zlib.crc32(chunk, crc)
+            destination.write(chunk)
+        if decompressor is not None:
+            tail = decompressor.flush()
+            crc = zlib.crc32(tail, crc)
+            destination.write(tail)
+
+    if crc != info.CRC:
+        raise zipfile.BadZipFile(f"Bad CRC-32 for {info.filename}")
@@ -0,0 +1,416 @@
+"""The installer window
+
+Only Qt and the folder detection are imported with this module. The worker,
+and with it the engine, ``requests`` and the zip machinery, is imported in
+the background once the window is on screen (or when an operation starts,
+whichever comes first).
+"""
+import os
+import sys
+import importlib
+import threading
+
+from PySide6.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QWidget, 
+                             QPushButton, QFileDialog, QHBoxLayout, QCheckBox,
+                             QProgressBar, QTextEdit, QMessageBox)
+from PySide6.QtCore import Slot, Qt, QThread, QTimer
+
+from .discovery import describe_install
+from .staging import StagedInstall
+
+# Long enough for the first frame to be painted before the heavy imports compete for the GIL
+PRELOAD_DELAY_MS = 200
+
+
+class MainWindow(QMainWindow):
+    def __init__(self):
+        super().__init__()
+        self.setup_window()
+        self.setup_state()
+        self.setup_ui()
+    
+    def setup_window(self):
+        """Configure window properties"""
+        self.setWindowTitle("VS Code One-click Updater/Installer")
+        self.setGeometry(100, 100, 800, 600)
+    
+    def setup_state(self):
+        """Initialize application state variables"""
+        self.folder_path = None
+        self.is_insider = False
+        self.is_portable = True
+        self.is_operation_in_progress = False
+        self.cancel_requested = False
+        self.active_button = None
+        self.other_button = None
+        self.original_active_button_text = ""
+        self.worker = None
+        self.worker_thread = None
+        self.event_pump = None
+    
+    def setup_ui(self):
+        """Set up the user interface components"""
+        # Central widget setup
+        self.central_widget = QWidget()
+        self.setCentralWidget(self.central_widget)
+        
+        self.main_layout = QVBoxLayout()
+        self.main_layout.setAlignment(Qt.AlignmentFlag.AlignTop)
+        self.central_widget.setLayout(self.main_layout)
+        
+        # Folder selector button
+        self.setup_folder_selector()
+        
+        # Update button
+        self.setup_update_button()
+        
+        # Install controls
+        self.setup_install_widget()
+        
+        # Progress display
+        self.setup_progress_widget()
+    
+    def setup_folder_selector(self):
+        """Create folder selection button"""
+        self.folder_path_selector = QPushButton("Select Folder")
+        self.folder_path_selector.clicked.connect(self.select_folder)
+        self.folder_path_selector.setFixedHeight(30)
+        self.folder_path_selector.setStyleSheet("background-color: white; color: black; border-radius: 5px; padding: 5px; border: 1px solid #ccc;")
+        self.main_layout.addWidget(self.folder_path_selector)
+    
+    def setup_update_button(self):
+        """Create update and rollback buttons (initially hidden)"""
+        self.update_button = QPushButton("Update")
+        self.update_button.setFixedHeight(30)
+        self.update_button.setVisible(False)
+        self.update_button.setStyleSheet("background-color: #4CAF50; color: white; border-radius: 5px; padding: 5px;")
+        self.update_button.clicked.connect(self.handle_update_button_click)
+        self.main_layout.addWidget(self.update_button)
+
+        # Offered only when the last staged update kept the version it replaced
+        self.rollback_button = QPushButton("Restore Previous Version")
+        self.rollback_button.setFixedHeight(30)
+        self.rollback_button.setVisible(False)
+        self.rollback_button.setStyleSheet("background-color: white; color: black; border-radius: 5px; padding: 5px; border: 1px solid #ccc;")
+        self.rollback_button.clicked.connect(self.handle_rollback_button_click)
+        self.main_layout.addWidget(self.rollback_button)
+    
+    def setup_install_widget(self):
+        """Create install controls container and components"""
+        self.install_widget = QWidget()
+        self.install_widget.setVisible(False)
+        
+        self.install_layout = QVBoxLayout()
+        self.install_layout.setAlignment(Qt.AlignmentFlag.AlignTop)
+        self.install_layout.setContentsMargins(0, 0, 0, 0)
+        self.install_layout.setSpacing(10)
+        self.install_widget.setLayout(self.install_layout)
+        
+        # Checkbox container
+        self.checkbox_layout = QHBoxLayout()
+        self.checkbox_layout.setAlignment(Qt.AlignmentFlag.AlignTop)
+        
+        # Insider checkbox
+        self.is_insider_checkbox = QCheckBox("Insider")
+        self.is_insider_checkbox.setChecked(self.is_insider)
+        self.is_insider_checkbox.clicked.connect(self.toggle_insider)
+        
+        # Portable checkbox
+        self.is_portable_checkbox = QCheckBox("Portable")
+        self.is_portable_checkbox.setChecked(self.is_portable)
+        self.is_portable_checkbox.clicked.connect(self.toggle_portable)
+        
+        self.checkbox_layout.addWidget(self.is_insider_checkbox)
+        self.checkbox_layout.addWidget(self.is_portable_checkbox)
+        
+        # Install button
+        self.install_button = QPushButton("Install")
+        self.install_button.setFixedHeight(30)
+        self.install_button.setStyleSheet("background-color: #4CAF50; color: white; border-radius: 5px; padding: 5px;")
+        self.install_button.clicked.connect(self.handle_install_button_click)
+        
+        self.install_layout.addLayout(self.checkbox_layout)
+        self.install_layout.addWidget(self.install_button)
+        
+        self.main_layout.addWidget(self.install_widget)
+    
+    def setup_progress_widget(self):
+        """Create progress display components"""
+        self.progress_widget = QWidget()
+        self.progress_layout = QVBoxLayout()
+        self.progress_widget.setLayout(self.progress_layout)
+        
+        # Progress bar
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setValue(0)
+        self.progress_layout.addWidget(self.progress_bar)
+        
+        # Progress text area
+        self.progress_text = QTextEdit()
+        self.progress_text.setReadOnly(True)
+        self.progress_layout.addWidget(self.progress_text)
+        
+        self.main_layout.addWidget(self.progress_widget)
+        self.progress_widget.setVisible(False)
+    
+    def handle_install_button_click(self):
+        """Handle install button click event"""
+        if self.is_operation_in_progress:
+            self.request_cancellation()
+        else:
+            if not self.folder_path:
+                self.show_progress_message("Please select a folder first.")
+                return
+            self.start_operation(is_install_operation=True)
+    
+    def handle_update_button_click(self):
+        """Handle update button click event"""
+        if self.is_operation_in_progress:
+            self.request_cancellation()
+        else:
+            self.start_operation(is_install_operation=False)
+    
+    def handle_rollback_button_click(self):
+        """Handle rollback button click event"""
+        if self.is_operation_in_progress:
+            return
+        reply = QMessageBox.question(
+            self, "Restore Previous Version",
+            "Replace the current version with the one the last update replaced?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+            QMessageBox.StandardButton.No
+        )
+        if reply == QMessageBox.StandardButton.Yes:
+            self.start_operation(is_install_operation=False, rollback=True)
+    
+    def request_cancellation(self):
+        """Show confirmation dialog and handle cancellation request"""
+        if self.is_operation_in_progress:
+            reply = QMessageBox.warning(
+                self, "Confirm Cancel",
+                "Are you sure you want to cancel the current operation?",
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+                QMessageBox.StandardButton.No
+            )
+            
+            if reply == QMessageBox.StandardButton.Yes:
+                self.cancel_requested = True
+                if self.worker:
+                    self.worker.cancel()
+                self.log_message("Cancellation requested by user...")
+            else:
+                self.log_message("Cancellation aborted by user.")
+    
+    def start_operation(self, is_install_operation, rollback=False):
+        """Begin installation, update or rollback operation"""
+        self.is_operation_in_progress = True
+        self.cancel_requested = False
+        
+        # Setup UI for operation
+        self.progress_widget.setVisible(True)
+        self.progress_bar.setValue(0)
+        self.progress_text.clear()
+        
+        if rollback:
+            self.log_message("Restoring the previous VS Code version...")
+        else:
+            operation_type = "Installing" if is_install_operation else "Updating"
+            self.log_message(f"{operation_type} VS Code...")
+        
+        # Configure buttons
+        if rollback:
+            self.active_button = self.rollback_button
+            self.other_button = self.update_button
+        elif is_install_operation:
+            self.active_button = self.install_button
+            self.other_button = self.update_button
+        else:
+            self.active_button = self.update_button
+            self.other_button = self.install_button
+        
+        # A rollback is two renames and cannot be cancelled halfway
+        self.original_active_button_text = self.active_button.text()
+        if not rollback:
+            self.active_button.setText("Cancel")
+        
+        # Disable controls during operation
+        self.toggle_controls_enabled(False)
+        
+        # Perform operation on a worker thread
+        from .worker import EventPump, OperationWorker
+
+        self.worker_thread = QThread(self)
+        self.worker = OperationWorker(self.folder_path, self.is_insider, self.is_portable, is_install_operation,
+                                      rollback=rollback)
+        self.worker.moveToThread(self.worker_thread)
+        self.worker_thread.started.connect(self.worker.run)
+        # Progress and log lines reach the widgets in batches, once per frame
+        self.event_pump = EventPump(self.worker.bus, self)
+        self.event_pump.progress.connect(self.progress_bar.setValue)
+        self.event_pump.log.connect(self.log_message)
+        self.event_pump.start()
+        self.worker.finished.connect(self.finish_operation)
+        self.worker.finished.connect(self.worker_thread.quit)
+        self.worker_thread.finished.connect(self.worker.deleteLater)
+        self.worker_thread.finished.connect(self.worker_thread.deleteLater)
+        self.worker_thread.start()
+    
+    def toggle_controls_enabled(self, enabled):
+        """Enable or disable UI controls"""
+        self.folder_path_selector.setEnabled(enabled)
+        self.is_insider_checkbox.setEnabled(enabled)
+        self.is_portable_checkbox.setEnabled(enabled)
+        self.rollback_button.setEnabled(enabled)
+        if self.other_button:
+            self.other_button.setEnabled(enabled)
+    
+    @Slot(bool)
+    def finish_operation(self, success):
+        """Complete the operation and reset UI state"""
+        # Deliver whatever the worker posted after the last frame
+        self.event_pump.stop()
+        self.event_pump.deleteLater()
+        self.event_pump = None
+
+        # Restore button states
+        if self.active_button:
+            self.active_button.setText(self.original_active_button_text)
+        
+        # Re-enable controls
+        self.toggle_controls_enabled(True)
+        
+        # Reset operation state
+        self.is_operation_in_progress = False
+        self.active_button = None
+        self.other_button = None
+        self.worker = None
+        self.worker_thread = None
+        
+        if self.cancel_requested:
+            self.log_message("Operation officially cancelled by user.")
+            self.progress_bar.setValue(0)
+        elif success:
+            self.log_message("Installation/Update complete! Resetting UI.")
+            self.progress_bar.setValue(100)
+            self.reset_ui_to_initial_state()
+        else:
+            self.log_message("Operation failed. Check logs above for details.")
+    
+    def reset_ui_to_initial_state(self):
+        """Reset UI to initial state after successful operation"""
+        self.log_message("Resetting UI to initial state...")
+        
+        # Reset state variables
+        self.folder_path = None
+        self.folder_path_selector.setText("Select Folder")
+        self.is_insider = False
+        self.is_portable = True
+        
+        # Reset checkboxes
+        self.is_insider_checkbox.setChecked(self.is_insider)
+        self.is_portable_checkbox.setChecked(self.is_portable)
+        
+        # Reset visibility
+        self.update_button.setVisible(False)
+        self.rollback_button.setVisible(False)
+        self.install_widget.setVisible(False)
+        self.progress_widget.setVisible(False)
+        self.progress_bar.setValue(0)
+        
+        self.log_message("UI Reset. Select a folder to begin or check logs.")
+    
+    def show_progress_message(self, message):
+        """Display a message in the progress area and show it"""
+        self.progress_text.setText(message)
+        self.progress_widget.setVisible(True)
+    
+    @Slot(str)
+    def log_message(self, message):
+        """Add a log message to the progress text area"""
+        self.progress_text.append(message)
+    
+    @Slot()
+    def select_folder(self):
+        """Handle folder selection button click"""
+        if self.is_operation_in_progress:
+            return
+        
+        folder = QFileDialog.getExistingDirectory(self, "Select Folder")
+        if folder:
+            self.folder_path = folder
+            self.folder_path_selector.setText(folder)
+            self.detect_existing_installation(folder)
+    
+    def detect_existing_installation(self, folder):
+        """Detect if a VS Code installation already exists in the selected folder"""
+        try:
+            # Unreadable folders should raise here rather than look empty
+            os.listdir(folder)
+            install = describe_install(folder, measure_size=False)
+
+            is_update_scenario = install is not None
+            if is_update_scenario:
+                self.is_insider = install.quality == "insider"
+            
+            # Update checkbox to match detected version
+            self.is_insider_checkbox.setChecked(self.is_insider)
+            
+            # Show appropriate UI based on detection
+            if is_update_scenario:
+                self.install_widget.setVisible(False)
+                self.update_button.setVisible(True)
+                self.rollback_button.setVisible(StagedInstall(folder).has_previous)
+                version = f"{install.version} " if install.version else ""
+                self.show_progress_message(f"VS Code {'Insider ' if self.is_insider else ''}{version}detected. Ready to update.")
+            else:
+                self.install_widget.setVisible(True)
+                self.update_button.setVisible(False)
+                self.rollback_button.setVisible(False)
+                self.show_progress_message("No VS Code installation detected. Ready to install.")
+                
+        except Exception as e:
+            self.show_progress_message(f"Error reading folder contents: {e}")
+    
+    @Slot()
+    def toggle_insider(self):
+        """Toggle Insider version checkbox"""
+        if self.is_operation_in_progress:
+            return
+        self.is_insider = not self.is_insider
+        self.is_insider_checkbox.setChecked(self.is_insider)
+    
+    @Slot()
+    def toggle_portable(self):
+        """Toggle Portable mode checkbox"""
+        if self.is_operation_in_progress:
+            return
+        self.is_portable = not self.is_portable
+        self.is_portable_checkbox.setChecked(self.is_portable)
+    
+    def closeEvent(self, event):
+        """Stop a running operation before the window goes away"""
+        if self.worker_thread is not None:
+            self.worker.cancel()
+            self.worker_thread.quit()
+            self.worker_thread.wait()
+        super().closeEvent(event)
+
+
+def preload_worker():
+    """Import the worker module on a background thread so the first operation starts without a pause"""
+    threading.Thread(target=importlib.import_module, args=(".worker", __package__), daemon=True).start()
+
+
+def create_window(argv=None):
+    """Create the application and show the main window; returns both"""
+    app = QApplication(sys.argv[:1] if argv is None else argv)
+    window = MainWindow()
+    window.show()
+    QTimer.singleShot(PRELOAD_DELAY_MS, preload_worker)
+    return app, window
+
+
+def run(argv=None):
+    """Show the window and run the event loop until it is closed"""
+    app, window = create_window(argv)
+    return app.exec()
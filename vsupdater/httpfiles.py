@@ -0,0 +1,163 @@
+"""Serving files over HTTP with Range, If-Range and conditional GET support
+
+Shared by the LAN mirror and the local test server in ``benchmarks``. Only
+the standard library is imported here.
+"""
+import os
+import re
+import json
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeFileHandler(BaseHTTPRequestHandler):
+    """Serves the files under ``server.root``, whole or as a single byte range
+
+    Subclasses add routes by overriding ``handle_request`` and falling back
+    to this one, or hand files kept elsewhere to ``send_file``. ``ranges``
+    and ``validators`` switch Range support and the ETag/Last-Modified
+    headers off. ``count`` receives the ``range_requests``, ``not_modified``
+    and ``bytes_sent`` counters, and ``send_file_body`` writes the bytes
+    (``socket.sendfile`` by default), so a test server can throttle or break
+    responses there.
+    """
+
+    protocol_version = "HTTP/1.1"
+    content_type = "application/zip"
+    ranges = True
+    validators = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self.handle_request(send_body=False)
+
+    def do_GET(self):
+        self.handle_request(send_body=True)
+
+    def handle_request(self, send_body):
+        file_path = self.resolve_file(self.path.split("?", 1)[0])
+        if file_path is None:
+            return self.send_status(404)
+        self.send_file(file_path, send_body)
+
+    def resolve_file(self, path):
+        """The file under ``server.root`` that ``path`` names, or None"""
+        root = getattr(self.server, "root", None)
+        if root is None:
+            return None
+        file_path = os.path.realpath(os.path.join(root, path.lstrip("/")))
+        if not file_path.startswith(root + os.sep) or not os.path.isfile(file_path):
+            return None
+        return file_path
+
+    def count(self, **values):
+        pass
+
+    def send_status(self, status, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def send_json(self, data, status=200, send_body=True):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def send_file(self, file_path, send_body, etag=None):
+        """Answer with the file, or the requested byte range of it
+
+        ``etag`` defaults to one built from size and mtime.
+        """
+        stat = os.stat(file_path)
+        size = stat.st_size
+        headers = {}
+        last_modified = None
+        if self.validators:
+            etag = etag or f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+            last_modified = formatdate(stat.st_mtime, usegmt=True)
+            headers.update({"ETag": etag, "Last-Modified": last_modified})
+
+            if_none_match = self.headers.get("If-None-Match")
+            if if_none_match and (if_none_match.strip() == "*"
+                                  or etag in [tag.strip() for tag in if_none_match.split(",")]):
+                self.count(not_modified=1)
+                return self.send_status(304, headers)
+            if if_none_match is None and not_modified_since(self.headers.get("If-Modified-Since"), stat.st_mtime):
+                self.count(not_modified=1)
+                return self.send_status(304, headers)
+        if self.ranges:
+            headers["Accept-Ranges"] = "bytes"
+
+        start, end, status = 0, size - 1, 200
+        range_header = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        if self.ranges and range_header and (
+                if_range is None or (self.validators and if_range.strip() in (etag, last_modified))):
+            byte_range = parse_range(range_header, size)
+            if byte_range is False:
+                return self.send_status(416, {"Content-Range": f"bytes */{size}"})
+            if byte_range is not None:
+                start, end = byte_range
+                status = 206
+
+        length = end - start + 1
+        self.send_response(status)
+        self.send_header("Content-Type", self.content_type)
+        self.send_header("Content-Length", str(length))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if status == 206:
+            self.count(range_requests=1)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        if not send_body or not length:
+            return
+
+        sent = self.send_file_body(file_path, start, length)
+        self.count(bytes_sent=sent)
+        if sent < length:
+            self.close_connection = True
+
+    def send_file_body(self, file_path, start, length):
+        """Write ``length`` bytes of the file from ``start``; returns how many were sent"""
+        with open(file_path, "rb") as f:
+            # socket.sendfile uses the kernel's sendfile where there is one and plain sends elsewhere
+            return self.connection.sendfile(f, start, length)
+
+
+def parse_range(header, size):
+    """``(start, end)`` for a single-range header, None to ignore it, False when unsatisfiable"""
+    match = RANGE_PATTERN.match(header.strip())
+    if match is None or not (match.group(1) or match.group(2)):
+        # Malformed or multi-range; answering with the whole file is allowed
+        return None
+    if not match.group(1):
+        suffix = int(match.group(2))
+        if not suffix or not size:
+            return False
+        return max(0, size - suffix), size - 1
+    start = int(match.group(1))
+    end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def not_modified_since(header, mtime):
+    if not header:
+        return False
+    try:
+        return int(mtime) <= parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return False
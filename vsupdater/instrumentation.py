@@ -0,0 +1,270 @@
+import os
+import json
+import time
+import uuid
+import logging
+import cProfile
+import threading
+import logging.handlers
+from contextlib import contextmanager
+
+from .constants import user_data_path
+
+EVENT_LOG_NAME = "events.jsonl"
+EVENT_LOG_MAX_BYTES = 2 * 1024 * 1024
+EVENT_LOG_BACKUPS = 5
+# Until extraction reports the real figure, assume archives inflate about this much
+ESTIMATED_COMPRESSION_RATIO = 2.5
+
+STATUS_OK = "ok"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"
+
+_event_loggers = {}
+_event_loggers_lock = threading.Lock()
+# Held while an operation is profiled; since Python 3.12 only one profiler may be active per process
+_profiler_lock = threading.Lock()
+
+
+def event_log_listener(log_dir=None):
+    """Listener appending every event as one JSON line to a rotating log file
+
+    One handler exists per file for the whole process, so any number of
+    engines can share it. Returns None when the directory cannot be created.
+    """
+    path = os.path.join(log_dir or user_data_path("logs", "VSUPDATER_LOG_DIR"), EVENT_LOG_NAME)
+    with _event_loggers_lock:
+        logger = _event_loggers.get(path)
+        if logger is None:
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                handler = logging.handlers.RotatingFileHandler(
+                    path, maxBytes=EVENT_LOG_MAX_BYTES, backupCount=EVENT_LOG_BACKUPS, encoding="utf-8", delay=True,
+                )
+            except OSError:
+                return None
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger = logging.getLogger(f"vsupdater.events.{len(_event_loggers)}")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            logger.addHandler(handler)
+            _event_loggers[path] = logger
+
+    def write(event):
+        logger.info(json.dumps(event, default=str))
+
+    return write
+
+
+class ProgressModel:
+    """Overall progress weighted by the bytes each phase has to process
+
+    Phases announce how many bytes they expect (``expect``) and how many
+    they have handled (``advance``). The percentage is the share of all
+    expected bytes handled so far. Totals that are not known yet can be
+    estimated and corrected later; the reported value never goes backwards
+    and stays below 100 until ``finish``.
+    """
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.totals = {}
+        self.done = {}
+        self.last_percent = 0
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self.totals.clear()
+            self.done.clear()
+            self.last_percent = 0
+
+    def expect(self, phase, total_bytes):
+        with self._lock:
+            self.totals[phase] = max(0, int(total_bytes))
+            self.done.setdefault(phase, 0)
+        self.report()
+
+    def advance(self, phase, byte_count):
+        with self._lock:
+            self.done[phase] = self.done.get(phase, 0) + byte_count
+        self.report()
+
+    def restart(self, phase):
+        """Count ``phase`` from zero again because its work is being redone; the bar holds still meanwhile"""
+        with self._lock:
+            self.done[phase] = 0
+
+    def complete(self, phase):
+        with self._lock:
+            self.done[phase] = max(self.done.get(phase, 0), self.totals.get(phase, 0))
+        self.report()
+
+    def percent(self):
+        with self._lock:
+            total = sum(self.totals.values())
+            if not total:
+                return self.last_percent
+            done = sum(min(self.done.get(phase, 0), phase_total) for phase, phase_total in self.totals.items())
+            value = max(self.last_percent, min(99, int(done * 100 / total)))
+            self.last_percent = value
+            return value
+
+    def report(self):
+        previous = self.last_percent
+        value = self.percent()
+        if self.callback and value != previous:
+            self.callback(value)
+
+    def finish(self):
+        self.last_percent = 100
+        if self.callback:
+            self.callback(100)
+
+
+class Phase:
+    """Counters for one running phase; handed out by ``Instrumentation.phase``"""
+
+    def __init__(self, instrumentation, name, fields):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.fields = fields
+        self.bytes = 0
+        self.files = 0
+        self.status = STATUS_OK
+        self.error = None
+        self.started = time.time()
+        self._started_perf = time.perf_counter()
+
+    def expect(self, total_bytes):
+        """Announce how many bytes this phase will process (for the progress bar)"""
+        self.fields["bytes_total"] = total_bytes
+        self.instrumentation.progress.expect(self.name, total_bytes)
+
+    def add(self, byte_count=0, files=0):
+        self.bytes += byte_count
+        self.files += files
+        if byte_count:
+            self.instrumentation.progress.advance(self.name, byte_count)
+
+    def fail(self, error):
+        self.status = STATUS_FAILED
+        self.error = str(error)
+
+    def cancel(self):
+        self.status = STATUS_CANCELLED
+
+    def to_event(self):
+        duration = time.perf_counter() - self._started_perf
+        event = {
+            "phase": self.name,
+            "status": self.status,
+            "start": self.started,
+            "end": self.started + duration,
+            "seconds": round(duration, 6),
+            "bytes": self.bytes,
+            "files": self.files,
+            "bytes_per_second": round(self.bytes / duration) if duration > 0 and self.bytes else None,
+        }
+        if self.error:
+            event["error"] = self.error
+        event.update(self.fields)
+        return event
+
+
+class Instrumentation:
+    """Structured timing events for one engine
+
+    Each ``phase`` block emits a ``phase`` event when it ends. The event has
+    start/end times, bytes and files handled, throughput, status and error.
+    ``operation`` wraps a whole run in ``operation_start``/``operation_end``
+    events. Every event goes to each listener (a callable taking a dict);
+    the default set writes the rotating JSON-lines log. When ``profile_dir``
+    is set, each operation also runs under cProfile and the stats are dumped
+    to ``<profile_dir>/<operation_id>.prof``. Only the thread that runs the
+    operation is profiled; worker pools are not. Operations that overlap
+    (batch mode) are profiled one at a time: one that starts while another
+    is profiled runs without, and its ``operation_end`` has no profile path.
+    """
+
+    def __init__(self, listeners=None, progress=None, profile_dir=None):
+        self.listeners = [listener for listener in (listeners or []) if listener is not None]
+        self.progress = ProgressModel(progress)
+        self.profile_dir = profile_dir
+        self.operation_id = None
+
+    @classmethod
+    def default(cls, progress=None):
+        """JSON-lines log in the default location, profiling if ``VSUPDATER_PROFILE_DIR`` is set"""
+        listeners = []
+        if os.environ.get("VSUPDATER_EVENT_LOG", "1") != "0":
+            listeners.append(event_log_listener())
+        return cls(listeners, progress, profile_dir=os.environ.get("VSUPDATER_PROFILE_DIR") or None)
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def emit(self, event_type, **fields):
+        event = {"event": event_type, "time": time.time(), "operation_id": self.operation_id}
+        event.update(fields)
+        for listener in self.listeners:
+            try:
+                listener(event)
+            except Exception:
+                # Telemetry must never break an update
+                pass
+
+    @contextmanager
+    def operation(self, name, **fields):
+        """Wrap one install/update; yields a dict the caller fills with ``ok``"""
+        self.operation_id = uuid.uuid4().hex[:12]
+        self.progress.reset()
+        result = {"ok": False}
+        started = time.perf_counter()
+        self.emit("operation_start", operation=name, **fields)
+        profiler = self.start_profiler() if self.profile_dir else None
+        try:
+            yield result
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                _profiler_lock.release()
+                result["profile"] = self.dump_profile(profiler)
+            self.emit("operation_end", operation=name, seconds=round(time.perf_counter() - started, 6), **result)
+
+    def start_profiler(self):
+        """An enabled profiler, or None when another operation (or tool) is already profiling"""
+        if not _profiler_lock.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # "Another profiling tool is already active" (a debugger, coverage, ...)
+            _profiler_lock.release()
+            return None
+        return profiler
+
+    def dump_profile(self, profiler):
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            path = os.path.join(self.profile_dir, f"{self.operation_id}.prof")
+            profiler.dump_stats(path)
+            return path
+        except OSError:
+            return None
+
+    @contextmanager
+    def phase(self, name, **fields):
+        """Time a block as phase ``name``; exceptions mark it failed and propagate"""
+        phase = Phase(self, name, dict(fields))
+        try:
+            yield phase
+        except BaseException as e:
+            if phase.status == STATUS_OK:
+                phase.fail(e)
+            raise
+        finally:
+            if phase.status == STATUS_OK:
+                self.progress.complete(name)
+            self.emit("phase", **phase.to_event())
@@ -0,0 +1,117 @@
+import os
+import time
+import hashlib
+import threading
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def sha256_file(path, cancel_event=None):
+    """Return the hex SHA-256 of ``path``, or None if cancelled part-way"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                return None
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class StreamingHasher:
+    """Compute a file's SHA-256 from the bytes as they are written
+
+    Writers report every chunk with ``update(offset, data)`` from any thread.
+    Chunks that extend the hashed prefix are hashed immediately; chunks that
+    arrive ahead of it (parallel ranged downloads) are held in a bounded
+    buffer until the gap is filled. Ranges already on disk from an earlier
+    run are registered with ``mark_on_disk`` and read back only when the
+    prefix reaches them. Whatever could not be hashed in-stream (buffer
+    overflow) is read back from disk by ``finish``; ``bytes_reread`` says how
+    much that was.
+    """
+
+    def __init__(self, path, max_pending=32 * 1024 * 1024):
+        self.path = path
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget everything hashed so far (the file is being rewritten)"""
+        self.bytes_streamed = 0
+        self.bytes_reread = 0
+        self.hash_seconds = 0.0
+        self._digest = hashlib.sha256()
+        self._hashed_to = 0
+        self._pending = {}
+        self._pending_bytes = 0
+
+    def update(self, offset, data):
+        """Record ``data`` written at ``offset``"""
+        with self._lock:
+            if offset == self._hashed_to:
+                self._hash(data)
+                self.bytes_streamed += len(data)
+                self._drain()
+            elif offset > self._hashed_to and self._pending_bytes + len(data) <= self.max_pending:
+                self._pending[offset] = bytes(data)
+                self._pending_bytes += len(data)
+
+    def mark_on_disk(self, offset, length):
+        """Register bytes that are already in the file and need no download"""
+        if length <= 0:
+            return
+        with self._lock:
+            if offset == self._hashed_to:
+                self._hash_from_disk(offset, length)
+                self._drain()
+            elif offset > self._hashed_to:
+                self._pending[offset] = length
+
+    def finish(self, total_size=None):
+        """Hash any remaining bytes from disk and return the hex digest"""
+        with self._lock:
+            self._drain()
+            if total_size is None:
+                total_size = os.path.getsize(self.path)
+            if self._hashed_to < total_size:
+                self._hash_from_disk(self._hashed_to, total_size - self._hashed_to)
+            self._pending.clear()
+            self._pending_bytes = 0
+            return self._digest.hexdigest()
+
+    @property
+    def throughput(self):
+        """Hashing speed in bytes per second of CPU time spent in SHA-256"""
+        hashed = self.bytes_streamed + self.bytes_reread
+        return hashed / self.hash_seconds if self.hash_seconds else 0.0
+
+    def _drain(self):
+        while self._hashed_to in self._pending:
+            item = self._pending.pop(self._hashed_to)
+            if isinstance(item, int):
+                self._hash_from_disk(self._hashed_to, item)
+            else:
+                self._pending_bytes -= len(item)
+                self._hash(item)
+                self.bytes_streamed += len(item)
+
+    def _hash(self, data):
+        started = time.perf_counter()
+        self._digest.update(data)
+        self.hash_seconds += time.perf_counter() - started
+        self._hashed_to += len(data)
+
+    def _hash_from_disk(self, offset, length):
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            while length > 0:
+                chunk = f.read(min(HASH_CHUNK_SIZE, length))
+                if not chunk:
+                    raise IOError(f"{self.path} is shorter than expected")
+                self._hash(chunk)
+                self.bytes_reread += len(chunk)
+                length -= len(chunk)
@@ -0,0 +1,250 @@
+"""LAN mirror: fetch each build once and serve it to the other updaters on the network
+
+    python -m vsupdater.mirror --port 8750 --quality stable insider --poll 600
+
+Clients point at it with ``VSUPDATER_MIRROR=http://<host>:8750`` (or
+``--mirror`` in batch mode). The mirror answers the update service's
+``/api/update/win32-x64-archive/<quality>/latest`` request with the
+upstream description, but with ``url`` pointing at its own copy and the
+original URL in ``upstreamUrl``. Until a build is in the mirror, the upstream
+description is passed through unchanged and the build is fetched in the
+background. Clients keep verifying the upstream SHA-256, so the mirror does
+not need to be trusted. Archives are kept in an ``ArchiveCache`` and served
+from ``/builds/<entry name>`` with Range, ETag and conditional GET support.
+``/_status`` lists the mirrored builds and counters.
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import threading
+from http.server import ThreadingHTTPServer
+
+import requests
+
+from .cache import ArchiveCache, DEFAULT_MAX_BYTES, ENTRY_PATTERN
+from .engine import UpdateEngine
+from .httpfiles import RangeFileHandler
+from .instrumentation import Instrumentation
+from .version import PLATFORM, Release, fetch_release_data
+
+DEFAULT_PORT = 8750
+DEFAULT_POLL_SECONDS = 0
+# Upstream "latest" answers are reused for this long; clients may poll often
+RELEASE_TTL_SECONDS = 60
+BUILDS_PATH = "/builds/"
+API_PATTERN = re.compile(rf"^/api/update/{re.escape(PLATFORM)}/(stable|insider)/latest$")
+
+
+class BuildMirror:
+    """Keeps the latest upstream builds in an archive cache
+
+    ``latest(quality)`` returns the update-service JSON for the newest
+    build. ``url`` points at the mirror once the build is there. A build is
+    downloaded and verified at most once, in a background thread, however
+    many clients ask for it meanwhile.
+    """
+
+    def __init__(self, cache, upstream_api=None, work_dir=None, log=None, connections=4):
+        self.cache = cache
+        self.upstream_api = upstream_api
+        self.work_dir = work_dir or os.path.join(cache.root, ".mirror")
+        self.log_callback = log
+        self.connections = connections
+        self.verified = set()
+        self.stats = {"api_requests": 0, "build_requests": 0, "range_requests": 0, "not_modified": 0,
+                      "bytes_sent": 0, "fetches": 0, "fetch_failures": 0}
+        self._releases = {}
+        self._fetching = {}
+        self._lock = threading.Lock()
+
+    def log_message(self, message):
+        if self.log_callback:
+            self.log_callback(message)
+
+    def count(self, **values):
+        with self._lock:
+            for key, value in values.items():
+                self.stats[key] += value
+
+    def upstream_release(self, quality):
+        """Upstream JSON for ``quality``, reused for ``RELEASE_TTL_SECONDS``"""
+        with self._lock:
+            cached = self._releases.get(quality)
+        if cached and time.monotonic() - cached[0] < RELEASE_TTL_SECONDS:
+            return cached[1]
+        data = fetch_release_data(quality, self.upstream_api)
+        with self._lock:
+            self._releases[quality] = (time.monotonic(), data)
+        return data
+
+    def latest(self, quality, base_url):
+        data = dict(self.upstream_release(quality))
+        commit, sha256 = data.get("version"), data.get("sha256hash")
+        if not (commit and sha256):
+            # Nothing to verify a copy against; clients go upstream
+            return data
+        name = os.path.basename(self.cache.entry_path(quality, commit, sha256))
+        if name in self.verified:
+            data["upstreamUrl"] = data.get("url")
+            data["url"] = f"{base_url}{BUILDS_PATH}{name}"
+        else:
+            self.ensure(quality, data)
+        return data
+
+    def ensure(self, quality, data):
+        """Start fetching the build described by ``data`` unless it is already on its way"""
+        key = (quality, data["version"])
+        with self._lock:
+            if key in self._fetching:
+                return
+            thread = threading.Thread(target=self.fetch, args=(quality, data), daemon=True)
+            self._fetching[key] = thread
+        thread.start()
+
+    def fetch(self, quality, data):
+        key = (quality, data["version"])
+        try:
+            engine = UpdateEngine(None, is_insider=quality == "insider", log=self.log_message,
+                                  download_connections=self.connections, cache_dir=self.cache.root,
+                                  work_dir=self.work_dir, instrumentation=Instrumentation.default())
+            engine.release = Release.from_json(quality, data)
+            self.log_message(f"Mirroring {quality} {engine.release.version} ({engine.release.commit})...")
+            try:
+                path = engine.fetch_archive(os.path.join(self.work_dir, "downloads"))
+            except requests.exceptions.RequestException as e:
+                self.log_message(f"NETWORK ERROR while mirroring {quality}: {e}")
+                path = None
+            if path is None or not engine.is_cached(path):
+                self.count(fetch_failures=1)
+                return
+            with self._lock:
+                self.verified.add(os.path.basename(path))
+                self.stats["fetches"] += 1
+            self.log_message(f"Mirrored {os.path.basename(path)}.")
+        finally:
+            with self._lock:
+                self._fetching.pop(key, None)
+
+    def refresh(self, qualities):
+        """Look for new builds of ``qualities`` and start fetching them"""
+        for quality in qualities:
+            try:
+                self.latest(quality, "")
+            except (requests.exceptions.RequestException, ValueError) as e:
+                self.log_message(f"Notice: Could not check the latest {quality} build: {e}")
+
+    def poll(self, qualities, interval, stop_event):
+        while not stop_event.is_set():
+            self.refresh(qualities)
+            stop_event.wait(interval)
+
+    def entry(self, name):
+        """``(path, sha256)`` of a servable build, or None"""
+        match = ENTRY_PATTERN.match(name)
+        if match is None or name not in self.verified:
+            return None
+        path = os.path.join(self.cache.root, name)
+        if not os.path.isfile(path):
+            with self._lock:
+                self.verified.discard(name)
+            return None
+        return path, match.group(3)
+
+    def status(self):
+        with self._lock:
+            return {
+                "builds": sorted(self.verified),
+                "fetching": [f"{quality}-{commit}" for quality, commit in self._fetching],
+                "stats": dict(self.stats),
+            }
+
+
+class MirrorServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address, mirror):
+        super().__init__(address, MirrorHandler)
+        self.mirror = mirror
+
+    def handle_error(self, request, client_address):
+        # Clients hanging up mid-response are expected (cancelled downloads, probes)
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+
+class MirrorHandler(RangeFileHandler):
+    def count(self, **values):
+        self.server.mirror.count(**values)
+
+    def handle_request(self, send_body):
+        mirror = self.server.mirror
+        path = self.path.split("?", 1)[0]
+        if path == "/_status":
+            return self.send_json(mirror.status(), send_body=send_body)
+
+        match = API_PATTERN.match(path)
+        if match:
+            mirror.count(api_requests=1)
+            host = self.headers.get("Host") or "%s:%d" % self.server.server_address[:2]
+            try:
+                return self.send_json(mirror.latest(match.group(1), f"http://{host}"), send_body=send_body)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                return self.send_json({"error": str(e)}, status=502, send_body=send_body)
+
+        if path.startswith(BUILDS_PATH):
+            entry = mirror.entry(path[len(BUILDS_PATH):])
+            if entry is not None:
+                mirror.count(build_requests=1)
+                file_path, sha256 = entry
+                # Entries are content-addressed, so the hash is a strong validator
+                return self.send_file(file_path, send_body, etag=f'"{sha256}"')
+        self.send_status(404)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m vsupdater.mirror", description="Serve VS Code builds on the LAN")
+    parser.add_argument("--host", default="0.0.0.0", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port to listen on (0 picks a free one)")
+    parser.add_argument("--quality", nargs="+", choices=("stable", "insider"), default=["stable"],
+                        help="Builds to fetch ahead of the first request")
+    parser.add_argument("--poll", type=float, default=DEFAULT_POLL_SECONDS,
+                        help="Seconds between checks for new builds (0 = only when clients ask)")
+    parser.add_argument("--update-api", help="Base URL of the upstream update service")
+    parser.add_argument("--cache-dir", help="Where mirrored archives are kept (default: the archive cache)")
+    parser.add_argument("--cache-max-mb", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024))
+    parser.add_argument("--connections", type=int, default=4, help="Parallel connections for upstream downloads")
+    parser.add_argument("--work-dir", help="Directory for partial downloads")
+    parser.add_argument("--quiet", action="store_true", help="Do not log to stderr")
+    options = parser.parse_args(argv)
+
+    def log(message):
+        print(f"{time.strftime('%H:%M:%S')} {message}", file=sys.stderr, flush=True)
+
+    cache = ArchiveCache(options.cache_dir, max_bytes=options.cache_max_mb * 1024 * 1024)
+    mirror = BuildMirror(cache, options.update_api, options.work_dir, None if options.quiet else log,
+                         options.connections)
+    # Builds already in the cache are verified once before they are offered
+    mirror.refresh(options.quality)
+
+    server = MirrorServer((options.host, options.port), mirror)
+    host, port = server.server_address[:2]
+    print(f"http://{'127.0.0.1' if host == '0.0.0.0' else host}:{port}", flush=True)
+
+    stop_event = threading.Event()
+    if options.poll > 0:
+        threading.Thread(target=mirror.poll, args=(options.quality, options.poll, stop_event), daemon=True).start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_event.set()
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,232 @@
+import os
+import sys
+import errno
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_WORKERS = min(8, (os.cpu_count() or 1) * 2)
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+# Copies are written next to their destination under this suffix and renamed into place
+TEMP_SUFFIX = ".vsupdater-tmp"
+
+# How a file was placed
+METHOD_RENAME = "rename"
+METHOD_REFLINK = "reflink"
+METHOD_COPY_RANGE = "copy-range"
+METHOD_COPY = "copy"
+
+# linux/fs.h: _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+# Errors meaning "this filesystem pair cannot do that", not "this file is broken"
+UNSUPPORTED_ERRNOS = {errno.EXDEV, errno.EINVAL, errno.ENOTTY, errno.EOPNOTSUPP, errno.ENOSYS, errno.EBADF}
+
+
+class TreePlacer:
+    """Put the files of one directory tree into another, as cheaply as the filesystems allow
+
+    Each file goes through the first method that works:
+
+    1. ``os.replace`` when moving within one filesystem (no data is copied),
+    2. a reflink clone (``FICLONE``; btrfs, XFS and similar share the blocks),
+    3. ``os.copy_file_range`` (the kernel copies without a round trip through Python),
+    4. a buffered copy through one reused buffer per thread.
+
+    A method that the filesystem pair rejects is not tried again for the rest
+    of the run. Copies run on ``workers`` threads, largest files first, and
+    go to a temporary sibling that replaces the destination only once it is
+    complete, so cancelling never leaves a truncated file behind.
+    ``progress(bytes_done, bytes_total)`` is called with cumulative bytes
+    (serialised, so the values only grow) while files are placed, including
+    partway through large copies. ``counts`` records how many files each
+    method handled.
+    """
+
+    def __init__(self, source_dir, dest_dir, move=True, cancel_event=None, progress=None, workers=DEFAULT_WORKERS):
+        self.source_dir = source_dir
+        self.dest_dir = dest_dir
+        self.move = move
+        self.cancel_event = cancel_event
+        self.progress = progress
+        self.workers = max(1, workers)
+        self.counts = {METHOD_RENAME: 0, METHOD_REFLINK: 0, METHOD_COPY_RANGE: 0, METHOD_COPY: 0}
+        self.bytes_total = 0
+        self.bytes_done = 0
+        self.use_reflink = sys.platform.startswith("linux")
+        self.use_copy_range = hasattr(os, "copy_file_range")
+        self._lock = threading.Lock()
+        self._buffers = threading.local()
+        self._plan = None
+
+    @property
+    def cancelled(self):
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
+    def plan(self):
+        """Scan the source tree; returns the number of bytes to place"""
+        self._plan = scan_tree(self.source_dir, self.dest_dir)
+        self.bytes_total = sum(size for _, _, size in self._plan[1])
+        return self.bytes_total
+
+    def place(self):
+        """Place every file; returns True when done and False when cancelled"""
+        if self._plan is None:
+            self.plan()
+        directories, files = self._plan
+        for directory in directories:
+            os.makedirs(directory, exist_ok=True)
+
+        if self.move and same_filesystem(self.source_dir, self.dest_dir):
+            for item in files:
+                if self.cancelled:
+                    return False
+                self.rename(item)
+            return True
+
+        files.sort(key=lambda item: item[2], reverse=True)
+        abort_event = threading.Event()
+
+        def place_one(item):
+            if abort_event.is_set() or self.cancelled:
+                return
+            try:
+                self.copy(item)
+            except BaseException:
+                abort_event.set()
+                raise
+
+        if self.workers <= 1:
+            for item in files:
+                place_one(item)
+        else:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                for _ in executor.map(place_one, files):
+                    pass
+        return not self.cancelled
+
+    def rename(self, item):
+        source, destination, size = item
+        try:
+            os.replace(source, destination)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            # A mount point inside the tree; copy this one
+            self.copy(item)
+            return
+        self.finish_file(METHOD_RENAME, size)
+
+    def copy(self, item):
+        """Copy into a sibling temporary file and swap it in, so the live file is never left half written"""
+        source, destination, size = item
+        temp_path = destination + TEMP_SUFFIX
+        try:
+            with open(source, "rb") as src, open(temp_path, "wb") as dst:
+                if self.use_reflink and size and self.reflink(src, dst):
+                    method = METHOD_REFLINK
+                    self.add_bytes(size)
+                else:
+                    copied = self.copy_range(src, dst, size) if self.use_copy_range and size else 0
+                    method = METHOD_COPY_RANGE if size else METHOD_COPY
+                    if copied < size:
+                        # Unsupported or stopped partway; finish with plain reads from where it got to
+                        method = METHOD_COPY
+                        self.buffered_copy(src, dst, copied)
+                    if self.cancelled:
+                        return
+            shutil.copystat(source, temp_path)
+            os.replace(temp_path, destination)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        if self.move:
+            os.remove(source)
+        self.finish_file(method, 0)
+
+    def reflink(self, src, dst):
+        """Clone ``src`` into ``dst`` with ``FICLONE``; False when the filesystems cannot"""
+        try:
+            import fcntl
+        except ImportError:
+            self.use_reflink = False
+            return False
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            return True
+        except OSError as e:
+            if e.errno in UNSUPPORTED_ERRNOS:
+                self.use_reflink = False
+                return False
+            raise
+
+    def copy_range(self, src, dst, size):
+        """Copy with ``copy_file_range``; returns the bytes copied before it stopped"""
+        copied = 0
+        while copied < size and not self.cancelled:
+            try:
+                count = os.copy_file_range(src.fileno(), dst.fileno(), min(COPY_CHUNK_SIZE, size - copied),
+                                           copied, copied)
+            except OSError as e:
+                if e.errno not in UNSUPPORTED_ERRNOS:
+                    raise
+                if not copied:
+                    self.use_copy_range = False
+                break
+            if not count:
+                break
+            copied += count
+            self.add_bytes(count)
+        return copied
+
+    def buffered_copy(self, src, dst, offset):
+        """Copy from ``offset`` to the end of ``src`` through this thread's reused buffer"""
+        view = getattr(self._buffers, "view", None)
+        if view is None:
+            view = self._buffers.view = memoryview(bytearray(COPY_CHUNK_SIZE))
+        src.seek(offset)
+        dst.seek(offset)
+        while not self.cancelled:
+            count = src.readinto(view)
+            if not count:
+                break
+            dst.write(view[:count])
+            self.add_bytes(count)
+
+    def add_bytes(self, byte_count):
+        if not byte_count:
+            return
+        with self._lock:
+            self.bytes_done += byte_count
+            if self.progress:
+                self.progress(self.bytes_done, self.bytes_total)
+
+    def finish_file(self, method, byte_count):
+        with self._lock:
+            self.counts[method] += 1
+        self.add_bytes(byte_count)
+
+
+def scan_tree(source_dir, dest_dir):
+    """Destination directories (parents first) and ``(source, destination, size)`` for every file"""
+    directories = [dest_dir]
+    files = []
+    pending = [(source_dir, dest_dir)]
+    while pending:
+        source, destination = pending.pop()
+        with os.scandir(source) as it:
+            for entry in it:
+                target = os.path.join(destination, entry.name)
+                if entry.is_dir(follow_symlinks=False):
+                    directories.append(target)
+                    pending.append((entry.path, target))
+                else:
+                    files.append((entry.path, target, entry.stat().st_size))
+    return directories, files
+
+
+def same_filesystem(first, second):
+    """Whether a rename between the two existing paths can work"""
+    try:
+        return os.stat(first).st_dev == os.stat(second).st_dev
+    except OSError:
+        return False
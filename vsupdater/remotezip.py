@@ -0,0 +1,207 @@
+import io
+import os
+import bisect
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from .download import ValidatorChanged
+from .extract import member_target
+
+TAIL_SIZE = 2 * 1024 * 1024
+MIN_FETCH_SIZE = 64 * 1024
+COALESCE_GAP = 64 * 1024
+PREFETCH_CONNECTIONS = 4
+WRITE_CHUNK_SIZE = 1024 * 1024
+# Above this share of the archive, the changed members are downloaded as a whole archive instead
+MAX_PREFETCH_FRACTION = 0.5
+
+
+class RangeNotSupported(Exception):
+    """The server cannot serve safe byte ranges: it sent the full body or no validator"""
+
+
+class RemoteZipReader(io.RawIOBase):
+    """Seekable read-only view of a remote file, backed by HTTP Range requests
+
+    Fetched byte ranges are kept in memory. Reads are served from them and
+    missing bytes are fetched on demand, so ``zipfile.ZipFile`` can parse the
+    archive as if it were local. ``prefetch`` pulls many ranges up front over
+    a few parallel connections; callers keep it below ``MAX_PREFETCH_FRACTION``
+    of the archive, since every fetched byte stays in memory.
+    """
+
+    def __init__(self, transport, url, size, validator):
+        super().__init__()
+        self.transport = transport
+        self.url = url
+        self.size = size
+        self.validator = validator
+        self.bytes_fetched = 0
+        self.requests_made = 0
+        self._starts = []
+        self._blocks = []
+        self._position = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, transport, url, tail_size=TAIL_SIZE):
+        """Probe ``url`` with a suffix range and keep the tail (central directory)"""
+        response = transport.get(url, headers={"Range": f"bytes=-{tail_size}"}, stream=True)
+        response.raise_for_status()
+        content_range = response.headers.get("Content-Range", "")
+        total = content_range.rpartition("/")[2]
+        if response.status_code != 206 or not total.isdigit():
+            # Do not pull the whole archive through a probe
+            response.close()
+            raise RangeNotSupported(f"{url} does not support byte ranges")
+
+        validator = response.headers.get("ETag") or response.headers.get("Last-Modified")
+        if not validator:
+            # Without If-Range, ranges of a replaced build would be mixed in silently
+            response.close()
+            raise RangeNotSupported(f"{url} sends no ETag or Last-Modified for ranged requests")
+        reader = cls(transport, response.url, int(total), validator)
+        reader.requests_made += 1
+        reader.bytes_fetched += len(response.content)
+        reader._insert(reader.size - len(response.content), response.content)
+        return reader
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self._position = offset
+        elif whence == io.SEEK_CUR:
+            self._position += offset
+        elif whence == io.SEEK_END:
+            self._position = self.size + offset
+        else:
+            raise ValueError(f"invalid whence ({whence})")
+        return self._position
+
+    def readinto(self, buffer):
+        data = self.read_at(self._position, len(buffer))
+        buffer[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+    def read_at(self, offset, length):
+        """Return up to ``length`` bytes at ``offset``, fetching what is missing"""
+        length = max(0, min(length, self.size - offset))
+        parts = []
+        while length > 0:
+            block = self._find(offset)
+            if block is None:
+                end = min(self.size, offset + max(length, MIN_FETCH_SIZE)) - 1
+                self._insert(offset, self.fetch(offset, end))
+                continue
+            start, data = block
+            piece = data[offset - start:offset - start + length]
+            parts.append(piece)
+            offset += len(piece)
+            length -= len(piece)
+        return b"".join(parts)
+
+    def fetch(self, start, end):
+        """GET bytes ``start``..``end`` (inclusive) of the same build, retrying transient failures"""
+        return self.transport.call(lambda: self.fetch_once(start, end))
+
+    def fetch_once(self, start, end):
+        headers = {"Range": f"bytes={start}-{end}", "If-Range": self.validator}
+        response = self.transport.get(self.url, headers=headers, retries=0)
+        response.raise_for_status()
+        if response.status_code != 206:
+            raise ValidatorChanged(f"{self.url} changed while it was being read")
+        data = response.content
+        if len(data) != end - start + 1:
+            raise requests.exceptions.ConnectionError(
+                f"Expected {end - start + 1} bytes for range {start}-{end}, got {len(data)}")
+        with self._lock:
+            self.requests_made += 1
+            self.bytes_fetched += len(data)
+        return data
+
+    def prefetch(self, ranges, cancel_event=None, connections=PREFETCH_CONNECTIONS):
+        """Fetch ``(start, end)`` ranges in parallel; returns False if cancelled"""
+        def fetch_one(byte_range):
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            start, end = byte_range
+            data = self.fetch(start, end)
+            with self._lock:
+                self._insert(start, data)
+
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            for _ in executor.map(fetch_one, ranges):
+                pass
+        return not (cancel_event is not None and cancel_event.is_set())
+
+    def _find(self, offset):
+        # Blocks may overlap, so look back past starts that end too early
+        index = bisect.bisect_right(self._starts, offset) - 1
+        while index >= 0:
+            start, data = self._blocks[index]
+            if start + len(data) > offset:
+                return start, data
+            index -= 1
+        return None
+
+    def _insert(self, start, data):
+        index = bisect.bisect_right(self._starts, start)
+        self._starts.insert(index, start)
+        self._blocks.insert(index, (start, data))
+
+
+def member_ranges(archive, infos):
+    """Byte range ``(start, end)`` of each member: local header, data and descriptor
+
+    A member ends where the next one (in file order) starts, or where the
+    central directory begins.
+    """
+    offsets = sorted(info.header_offset for info in archive.infolist())
+    offsets.append(archive.start_dir)
+    ranges = []
+    for info in infos:
+        next_offset = offsets[bisect.bisect_right(offsets, info.header_offset)]
+        ranges.append((info.header_offset, next_offset - 1))
+    return ranges
+
+
+def coalesce_ranges(ranges, gap=COALESCE_GAP):
+    """Merge ranges separated by at most ``gap`` bytes into single requests"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start - merged[-1][1] - 1 <= gap:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [tuple(byte_range) for byte_range in merged]
+
+
+def write_member(archive, info, folder_path):
+    """Decompress one member straight to its place, replacing the old file atomically"""
+    target = member_target(folder_path, info)
+    if info.is_dir():
+        os.makedirs(target, exist_ok=True)
+        return
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+
+    temp_path = target + ".vsupdater-tmp"
+    try:
+        # ZipExtFile checks the CRC32 at the end, before the old file is replaced
+        with archive.open(info) as source, open(temp_path, "wb") as destination:
+            shutil.copyfileobj(source, destination, WRITE_CHUNK_SIZE)
+        os.replace(temp_path, target)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
@@ -0,0 +1,360 @@
+import os
+import json
+import time
+import errno
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .integrity import sha256_file
+from .staging import PORTABLE_DATA_DIR, remove_tree
+
+SNAPSHOTS_SUFFIX = ".vsupdater-snapshots"
+MANIFEST_NAME = "snapshot.json"
+MANIFEST_VERSION = 1
+PARTIAL_SUFFIX = ".partial"
+DEFAULT_KEEP = 3
+# Copies of changed files; more threads mostly contend for the same disk
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+
+# How a file got into a snapshot, or back into data/ on restore
+METHOD_LINK = "linked"
+METHOD_COPY = "copied"
+METHOD_KEEP = "kept"
+
+# Hardlinks cannot be made in this snapshot folder at all (another volume, or no hardlink support)
+LINK_UNSUPPORTED_ERRNOS = {errno.EXDEV, errno.EPERM, errno.ENOTSUP, errno.EOPNOTSUPP, errno.ENOSYS}
+
+
+def default_snapshot_keep():
+    """Snapshots kept per folder; ``VSUPDATER_SNAPSHOTS`` overrides it (0 turns snapshots off)"""
+    try:
+        return max(0, int(os.environ.get("VSUPDATER_SNAPSHOTS", DEFAULT_KEEP)))
+    except ValueError:
+        return DEFAULT_KEEP
+
+
+class SnapshotStore:
+    """Incremental snapshots of an installation's portable ``data`` folder
+
+    Snapshots live in a hidden sibling of the installation
+    (``.<name>.vsupdater-snapshots/<id>/data``), each with a manifest of the
+    size, mtime and (optionally) SHA-256 every file had in ``data`` when it
+    was taken. A new snapshot compares ``data`` against the newest complete
+    one: a file with the same size and mtime is hardlinked from that
+    snapshot, so it costs a directory entry instead of a copy. Only new and
+    changed files are copied. With ``verify_hash`` every file is also
+    hashed, which catches a change that kept size and mtime (written within
+    one timestamp tick) and links a file that was only touched.
+
+    Snapshot files are never linked to the live files, only to each other:
+    VS Code rewrites settings and databases in place, which would otherwise
+    change the snapshots too. A snapshot is built under a ``.partial`` name
+    and renamed once complete, so an interrupted run leaves nothing that
+    looks like a usable snapshot. Only the newest ``keep`` snapshots are
+    kept; removing an old one does not affect the files still linked from
+    newer ones.
+
+    ``restore`` puts a snapshot back into ``data`` in place: files that still
+    match the manifest are left alone, changed or missing ones are copied
+    back, and files that were not in the snapshot are removed.
+    """
+
+    def __init__(self, folder_path, keep=DEFAULT_KEEP, verify_hash=False, cancel_event=None,
+                 workers=DEFAULT_WORKERS):
+        self.folder_path = os.path.abspath(folder_path)
+        parent, name = os.path.split(self.folder_path)
+        self.root = os.path.join(parent, f".{name}{SNAPSHOTS_SUFFIX}")
+        self.data_path = os.path.join(self.folder_path, PORTABLE_DATA_DIR)
+        self.keep = keep
+        self.verify_hash = verify_hash
+        self.cancel_event = cancel_event
+        self.workers = max(1, workers)
+        self.use_links = True
+        self.stats = {}
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
+    def snapshot_ids(self):
+        """Ids of the complete snapshots, oldest first"""
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return []
+        return sorted(name for name in names
+                      if not name.endswith(PARTIAL_SUFFIX) and os.path.isfile(self.manifest_path(name)))
+
+    def manifest_path(self, snapshot_id):
+        return os.path.join(self.root, snapshot_id, MANIFEST_NAME)
+
+    def snapshot_data_path(self, snapshot_id):
+        return os.path.join(self.root, snapshot_id, PORTABLE_DATA_DIR)
+
+    def load_manifest(self, snapshot_id):
+        try:
+            with open(self.manifest_path(snapshot_id), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return manifest if manifest.get("version") == MANIFEST_VERSION else None
+
+    def latest(self):
+        """Id of the newest complete snapshot, or None"""
+        ids = self.snapshot_ids()
+        return ids[-1] if ids else None
+
+    def list(self):
+        """Manifest summaries (without the file lists), oldest first"""
+        summaries = []
+        for snapshot_id in self.snapshot_ids():
+            manifest = self.load_manifest(snapshot_id)
+            if manifest is not None:
+                summary = {key: value for key, value in manifest.items() if key not in ("files", "dirs")}
+                summaries.append(dict(summary, id=snapshot_id))
+        return summaries
+
+    def create(self):
+        """Snapshot ``data``; returns the new id, or None if cancelled or there is no ``data`` folder"""
+        if not os.path.isdir(self.data_path):
+            return None
+
+        started = time.perf_counter()
+        previous_id = self.latest()
+        previous = self.load_manifest(previous_id) if previous_id else None
+        previous_files = previous["files"] if previous else {}
+        previous_data = self.snapshot_data_path(previous_id) if previous_id else None
+
+        snapshot_id = self.new_id(previous_id)
+        partial_path = os.path.join(self.root, snapshot_id + PARTIAL_SUFFIX)
+        target_data = os.path.join(partial_path, PORTABLE_DATA_DIR)
+        remove_tree(partial_path)
+
+        dirs, files, links = scan_data(self.data_path)
+        self.stats = {METHOD_LINK: 0, METHOD_COPY: 0, "bytes_linked": 0, "bytes_copied": 0,
+                      "bytes_total": sum(size for size, _ in files.values())}
+        manifest_files = {}
+        digests = {}
+        previous_digests = {}
+
+        def hash_file(relative):
+            if self.cancelled:
+                return
+            digests[relative] = sha256_file(os.path.join(self.data_path, relative), self.cancel_event)
+            recorded = previous_files.get(relative)
+            if recorded is not None and recorded[2] is None and recorded[0] == files[relative][0]:
+                # The previous snapshot was taken without hashes
+                previous_digests[relative] = sha256_file(os.path.join(previous_data, relative), self.cancel_event)
+
+        def unchanged(relative, recorded):
+            size, mtime_ns = files[relative]
+            if recorded[0] != size:
+                return False
+            if not self.verify_hash:
+                return recorded[1] == mtime_ns
+            return (recorded[2] or previous_digests.get(relative)) == digests[relative]
+
+        def copy(relative):
+            if self.cancelled:
+                return
+            size, mtime_ns = files[relative]
+            # copy2 keeps the mtime, so the snapshot file matches what the manifest records
+            shutil.copy2(os.path.join(self.data_path, relative), os.path.join(target_data, relative))
+            self.count(METHOD_COPY, size)
+            manifest_files[relative] = [size, mtime_ns, digests.get(relative)]
+
+        try:
+            for relative in [""] + dirs:
+                os.makedirs(os.path.join(target_data, relative), exist_ok=True)
+            for relative, target in links.items():
+                os.symlink(target, os.path.join(target_data, relative))
+
+            if self.verify_hash:
+                self.run_parallel(hash_file, list(files))
+
+            # A link is one metadata call; on a single thread they beat any pool
+            to_copy = []
+            for relative, (size, mtime_ns) in files.items():
+                if self.cancelled:
+                    break
+                recorded = previous_files.get(relative)
+                if (recorded is not None and unchanged(relative, recorded)
+                        and self.link(os.path.join(previous_data, relative), os.path.join(target_data, relative))):
+                    self.count(METHOD_LINK, size)
+                    manifest_files[relative] = [size, mtime_ns, digests.get(relative) or recorded[2]]
+                else:
+                    to_copy.append(relative)
+
+            to_copy.sort(key=lambda relative: files[relative][0], reverse=True)
+            self.run_parallel(copy, to_copy)
+            if self.cancelled:
+                remove_tree(partial_path)
+                return None
+
+            self.stats["seconds"] = round(time.perf_counter() - started, 6)
+            manifest = {
+                "version": MANIFEST_VERSION,
+                "created": time.time(),
+                "previous": previous_id,
+                "hashed": self.verify_hash,
+                "files_total": len(files),
+                "stats": self.stats,
+                "dirs": dirs,
+                "links": links,
+                "files": manifest_files,
+            }
+            with open(os.path.join(partial_path, MANIFEST_NAME), "w", encoding="utf-8") as f:
+                # dumps() goes through the C encoder, dump() does not
+                f.write(json.dumps(manifest))
+            os.rename(partial_path, os.path.join(self.root, snapshot_id))
+        except BaseException:
+            remove_tree(partial_path)
+            raise
+
+        self.prune()
+        return snapshot_id
+
+    def link(self, source, destination):
+        """Hardlink ``destination`` to ``source``; False when this volume cannot (then every file is copied)"""
+        if not self.use_links:
+            return False
+        try:
+            os.link(source, destination)
+            return True
+        except FileNotFoundError:
+            # Missing from the previous snapshot (damaged); take a fresh copy
+            return False
+        except OSError as e:
+            if e.errno == errno.EMLINK:
+                # Only this file ran out of links; its next snapshot starts a fresh chain
+                return False
+            if e.errno in LINK_UNSUPPORTED_ERRNOS:
+                self.use_links = False
+                return False
+            raise
+
+    def count(self, method, byte_count):
+        with self._lock:
+            self.stats[method] += 1
+            self.stats["bytes_linked" if method == METHOD_LINK else "bytes_copied"] += byte_count
+
+    def new_id(self, previous_id):
+        """A sortable UTC timestamp id, later than every existing one"""
+        now = time.time()
+        snapshot_id = time.strftime("%Y%m%d-%H%M%S", time.gmtime(now)) + f"-{int(now * 1000000) % 1000000:06d}"
+        if previous_id is not None and snapshot_id <= previous_id:
+            snapshot_id = previous_id + "-1"
+        return snapshot_id
+
+    def prune(self, keep=None):
+        """Remove all but the newest ``keep`` snapshots, and any left unfinished; returns the ids removed"""
+        keep = self.keep if keep is None else keep
+        removed = []
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return removed
+        for name in names:
+            if name.endswith(PARTIAL_SUFFIX):
+                remove_tree(os.path.join(self.root, name))
+        ids = self.snapshot_ids()
+        for snapshot_id in ids[:max(0, len(ids) - keep)]:
+            remove_tree(os.path.join(self.root, snapshot_id))
+            removed.append(snapshot_id)
+        return removed
+
+    def restore(self, snapshot_id=None):
+        """Make ``data`` match a snapshot (the newest by default); returns True when done
+
+        Raises ``ValueError`` when there is no such snapshot.
+        """
+        snapshot_id = snapshot_id or self.latest()
+        manifest = self.load_manifest(snapshot_id) if snapshot_id else None
+        if manifest is None:
+            raise ValueError(f"Snapshot not found: {snapshot_id}" if snapshot_id else "No snapshot to restore")
+
+        started = time.perf_counter()
+        source_data = self.snapshot_data_path(snapshot_id)
+        files = manifest["files"]
+        links = manifest["links"]
+        dirs = set(manifest["dirs"])
+        self.stats = {METHOD_KEEP: 0, METHOD_COPY: 0, "removed": 0, "bytes_copied": 0,
+                      "bytes_total": sum(entry[0] for entry in files.values())}
+
+        # Drop what the snapshot did not have, then put back what differs
+        live_files, live_links = {}, {}
+        if os.path.isdir(self.data_path):
+            live_dirs, live_files, live_links = scan_data(self.data_path)
+            for relative in list(live_files) + list(live_links):
+                if relative not in files and relative not in links:
+                    os.remove(os.path.join(self.data_path, relative))
+                    self.stats["removed"] += 1
+            for relative in sorted(live_dirs, reverse=True):
+                if relative not in dirs:
+                    remove_tree(os.path.join(self.data_path, relative))
+        for relative in [""] + manifest["dirs"]:
+            os.makedirs(os.path.join(self.data_path, relative), exist_ok=True)
+        for relative, target in links.items():
+            path = os.path.join(self.data_path, relative)
+            if live_links.get(relative) != target:
+                if os.path.lexists(path):
+                    os.remove(path)
+                os.symlink(target, path)
+
+        def copy_back(relative):
+            if self.cancelled:
+                return
+            # Copy beside the file and rename over it, so a crash never leaves it half written
+            destination = os.path.join(self.data_path, relative)
+            temp_path = destination + ".vsupdater-restore"
+            shutil.copy2(os.path.join(source_data, relative), temp_path)
+            os.replace(temp_path, destination)
+            self.count(METHOD_COPY, files[relative][0])
+
+        to_copy = []
+        for relative, (size, mtime_ns, _) in files.items():
+            live = live_files.get(relative)
+            if live is not None and live[0] == size and live[1] == mtime_ns:
+                self.stats[METHOD_KEEP] += 1
+            else:
+                to_copy.append(relative)
+        self.run_parallel(copy_back, to_copy)
+        self.stats["seconds"] = round(time.perf_counter() - started, 6)
+        return not self.cancelled
+
+    def run_parallel(self, function, items):
+        if self.workers <= 1 or len(items) <= 1:
+            for item in items:
+                function(item)
+            return
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for _ in executor.map(function, items):
+                pass
+
+
+def scan_data(root):
+    """Directories, ``{path: (size, mtime_ns)}`` for files and ``{path: target}`` for symlinks below ``root``
+
+    Paths are relative to ``root`` and use ``/`` on every platform.
+    """
+    dirs = []
+    files = {}
+    links = {}
+    pending = [""]
+    while pending:
+        relative_dir = pending.pop()
+        with os.scandir(os.path.join(root, relative_dir)) as it:
+            for entry in it:
+                relative = f"{relative_dir}/{entry.name}" if relative_dir else entry.name
+                if entry.is_symlink():
+                    links[relative] = os.readlink(entry.path)
+                elif entry.is_dir():
+                    dirs.append(relative)
+                    pending.append(relative)
+                else:
+                    stat = entry.stat()
+                    files[relative] = (stat.st_size, stat.st_mtime_ns)
+    dirs.sort()
+    return dirs, files, links
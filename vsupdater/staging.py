@@ -0,0 +1,169 @@
+import os
+import shutil
+
+from .constants import CODE_FILE, INSIDER_CODE_FILE
+
+STAGING_SUFFIX = ".vsupdater-staging"
+PREVIOUS_SUFFIX = ".vsupdater-previous"
+PORTABLE_DATA_DIR = "data"
+
+
+class FolderLocked(OSError):
+    """The live installation could not be moved aside; nothing was changed"""
+
+
+class StagedInstall:
+    """Build a new installation next to the live one and swap it in with renames
+
+    The staging and previous directories are hidden siblings of
+    ``folder_path``, so they are on the same volume and every step of the
+    swap is a cheap directory rename instead of a copy. The portable ``data``
+    folder is renamed across from the old tree to the new one, and so is
+    every file the user added to the old tree (see ``user_files``). The
+    replaced tree is kept as the previous directory until the next update,
+    which makes ``rollback()`` a pair of renames as well. A folder that held
+    no installation (a fresh install) leaves no previous directory behind.
+    """
+
+    def __init__(self, folder_path):
+        self.folder_path = os.path.abspath(folder_path)
+        parent, name = os.path.split(self.folder_path)
+        self.staging_path = os.path.join(parent, f".{name}{STAGING_SUFFIX}")
+        self.previous_path = os.path.join(parent, f".{name}{PREVIOUS_SUFFIX}")
+
+    @staticmethod
+    def is_supported(folder_path, is_install_operation):
+        """Whether the folder can be swapped as a whole
+
+        Drive roots and mount points have no same-volume sibling, and a fresh
+        install must not move aside a folder that already holds unrelated files.
+        """
+        folder_path = os.path.abspath(folder_path)
+        parent = os.path.dirname(folder_path)
+        if parent == folder_path or os.path.ismount(folder_path):
+            return False
+        if is_install_operation and os.path.isdir(folder_path) and os.listdir(folder_path):
+            return False
+        return True
+
+    @property
+    def has_previous(self):
+        """Whether a replaced version is kept for ``rollback()``"""
+        return holds_install(self.previous_path)
+
+    def prepare(self):
+        """Create an empty staging directory, removing leftovers of a failed run"""
+        remove_tree(self.staging_path)
+        os.makedirs(self.staging_path)
+        return self.staging_path
+
+    def discard(self):
+        """Throw away the staging directory"""
+        remove_tree(self.staging_path)
+
+    def swap(self, log=None):
+        """Replace the live installation with the staged one
+
+        Raises ``FolderLocked`` if the live folder cannot be moved aside
+        (files in use), before anything has changed. On any later failure
+        the original installation is put back before the error is re-raised.
+        """
+        log = log or (lambda message: None)
+        remove_tree(self.previous_path)
+
+        had_folder = os.path.isdir(self.folder_path)
+        had_install = had_folder and holds_install(self.folder_path)
+        if had_folder:
+            try:
+                os.rename(self.folder_path, self.previous_path)
+            except OSError as e:
+                raise FolderLocked(e.errno, e.strerror, self.folder_path) from e
+
+        try:
+            os.rename(self.staging_path, self.folder_path)
+        except OSError:
+            if had_folder:
+                os.rename(self.previous_path, self.folder_path)
+            raise
+
+        if had_install:
+            old_data = os.path.join(self.previous_path, PORTABLE_DATA_DIR)
+            carried = user_files(self.previous_path, self.folder_path)
+            try:
+                if os.path.isdir(old_data):
+                    os.rename(old_data, os.path.join(self.folder_path, PORTABLE_DATA_DIR))
+                    log("Portable 'data' folder carried over.")
+                move_files(self.previous_path, self.folder_path, carried)
+            except OSError:
+                self.rollback()
+                raise
+            if carried:
+                log(f"Carried over {len(carried)} files added to the installation.")
+        elif had_folder:
+            # No installation was replaced, so there is nothing to roll back to: hand over what the folder held
+            leftovers = [name for name in os.listdir(self.previous_path)
+                         if not os.path.lexists(os.path.join(self.folder_path, name))]
+            move_files(self.previous_path, self.folder_path, leftovers)
+            try:
+                os.rmdir(self.previous_path)
+            except OSError:
+                pass
+
+    def rollback(self):
+        """Restore the installation that the last swap replaced"""
+        if not self.has_previous:
+            return False
+
+        # Bring user data and added files back to the tree that is about to become live again
+        new_data = os.path.join(self.folder_path, PORTABLE_DATA_DIR)
+        old_data = os.path.join(self.previous_path, PORTABLE_DATA_DIR)
+        if os.path.isdir(new_data) and not os.path.exists(old_data):
+            os.rename(new_data, old_data)
+        if os.path.isdir(self.folder_path):
+            move_files(self.folder_path, self.previous_path, user_files(self.folder_path, self.previous_path))
+
+        if os.path.isdir(self.folder_path):
+            remove_tree(self.staging_path)
+            os.rename(self.folder_path, self.staging_path)
+        os.rename(self.previous_path, self.folder_path)
+        remove_tree(self.staging_path)
+        return True
+
+
+def holds_install(folder_path):
+    """Whether ``folder_path`` contains a VS Code executable"""
+    return any(os.path.isfile(os.path.join(folder_path, name)) for name in (CODE_FILE, INSIDER_CODE_FILE))
+
+
+def user_files(tree_path, other_path):
+    """Files in ``tree_path`` that its build did not install and ``other_path`` lacks
+
+    The tree's manifest says what the build installed. Without one only
+    top-level files count, so a directory of an older build (such as a
+    versioned app folder) is never carried from build to build.
+    """
+    # delta imports this module
+    from .delta import iter_install_files, load_manifest
+
+    installed = load_manifest(tree_path)
+    files = []
+    for rel_path, _ in iter_install_files(tree_path):
+        if rel_path in (installed or ()) or (installed is None and "/" in rel_path):
+            continue
+        if not os.path.lexists(os.path.join(other_path, rel_path)):
+            files.append(rel_path)
+    return files
+
+
+def move_files(source_root, target_root, rel_paths):
+    """Rename each ``rel_path`` from one tree into the other, creating directories as needed"""
+    for rel_path in rel_paths:
+        target = os.path.join(target_root, rel_path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.rename(os.path.join(source_root, rel_path), target)
+
+
+def remove_tree(path):
+    """rmtree that tolerates a missing path"""
+    if os.path.isdir(path):
+        shutil.rmtree(path)
@@ -0,0 +1,239 @@
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+
+import requests
+
+from .constants import CONNECT_TIMEOUT, DEFAULT_RETRIES, READ_TIMEOUT
+
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 30
+# Enough for several batch folders downloading over several connections each
+POOL_SIZE = 32
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+
+class RetryableStatus(requests.exceptions.HTTPError):
+    """The server answered with a status worth retrying (5xx, 429, ...)"""
+
+    def __init__(self, message, response=None, retry_after=None):
+        super().__init__(message, response=response)
+        self.retry_after = retry_after
+
+
+TRANSIENT_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+    RetryableStatus,
+)
+
+
+class TransportMetrics:
+    """Request, retry and latency counters
+
+    Latency is the time until the response headers arrived (or the request
+    failed). Only the most recent latencies are kept for the percentiles.
+    ``errors`` counts transient errors by type, ``failures`` the operations
+    that still failed after their last retry.
+    """
+
+    MAX_SAMPLES = 4096
+
+    def __init__(self, parent=None):
+        self.parent = parent
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.retries = 0
+            self.failures = 0
+            self.errors = {}
+            self.statuses = {}
+            self.latencies = []
+
+    def record_request(self, seconds, status=None):
+        with self._lock:
+            self.requests += 1
+            if status is not None:
+                self.statuses[str(status)] = self.statuses.get(str(status), 0) + 1
+            self.latencies.append(seconds)
+            if len(self.latencies) > self.MAX_SAMPLES:
+                del self.latencies[:len(self.latencies) - self.MAX_SAMPLES]
+        if self.parent is not None:
+            self.parent.record_request(seconds, status)
+
+    def record_error(self, error):
+        name = type(error).__name__
+        with self._lock:
+            self.errors[name] = self.errors.get(name, 0) + 1
+        if self.parent is not None:
+            self.parent.record_error(error)
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+        if self.parent is not None:
+            self.parent.record_retry()
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+        if self.parent is not None:
+            self.parent.record_failure()
+
+    def snapshot(self):
+        with self._lock:
+            latencies = sorted(self.latencies)
+            snapshot = {
+                "requests": self.requests,
+                "retries": self.retries,
+                "failures": self.failures,
+                "errors": dict(self.errors),
+                "statuses": dict(self.statuses),
+            }
+        if latencies:
+            snapshot["latency_ms"] = {
+                "mean": round(sum(latencies) / len(latencies) * 1000, 1),
+                "p50": round(latencies[len(latencies) // 2] * 1000, 1),
+                "p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1),
+                "max": round(latencies[-1] * 1000, 1),
+            }
+        return snapshot
+
+
+class Transport:
+    """The one HTTP layer every network call goes through
+
+    A single pooled ``requests.Session`` is shared, so connections (and TLS
+    sessions) are reused across requests, downloads and engines. Every
+    request gets connect and read timeouts. Connection errors, timeouts and
+    retryable statuses are retried up to ``retries`` times with exponential
+    backoff and jitter, honouring ``Retry-After``. ``call`` applies the same
+    policy to a whole operation, such as reading a response body, so a
+    caller can resume from the last byte it received instead of starting
+    over. ``child()`` returns a transport sharing the pool but with its own
+    metrics, which also feed into the parent's.
+    """
+
+    def __init__(self, retries=DEFAULT_RETRIES, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+                 backoff=BACKOFF_BASE_SECONDS, max_backoff=BACKOFF_MAX_SECONDS, pool_size=POOL_SIZE,
+                 session=None, metrics=None):
+        self.retries = retries
+        self.timeout = timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.metrics = metrics or TransportMetrics()
+        if session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=8, pool_maxsize=pool_size, max_retries=0)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+
+    def child(self, **overrides):
+        settings = {"retries": self.retries, "timeout": self.timeout, "backoff": self.backoff,
+                    "max_backoff": self.max_backoff}
+        settings.update(overrides)
+        return Transport(session=self.session, metrics=TransportMetrics(self.metrics), **settings)
+
+    def close(self):
+        self.session.close()
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def request(self, method, url, retries=None, should_stop=None, **kwargs):
+        """Send a request, retrying transient failures; other HTTP errors are left to ``raise_for_status``"""
+        kwargs.setdefault("timeout", self.timeout)
+
+        def attempt():
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.exceptions.RequestException:
+                self.metrics.record_request(time.perf_counter() - started)
+                raise
+            self.metrics.record_request(time.perf_counter() - started, status=response.status_code)
+            if response.status_code in RETRY_STATUSES:
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                response.close()
+                raise RetryableStatus(f"{response.status_code} {response.reason} for url: {url}",
+                                      response=response, retry_after=retry_after)
+            return response
+
+        if retries == 0:
+            # The caller retries a larger operation around this request
+            return attempt()
+        return self.call(attempt, retries, should_stop)
+
+    def call(self, operation, retries=None, should_stop=None):
+        """Run ``operation()`` until it succeeds, retrying transient network errors with backoff
+
+        ``should_stop()`` (e.g. a cancel check) ends the retrying early; the
+        last error is raised then.
+        """
+        retries = self.retries if retries is None else retries
+        attempt = 0
+        while True:
+            try:
+                return operation()
+            except TRANSIENT_ERRORS as e:
+                self.metrics.record_error(e)
+                if attempt >= retries or (should_stop is not None and should_stop()):
+                    self.metrics.record_failure()
+                    raise
+                delay = self.backoff_delay(attempt, getattr(e, "retry_after", None))
+                self.metrics.record_retry()
+                if not sleep(delay, should_stop):
+                    self.metrics.record_failure()
+                    raise
+                attempt += 1
+
+    def backoff_delay(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return min(self.max_backoff, retry_after)
+        # "Equal jitter": at least half the exponential delay, so retries still spread out
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+
+def sleep(seconds, should_stop=None, interval=0.1):
+    """Sleep in short slices; returns False if ``should_stop()`` became true"""
+    deadline = time.monotonic() + seconds
+    while True:
+        if should_stop is not None and should_stop():
+            return False
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return True
+        time.sleep(min(interval, remaining))
+
+
+def parse_retry_after(value):
+    """Seconds from a ``Retry-After`` header (delta-seconds or HTTP date), or None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+_default_transport = None
+_default_lock = threading.Lock()
+
+
+def default_transport():
+    """Process-wide transport, created on first use"""
+    global _default_transport
+    with _default_lock:
+        if _default_transport is None:
+            _default_transport = Transport()
+        return _default_transport
@@ -0,0 +1,141 @@
+import os
+import json
+
+from .constants import INSIDER_CODE_FILE, CODE_FILE
+
+# Base URL of the VS Code update service; override to point at a local stand-in
+UPDATE_API_URL = os.environ.get("VSUPDATER_UPDATE_API", "https://update.code.visualstudio.com")
+# LAN mirror (``python -m vsupdater.mirror``) tried before the update service
+MIRROR_URL = os.environ.get("VSUPDATER_MIRROR") or None
+PLATFORM = "win32-x64-archive"
+VERSION_CHECK_TIMEOUT = 10
+# A mirror on the LAN answers fast or not at all
+MIRROR_TIMEOUT = 3
+SOURCE_MIRROR = "mirror"
+SOURCE_UPSTREAM = "upstream"
+
+
+class InstalledBuild:
+    """Version information read from an installation's product.json"""
+
+    def __init__(self, version, commit, quality, product_path):
+        self.version = version
+        self.commit = commit
+        self.quality = quality
+        self.product_path = product_path
+
+
+class Release:
+    """One build as published by the update API"""
+
+    def __init__(self, quality, version, commit, url, sha256=None, upstream_url=None, source=SOURCE_UPSTREAM):
+        self.quality = quality
+        self.version = version
+        self.commit = commit
+        self.url = url
+        self.sha256 = sha256
+        # Set when ``url`` points at a mirror: where the same build comes from otherwise
+        self.upstream_url = upstream_url
+        self.source = source
+
+    @classmethod
+    def from_json(cls, quality, data, source=SOURCE_UPSTREAM):
+        return cls(
+            quality=quality,
+            version=data.get("productVersion") or data.get("name"),
+            commit=data.get("version"),
+            url=data.get("url"),
+            sha256=data.get("sha256hash"),
+            upstream_url=data.get("upstreamUrl"),
+            source=source,
+        )
+
+    def download_urls(self):
+        """Where to fetch the archive from, in order of preference"""
+        urls = [self.url]
+        if self.upstream_url and self.upstream_url != self.url:
+            urls.append(self.upstream_url)
+        return [url for url in urls if url]
+
+
+def detect_quality(folder_path):
+    """Return "insider" or "stable" from the executable in ``folder_path``, or None"""
+    try:
+        files = os.listdir(folder_path)
+    except OSError:
+        return None
+    if INSIDER_CODE_FILE in files:
+        return "insider"
+    if CODE_FILE in files:
+        return "stable"
+    return None
+
+
+def find_product_json(folder_path):
+    """Locate product.json in both the flat and the commit-folder archive layouts"""
+    candidates = [os.path.join(folder_path, "resources", "app", "product.json")]
+    try:
+        with os.scandir(folder_path) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    candidates.append(os.path.join(entry.path, "resources", "app", "product.json"))
+    except OSError:
+        return None
+
+    existing = [path for path in candidates if os.path.isfile(path)]
+    if not existing:
+        return None
+    # Newer archives keep one folder per commit; the most recent one is live
+    return max(existing, key=os.path.getmtime)
+
+
+def read_installed_build(folder_path):
+    """Return the InstalledBuild for ``folder_path``, or None if it cannot be read"""
+    product_path = find_product_json(folder_path)
+    if product_path is None:
+        return None
+
+    try:
+        with open(product_path, "r", encoding="utf-8") as f:
+            product = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    return InstalledBuild(
+        version=product.get("version"),
+        commit=product.get("commit"),
+        quality=product.get("quality"),
+        product_path=product_path,
+    )
+
+
+def fetch_release_data(quality, api_url=None, timeout=VERSION_CHECK_TIMEOUT, transport=None, retries=None):
+    """The update API's JSON description of the newest build of ``quality``"""
+    # Imported here so that reading installed versions does not load the network stack
+    from .transport import default_transport
+
+    base_url = (api_url or UPDATE_API_URL).rstrip("/")
+    transport = transport or default_transport()
+    response = transport.get(f"{base_url}/api/update/{PLATFORM}/{quality}/latest", timeout=timeout, retries=retries)
+    response.raise_for_status()
+    return response.json()
+
+
+def fetch_latest_release(quality, api_url=None, timeout=VERSION_CHECK_TIMEOUT, mirror_url=None, log=None,
+                         transport=None):
+    """Ask the update API for the newest build of ``quality`` ("stable" or "insider")
+
+    With ``mirror_url`` the mirror is asked first (with a short timeout and
+    no retries) and the update service only if the mirror cannot answer.
+    ``release.source`` says which one did.
+    """
+    import requests
+
+    if mirror_url:
+        try:
+            data = fetch_release_data(quality, mirror_url, MIRROR_TIMEOUT, transport, retries=0)
+            return Release.from_json(quality, data, SOURCE_MIRROR)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            if log:
+                log(f"Notice: Mirror {mirror_url} unavailable ({e}); using the update service.")
+    return Release.from_json(quality, fetch_release_data(quality, api_url, timeout, transport))
@@ -0,0 +1,74 @@
+from PySide6.QtCore import QObject, QTimer, Signal, Slot
+
+from .engine import UpdateEngine
+from .events import EventBus, FRAME_INTERVAL_MS
+
+
+class OperationWorker(QObject):
+    """Runs an UpdateEngine on a worker thread
+
+    Move the worker to a QThread and connect ``QThread.started`` to ``run``.
+    The engine posts progress and log lines to ``bus`` without touching Qt;
+    an ``EventPump`` on the GUI thread delivers them at a fixed frame rate.
+    Only ``finished`` crosses threads as a signal. With ``rollback`` the
+    worker restores the version replaced by the last staged update instead.
+    """
+
+    finished = Signal(bool)
+
+    def __init__(self, folder_path, is_insider, is_portable, is_install_operation, rollback=False):
+        super().__init__()
+        self.is_install_operation = is_install_operation
+        self.rollback = rollback
+        self.bus = EventBus()
+        self.engine = UpdateEngine(
+            folder_path, is_insider, is_portable,
+            log=self.bus.post_log, progress=self.bus.post_progress,
+        )
+
+    def cancel(self):
+        """Ask the running engine to stop at the next cancellation point"""
+        self.engine.cancel()
+
+    @Slot()
+    def run(self):
+        """Execute the whole operation; emits ``finished`` with the result"""
+        if self.rollback:
+            success = self.engine.rollback()
+        else:
+            success = self.engine.run(self.is_install_operation)
+        self.finished.emit(success)
+
+
+class EventPump(QObject):
+    """Drains an EventBus on the GUI thread once per frame
+
+    Emits at most one ``progress`` and one ``log`` (all lines of the frame
+    joined) every ``FRAME_INTERVAL_MS``. Call ``flush`` after the operation
+    ends so the last lines are not left in the bus.
+    """
+
+    progress = Signal(int)
+    log = Signal(str)
+
+    def __init__(self, bus, parent=None, interval_ms=FRAME_INTERVAL_MS):
+        super().__init__(parent)
+        self.bus = bus
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self.flush)
+
+    def start(self):
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+        self.flush()
+
+    @Slot()
+    def flush(self):
+        progress, lines = self.bus.drain()
+        if lines:
+            self.log.emit("\n".join(lines))
+        if progress is not None:
+            self.progress.emit(progress)
@@ -0,0 +1,160 @@
+import os
+import mmap
+import time
+import threading
+
+MIN_CHUNK_SIZE = 64 * 1024
+# Larger reads stop paying off: urllib3 still reads into a temporary bytes object of
+# the requested size before copying it into our buffer, and that copy falls out of cache
+MAX_CHUNK_SIZE = 1024 * 1024
+# Aim for reads that take about this long, so progress and cancel stay responsive
+TARGET_READ_SECONDS = 0.05
+THROUGHPUT_SMOOTHING = 0.3
+
+
+def preallocate(path, size):
+    """Create or resize ``path`` to exactly ``size`` bytes, reserving the space where possible
+
+    ``posix_fallocate`` reserves real blocks, so a full disk fails here and
+    not halfway through the download, and the file is not fragmented. It is
+    not available everywhere. Without it the file is only extended.
+    """
+    mode = "r+b" if os.path.exists(path) else "wb"
+    with open(path, mode) as f:
+        if size and hasattr(os, "posix_fallocate"):
+            try:
+                os.posix_fallocate(f.fileno(), 0, size)
+            except OSError:
+                pass
+        f.truncate(size)
+
+
+class ChunkSizer:
+    """Choose the next read size from the throughput seen so far
+
+    Starts at ``minimum`` and moves in powers of two towards the size that
+    one ``target_seconds`` read would fill at the smoothed throughput. Slow
+    links keep small reads. Fast links get multi-megabyte reads and far
+    fewer Python-level iterations per byte.
+    """
+
+    def __init__(self, minimum=MIN_CHUNK_SIZE, maximum=MAX_CHUNK_SIZE, target_seconds=TARGET_READ_SECONDS):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_seconds = target_seconds
+        self.size = minimum
+        self.throughput = None
+
+    def observe(self, byte_count, seconds):
+        if byte_count <= 0 or seconds <= 0:
+            return
+        sample = byte_count / seconds
+        if self.throughput is None:
+            self.throughput = sample
+        else:
+            self.throughput += THROUGHPUT_SMOOTHING * (sample - self.throughput)
+        wanted = self.throughput * self.target_seconds
+        size = self.minimum
+        while size * 2 <= wanted and size * 2 <= self.maximum:
+            size *= 2
+        self.size = size
+
+
+class DownloadWriter:
+    """Positional writes into one (preallocated) download file, shared by all connections
+
+    Writes go through an mmap of the whole file when ``use_mmap`` is set and
+    the size is known. Otherwise they use ``os.pwrite`` where it exists. On
+    platforms without it (Windows), a seek and a write run under a lock.
+    """
+
+    def __init__(self, path, total_size=None, use_mmap=False):
+        self.path = path
+        self._file = open(path, "r+b" if os.path.exists(path) else "wb")
+        self._map = None
+        self._lock = threading.Lock()
+        if use_mmap and total_size:
+            self._map = mmap.mmap(self._file.fileno(), total_size, access=mmap.ACCESS_WRITE)
+
+    @property
+    def uses_mmap(self):
+        return self._map is not None
+
+    def write_at(self, offset, data):
+        if self._map is not None:
+            self._map[offset:offset + len(data)] = data
+        elif hasattr(os, "pwrite"):
+            written = 0
+            while written < len(data):
+                written += os.pwrite(self._file.fileno(), data[written:], offset + written)
+        else:
+            with self._lock:
+                self._file.seek(offset)
+                self._file.write(data)
+
+    def close(self):
+        if self._map is not None:
+            self._map.flush()
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+
+class StreamCopier:
+    """Copy a response body into a DownloadWriter through one reused buffer
+
+    The body is read with ``readinto`` into a buffer allocated once per
+    copier, and the written slice is handed on as a memoryview. No bytes
+    object is created per chunk on this side. Read sizes come from a
+    ChunkSizer. Use one copier per thread.
+    """
+
+    def __init__(self, minimum=MIN_CHUNK_SIZE, maximum=MAX_CHUNK_SIZE, target_seconds=TARGET_READ_SECONDS):
+        self.sizer = ChunkSizer(minimum, maximum, target_seconds)
+        self.buffer = bytearray(maximum)
+        self.view = memoryview(self.buffer)
+        self.reads = 0
+
+    def copy(self, source, writer, offset, length=None, should_stop=None, on_chunk=None):
+        """Copy up to ``length`` bytes (all if None) from ``source`` to ``offset``
+
+        ``on_chunk(offset, data)`` is called after each write. ``data`` is a
+        view into the reused buffer and is only valid during the call.
+        Returns the number of bytes copied. The copy stops early when
+        ``should_stop()`` is true or the source runs dry.
+        """
+        copied = 0
+        while length is None or copied < length:
+            if should_stop is not None and should_stop():
+                break
+            size = self.sizer.size if length is None else min(self.sizer.size, length - copied)
+            started = time.perf_counter()
+            count = source.readinto(self.view[:size])
+            self.sizer.observe(count, time.perf_counter() - started)
+            if not count:
+                break
+            self.reads += 1
+            chunk = self.view[:count]
+            writer.write_at(offset + copied, chunk)
+            if on_chunk is not None:
+                on_chunk(offset + copied, chunk)
+            copied += count
+        return copied
+
+
+def body_reader(response):
+    """File-like view of a streamed ``requests`` response body that supports ``readinto``
+
+    The raw urllib3 stream skips requests' generator layer. Transfer
+    encodings such as gzip are still decoded.
+    """
+    if response.headers.get("Content-Encoding", "identity").lower() != "identity":
+        response.raw.decode_content = True
+    return response.raw